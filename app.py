@@ -1,21 +1,30 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 import os.path
+import importlib.util
 import numpy as np
-import base64
-from io import BytesIO
 import json
-import matplotlib.font_manager as fm
+import logging
+import re
+import random
+import functools
+import weakref
+import hashlib
+import zlib
+import sys
+import threading
+import time
+import multiprocessing
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import OrderedDict, deque, namedtuple
+import tempfile
+import zipfile
 
-# 페이지 설정
-st.set_page_config(page_title="학생 설문 분석 MCP", layout="wide")
+import vega_charts
 
-# 커스텀 CSS 스타일
-st.markdown("""
+# 커스텀 CSS 스타일 (main()에서 페이지 설정과 함께 적용)
+CUSTOM_CSS = """
 <style>
 @import url('https://fonts.googleapis.com/css2?family=Nanum+Gothic:wght@400;700&display=swap');
 
@@ -58,405 +67,3084 @@ st.markdown("""
     font-family: 'Nanum Gothic', sans-serif !important;
 }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+logger = logging.getLogger(__name__)
+
+class StreamlitReporter:
+    """안내 메시지를 Streamlit 화면에 표시합니다. (웹 앱의 기본 리포터)
+
+    백그라운드 새로고침처럼 화면에 연결되지 않은 스레드에서 보낸 메시지는 로그로 남깁니다.
+    """
+    
+    def _show(self, level, message):
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        if get_script_run_ctx(suppress_warning=True) is None:
+            logger.log(logging.ERROR if level == 'error' else logging.WARNING if level == 'warning' else logging.INFO,
+                       message)
+            return
+        getattr(st, level)(message)
+    
+    def success(self, message):
+        self._show('success', message)
+    
+    def info(self, message):
+        self._show('info', message)
+    
+    def warning(self, message):
+        self._show('warning', message)
+    
+    def error(self, message):
+        self._show('error', message)
+
+# 분석 함수의 안내 메시지를 받는 리포터 (success/info/warning/error 메서드를 가진 객체)
+_reporter = StreamlitReporter()
+
+def set_reporter(reporter):
+    """분석 함수가 안내 메시지를 보낼 리포터를 바꾸고 이전 리포터를 반환합니다.
+
+    명령줄 실행처럼 Streamlit 화면이 없는 환경에서는 로그로 남기는 리포터로 바꿔 사용합니다.
+    """
+    global _reporter
+    previous, _reporter = _reporter, reporter
+    return previous
+
+def report(message, level='info'):
+    """현재 리포터로 안내 메시지를 보냅니다. (level: success, info, warning, error)"""
+    getattr(_reporter, level)(message)
+
+# 한글 폰트 목록 (우선순위 순)
+KOREAN_FONT_CANDIDATES = [
+    'NanumGothic',
+    'Malgun',
+    'AppleGothic',
+    'Noto Sans CJK KR',
+    'Noto Sans KR',
+    'NanumMyeongjo',
+    'NanumGothicCoding'
+]
+
+# 폰트 탐색 결과를 저장하는 디스크 캐시 경로
+FONT_CACHE_PATH = os.getenv(
+    'MATHEMOTION_FONT_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'mathemotion', 'font_cache.json'))
+
+# 프로세스 단위로 한 번만 결정되는 한글 폰트
+_korean_font = None
+_korean_font_lock = threading.Lock()
+
+def _font_directory_signature():
+    """시스템 폰트 디렉토리 구성을 나타내는 서명을 계산합니다.
+
+    폰트 파일이 추가되거나 삭제되면 해당 디렉토리의 수정 시각이 바뀌므로,
+    파일 전체를 읽지 않고 디렉토리 목록과 수정 시각만으로 변경 여부를 판단합니다.
+    """
+    import matplotlib.font_manager as fm
+    
+    font_dirs = list(fm.X11FontDirectories) + list(fm.OSXFontDirectories)
+    if sys.platform == 'win32':
+        font_dirs.append(fm.win32FontDirectory())
+    
+    digest = hashlib.sha1()
+    for font_dir in sorted(set(font_dirs)):
+        if not os.path.isdir(font_dir):
+            continue
+        for dirpath, dirnames, _ in os.walk(font_dir):
+            dirnames.sort()
+            try:
+                mtime = os.stat(dirpath).st_mtime_ns
+            except OSError:
+                continue
+            digest.update(f"{dirpath}:{mtime}\n".encode())
+    return digest.hexdigest()
+
+def _find_korean_font_file():
+    """시스템에 설치된 폰트 중 우선순위가 가장 높은 한글 폰트 파일 경로를 찾습니다."""
+    import matplotlib.font_manager as fm
+    
+    # 시스템에 설치된 모든 폰트 찾기
+    font_list = fm.findSystemFonts(fontpaths=None, fontext='ttf')
+    
+    for font_name in KOREAN_FONT_CANDIDATES:
+        matching_fonts = [f for f in font_list if font_name in f]
+        if matching_fonts:
+            return matching_fonts[0]
+    return None
+
+def _load_font_cache(signature):
+    """디스크 캐시에서 폰트 탐색 결과를 읽습니다. 캐시가 없거나 만료되면 (False, None)을 반환합니다."""
+    try:
+        with open(FONT_CACHE_PATH, 'r') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return False, None
+    
+    if cached.get('signature') != signature:
+        return False, None
+    font_path = cached.get('font_path')
+    if font_path is not None and not os.path.exists(font_path):
+        return False, None
+    return True, font_path
+
+def _save_font_cache(signature, font_path):
+    """폰트 탐색 결과를 디스크 캐시에 저장합니다."""
+    try:
+        os.makedirs(os.path.dirname(FONT_CACHE_PATH), exist_ok=True)
+        tmp_path = f"{FONT_CACHE_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'signature': signature, 'font_path': font_path}, f)
+        os.replace(tmp_path, FONT_CACHE_PATH)
+    except OSError:
+        # 캐시 저장 실패는 폰트 적용에 영향을 주지 않습니다.
+        pass
 
 def set_korean_font():
-    """시스템에 설치된 한글 폰트를 찾아 설정합니다."""
+    """시스템에 설치된 한글 폰트를 찾아 FontProperties로 반환합니다.
+
+    matplotlib 전역 설정은 바꾸지 않으며, 차트는 반환된 폰트를 각 글자 요소에 직접 지정합니다.
+    탐색 결과는 폰트 디렉토리 서명과 함께 디스크에 캐시되므로,
+    폰트 구성이 바뀌지 않았다면 재시작 후에도 시스템 전체를 다시 검색하지 않습니다.
+    """
+    import matplotlib.font_manager as fm
+    
     try:
-        # 시스템에 설치된 모든 폰트 찾기
-        font_list = fm.findSystemFonts(fontpaths=None, fontext='ttf')
-        
-        # 한글 폰트 목록 (우선순위 순)
-        korean_fonts = [
-            'NanumGothic',
-            'Malgun',
-            'AppleGothic',
-            'Noto Sans CJK KR',
-            'Noto Sans KR',
-            'NanumMyeongjo',
-            'NanumGothicCoding'
-        ]
-        
-        # 설치된 한글 폰트 찾기
-        found_font = None
-        for font_name in korean_fonts:
-            matching_fonts = [f for f in font_list if font_name in f]
-            if matching_fonts:
-                found_font = matching_fonts[0]
-                break
+        signature = _font_directory_signature()
+        cache_hit, found_font = _load_font_cache(signature)
+        if not cache_hit:
+            found_font = _find_korean_font_file()
+            _save_font_cache(signature, found_font)
         
         if found_font:
             # 폰트 설정
             font_prop = fm.FontProperties(fname=found_font)
-            plt.rcParams['font.family'] = font_prop.get_name()
-            plt.rcParams['axes.unicode_minus'] = False
-            st.success(f"한글 폰트가 적용되었습니다: {font_prop.get_name()}")
+            report(f"한글 폰트가 적용되었습니다: {font_prop.get_name()}", level='success')
             return font_prop
         else:
             # 한글 폰트를 찾지 못한 경우 기본 폰트 사용
-            plt.rcParams['font.family'] = 'DejaVu Sans'
-            plt.rcParams['axes.unicode_minus'] = False
-            st.warning("한글 폰트를 찾을 수 없어 기본 폰트를 사용합니다.")
+            report("한글 폰트를 찾을 수 없어 기본 폰트를 사용합니다.", level='warning')
             return fm.FontProperties(family='DejaVu Sans')
             
     except Exception as e:
-        st.error(f"폰트 설정 중 오류 발생: {str(e)}")
-        return fm.FontProperties(family='DejaVu Sans')
+        report(f"폰트 설정 중 오류 발생: {str(e)}", level='error')
+        return None
+
+def get_korean_font():
+    """프로세스 전체에서 공유하는 한글 폰트(FontProperties)를 반환합니다.
+
+    최초 호출 시에만 set_korean_font()로 폰트를 결정하며,
+    이후 호출은 저장된 결과를 그대로 돌려줍니다.
+    """
+    global _korean_font
+    if _korean_font is not None:
+        return _korean_font
+    
+    with _korean_font_lock:
+        if _korean_font is None:
+            font_prop = set_korean_font()
+            if font_prop is None:
+                # 오류가 발생한 경우 다음 호출에서 다시 시도합니다.
+                import matplotlib.font_manager as fm
+                return fm.FontProperties(family='DejaVu Sans')
+            _korean_font = font_prop
+    return _korean_font
+
+# Google Sheets API 설정
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']
+
+# Sheets API 요청의 HTTP 타임아웃 (초)
+SHEETS_HTTP_TIMEOUT = 60
+
+# Sheets API 엔드포인트 (비워두면 기본 엔드포인트 사용)
+SHEETS_API_ENDPOINT = os.getenv('SHEETS_API_ENDPOINT')
+
+# (인증 정보 지문, 전송 객체 생성 함수)별로 프로세스 전체에서 공유하는 서비스 객체
+_sheets_clients = {}
+# 서비스 객체별 인증 정보, 전송 객체 생성 함수와 재사용 가능한 HTTP 전송 객체 풀
+_sheets_transports = {}
+_sheets_clients_lock = threading.Lock()
+
+# 인증 파일 내용 캐시 (경로 -> (수정 시각, 크기, 내용))
+_credential_file_cache = {}
+# 이미 안내한 인증 정보 출처
+_reported_credential_sources = set()
+
+def _report_credential_source(source, message, level='success'):
+    """인증 정보 출처 안내 메시지를 출처별로 한 번만 표시합니다."""
+    if source in _reported_credential_sources:
+        return
+    _reported_credential_sources.add(source)
+    report(message, level)
+
+def _read_credentials_file(credentials_path):
+    """인증 파일을 읽습니다. 파일이 바뀌지 않았다면 캐시된 내용을 반환합니다."""
+    stat = os.stat(credentials_path)
+    cached = _credential_file_cache.get(credentials_path)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+    
+    with open(credentials_path, 'r') as f:
+        credentials_json = f.read()
+    _credential_file_cache[credentials_path] = (stat.st_mtime_ns, stat.st_size, credentials_json)
+    return credentials_json
+
+def _authorized_http(credentials):
+    """인증 정보로 서명하는 새 HTTP 전송 객체를 만듭니다. (기본 전송 객체 생성 함수)"""
+    import httplib2
+    from google_auth_httplib2 import AuthorizedHttp
+    return AuthorizedHttp(credentials, http=httplib2.Http(timeout=SHEETS_HTTP_TIMEOUT))
+
+def _get_pooled_service(credentials_json, http_factory=None):
+    """인증 정보 지문에 해당하는 공유 서비스 객체를 반환합니다. 없으면 새로 생성합니다.
+
+    서비스 객체는 googleapiclient에 포함된 정적 discovery 문서로 한 번만 생성하며,
+    인증 토큰은 모든 요청이 같은 Credentials 객체를 공유하므로 만료되었을 때만 갱신됩니다.
+    http_factory(credentials)를 지정하면 요청을 보낼 전송 객체를 그 함수로 만듭니다.
+    (예: 네트워크 없이 응답을 흉내 내는 googleapiclient.http.HttpMockSequence)
+    """
+    if http_factory is None:
+        http_factory = _authorized_http
+    if isinstance(credentials_json, str):
+        credentials_info = json.loads(credentials_json)
+    else:
+        # st.secrets의 테이블 형식도 그대로 사용
+        credentials_info = dict(credentials_json)
+    fingerprint = hashlib.sha256(
+        json.dumps([credentials_info, SHEETS_API_ENDPOINT], sort_keys=True).encode()).hexdigest()
+    
+    with _sheets_clients_lock:
+        service = _sheets_clients.get((fingerprint, http_factory))
+        if service is None:
+            # Google 클라이언트는 스프레드시트 모드에서만 필요하므로 처음 사용할 때 불러옵니다.
+            from google.oauth2 import service_account
+            from googleapiclient.discovery import build
+            
+            credentials = service_account.Credentials.from_service_account_info(
+                credentials_info, scopes=SCOPES)
+            # SHEETS_API_ENDPOINT로 로컬 테스트용 가짜 Sheets 서버를 지정할 수 있습니다.
+            client_options = {'api_endpoint': SHEETS_API_ENDPOINT} if SHEETS_API_ENDPOINT else None
+            service = build('sheets', 'v4', credentials=credentials,
+                            static_discovery=True, cache_discovery=False,
+                            client_options=client_options)
+            _sheets_clients[(fingerprint, http_factory)] = service
+            _sheets_transports[id(service)] = {'credentials': credentials, 'http_factory': http_factory, 'idle': []}
+    return service
+
+def _send_sheets_request(service, request):
+    """Sheets API 요청을 전송합니다.
+
+    httplib2 전송 객체는 스레드 간에 공유할 수 없으므로, 공유 서비스 객체의 요청은
+    유휴 전송 객체를 빌려 실행하고 돌려놓아 연결을 재사용합니다.
+    """
+    pool = _sheets_transports.get(id(service))
+    if pool is None:
+        return request.execute()
+    
+    with _sheets_clients_lock:
+        http = pool['idle'].pop() if pool['idle'] else None
+    if http is None:
+        http = pool['http_factory'](pool['credentials'])
+    try:
+        return request.execute(http=http)
+    finally:
+        with _sheets_clients_lock:
+            pool['idle'].append(http)
+
+# 프로젝트의 분당 읽기 요청 할당량
+SHEETS_QUOTA_PER_MINUTE = int(os.getenv('SHEETS_QUOTA_PER_MINUTE', '60'))
+# 할당량 토큰을 기다리는 최대 시간 (초)
+SHEETS_QUEUE_TIMEOUT = float(os.getenv('SHEETS_QUEUE_TIMEOUT', '10'))
+# 429/5xx 응답에 대한 최대 재시도 횟수와 지수 백오프 설정 (초)
+SHEETS_MAX_RETRIES = int(os.getenv('SHEETS_MAX_RETRIES', '4'))
+SHEETS_BACKOFF_BASE = 1.0
+SHEETS_BACKOFF_MAX = 16.0
+# 재시도할 HTTP 상태 코드
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+class SheetsThrottledError(Exception):
+    """할당량 초과나 서버 오류로 Sheets API 요청을 완료하지 못한 경우 발생합니다."""
+
+class _TokenBucket:
+    """분당 할당량에 맞춰 요청 속도를 제한하는 토큰 버킷입니다."""
+    
+    def __init__(self, per_minute, capacity=None):
+        # 할당량이 0이면 토큰이 다시 차지 않아 대기 시간을 계산할 때 0으로 나누게 됩니다.
+        if per_minute <= 0:
+            raise ValueError(f"분당 할당량은 0보다 커야 합니다: {per_minute}")
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute if capacity is None else capacity)
+        if self.capacity < 1:
+            raise ValueError(f"토큰 버킷 크기는 1 이상이어야 합니다: {self.capacity:g}")
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self, timeout):
+        """토큰 하나를 얻을 때까지 기다립니다. 제한 시간 안에 얻지 못하면 False를 반환합니다."""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+_sheets_rate_limiter = _TokenBucket(SHEETS_QUOTA_PER_MINUTE)
+
+def _single_flight(inflight, lock, key, fn):
+    """같은 키로 진행 중인 호출이 있으면 fn을 다시 실행하지 않고 그 결과(또는 예외)를 함께 받습니다.
+
+    inflight는 키 -> {'event', 'result', 'error'} 사전이며 lock으로 보호합니다.
+    """
+    with lock:
+        call = inflight.get(key)
+        leader = call is None
+        if leader:
+            call = {'event': threading.Event(), 'result': None, 'error': None}
+            inflight[key] = call
+    
+    if not leader:
+        call['event'].wait()
+        if call['error'] is not None:
+            raise call['error']
+        return call['result']
+    
+    try:
+        call['result'] = fn()
+        return call['result']
+    except Exception as e:
+        call['error'] = e
+        raise
+    finally:
+        with lock:
+            del inflight[key]
+        call['event'].set()
+
+# 진행 중인 동일 요청 (요청 키 -> {'event', 'result', 'error'})
+_sheets_inflight = {}
+_sheets_inflight_lock = threading.Lock()
+
+def _response_status(error):
+    """API 오류에서 HTTP 상태 코드를 꺼냅니다."""
+    resp = getattr(error, 'resp', None)
+    status = getattr(resp, 'status', None)
+    try:
+        return int(status)
+    except (TypeError, ValueError):
+        return None
+
+def _execute_with_backoff(service, request):
+    """할당량 토큰을 얻은 뒤 요청을 보내고, 429/5xx 응답은 지터가 있는 지수 백오프로 재시도합니다."""
+    for attempt in range(SHEETS_MAX_RETRIES + 1):
+        if not _sheets_rate_limiter.acquire(SHEETS_QUEUE_TIMEOUT):
+            raise SheetsThrottledError("Sheets API 요청 할당량을 기다리는 시간이 초과되었습니다.")
+        try:
+            return _send_sheets_request(service, request)
+        except Exception as e:
+            status = _response_status(e)
+            if status not in RETRYABLE_STATUSES:
+                raise
+            if attempt == SHEETS_MAX_RETRIES:
+                raise SheetsThrottledError(f"Sheets API 요청이 계속 실패했습니다 (HTTP {status}).") from e
+            time.sleep(random.uniform(0, min(SHEETS_BACKOFF_MAX, SHEETS_BACKOFF_BASE * 2 ** attempt)))
+
+def _execute_sheets_request(service, request, key=None):
+    """할당량을 지키며 Sheets API 요청을 실행합니다.
+
+    key가 주어지면 같은 키로 이미 진행 중인 요청이 있을 때 새로 보내지 않고 그 결과를 함께 받습니다.
+    반환된 결과는 여러 호출자가 공유하므로 수정하지 말아야 합니다.
+    """
+    if key is None:
+        return _execute_with_backoff(service, request)
+    
+    return _single_flight(_sheets_inflight, _sheets_inflight_lock, (id(service),) + tuple(key),
+                          lambda: _execute_with_backoff(service, request))
+
+def _streamlit_secret(name):
+    """st.secrets의 값을 반환합니다. secrets.toml이 없으면 (명령줄 실행 포함) None을 반환합니다."""
+    try:
+        return st.secrets[name] if name in st.secrets else None
+    except FileNotFoundError:
+        return None
+
+def get_google_sheets_service(http_factory=None):
+    """구글 스프레드시트 서비스 객체를 반환합니다. 같은 인증 정보라면 프로세스 전체에서 재사용합니다.
+
+    http_factory(credentials)를 지정하면 기본 전송 객체 대신 그 함수가 만든 전송 객체로 요청을 보냅니다.
+    """
+    try:
+        # Streamlit Cloud 환경에서 실행 중인 경우
+        credentials_json = _streamlit_secret('GOOGLE_CREDENTIALS')
+        if credentials_json is not None:
+            _report_credential_source('secrets', "Streamlit Cloud 환경에서 인증 정보를 성공적으로 로드했습니다.")
+        else:
+            # 로컬 환경에서 실행 중인 경우
+            credentials_path = os.getenv('GOOGLE_CREDENTIALS_PATH')
+            
+            # 직접 경로 지정 (개발 환경용)
+            if not credentials_path:
+                # 기본 경로 시도
+                if os.path.exists('credentials.json'):
+                    credentials_path = 'credentials.json'
+                    _report_credential_source('default-file', "현재 디렉토리의 credentials.json 파일을 사용합니다.", level='info')
+                else:
+                    # 인증 파일 업로드 기능으로 설정된 경우 (Streamlit 세션에서만)
+                    if st.runtime.exists() and 'google_credentials' in st.session_state:
+                        return _get_pooled_service(st.session_state['google_credentials'], http_factory)
+                    else:
+                        report("Google API 인증 정보가 설정되지 않았습니다.", level='error')
+                        report("다음 방법 중 하나로 Google API 인증 정보를 설정해주세요:")
+                        report("1. 환경 변수 GOOGLE_CREDENTIALS_PATH에 인증 파일 경로 설정")
+                        report("2. 프로젝트 루트 디렉토리에 credentials.json 파일 위치시키기")
+                        report("3. 사이드바에서 인증 파일 업로드")
+                        report("4. Streamlit Cloud를 사용하는 경우 st.secrets에 GOOGLE_CREDENTIALS 설정")
+                        return None
+            
+            credentials_json = _read_credentials_file(credentials_path)
+            _report_credential_source(f"file:{credentials_path}", f"{credentials_path}에서 인증 정보를 성공적으로 로드했습니다.")
+        
+        return _get_pooled_service(credentials_json, http_factory)
+    except FileNotFoundError:
+        report(f"인증 파일을 찾을 수 없습니다. 경로를 확인해주세요.", level='error')
+        return None
+    except json.JSONDecodeError:
+        report("인증 파일이 올바른 JSON 형식이 아닙니다.", level='error')
+        return None
+    except Exception as e:
+        report(f"구글 스프레드시트 서비스 생성 중 오류가 발생했습니다: {str(e)}", level='error')
+        return None
+
+def normalize_sheet_range(spreadsheet_id, range_name):
+    """스프레드시트 ID와 범위를 API 요청에 맞게 정규화합니다."""
+    spreadsheet_id = spreadsheet_id.strip()
+    range_name = range_name.strip()
+    
+    # 스프레드시트 ID와 범위가 뒤바뀐 경우를 확인
+    if '!' in spreadsheet_id and not '!' in range_name:
+        spreadsheet_id, range_name = range_name, spreadsheet_id
+        report("스프레드시트 ID와 범위가 교정되었습니다.")
+    
+    # 시트 이름에 특수 문자가 있는 경우 작은따옴표로 감싸기
+    if '!' in range_name:
+        sheet_name, cell_range = range_name.split('!', 1)
+        if ('.' in sheet_name or ' ' in sheet_name) and not (sheet_name.startswith("'") and sheet_name.endswith("'")):
+            sheet_name = f"'{sheet_name}'"
+        range_name = f"{sheet_name}!{cell_range}"
+    
+    return spreadsheet_id, range_name
+
+def _fetch_sheet_values(service, spreadsheet_id, range_name):
+    """정규화된 범위의 셀 값을 행 목록으로 가져옵니다."""
+    sheet = service.spreadsheets()
+    result = _execute_sheets_request(
+        service, sheet.values().get(spreadsheetId=spreadsheet_id, range=range_name),
+        key=('get', spreadsheet_id, range_name))
+    return result.get('values', [])
+
+def get_sheet_data(service, spreadsheet_id, range_name):
+    """구글 스프레드시트에서 데이터를 가져옵니다.
+
+    세션 간에 공유하는 스냅샷(get_sheet_snapshot)을 거치므로 여러 세션이 동시에 요청해도
+    시트는 한 번만 내려받고 파싱합니다. 데이터프레임은 호출자마다 새로 만들어 반환합니다.
+    """
+    try:
+        table = get_sheet_snapshot(service, spreadsheet_id, range_name)
+        return None if table is None else table.to_frame()
+    except Exception as e:
+        report(f"데이터를 가져오는 중 오류가 발생했습니다: {str(e)}", level='error')
+        return None
+
+# 구글 설문지 질문 -> 분석용 컬럼명 (기존 컬럼명과 새로운 컬럼명 매핑)
+SURVEY_COLUMN_MAP = {
+    '타임스탬프': '타임스탬프',
+    '📌 학생 번호를 선택하세요.': '학번',
+    '🧑‍🎓 학생 이름을 입력하세요.': '학생 이름',
+    '🤩 오늘 수학 수업이 기대돼요. (1점: 전혀 기대되지 않아요 ~ 5점: 매우 기대돼요)': '수업 기대도',
+    '😨 오늘 수학 수업이 좀 긴장돼요. (1점: 전혀 긴장되지 않아요 ~ 5점: 매우 긴장돼요)': '긴장도',
+    '🎲 오늘 배우는 수학 내용이 재미있을 것 같아요. (1점: 전혀 재미없을 것 같아요 ~ 5점: 매우 재미있을 것 같아요)': '재미 예상도',
+    '💪 오늘 수업을 잘 해낼 자신이 있어요. (1점: 전혀 자신 없어요 ~ 5점: 매우 자신 있어요)': '자신감',
+    '🎯 지금 수업에 집중하고 있어요. (1점: 전혀 집중하지 못해요 ~ 5점: 완전히 집중하고 있어요)': '집중도',
+    '😆 지금 수업이 즐거워요. (1점: 전혀 즐겁지 않아요 ~ 5점: 매우 즐거워요)': '즐거움',
+    '🌟 이제 수학 공부에 자신감이 더 생겼어요. (1점: 전혀 그렇지 않아요 ~ 5점: 매우 그래요)': '자신감 변화',
+    '🎉 수업 후에 수학이 전보다 더 재미있어졌어요. (1점: 전혀 그렇지 않아요 ~ 5점: 매우 그래요)': '재미 변화',
+    '😌 수업 후에는 수학 시간에 전보다 덜 긴장돼요. (1점: 전혀 그렇지 않아요 ~ 5점: 매우 그래요)': '긴장도 변화',
+    '🧠 오늘 수업 내용을 잘 이해했어요. (1점: 전혀 이해하지 못했어요 ~ 5점: 매우 잘 이해했어요)': '이해도',
+    '📋 ✏️ 오늘 배운 수학 내용을 한 줄로 요약해 보세요.': '수업 요약',
+    '📋 💭 오늘 수업에서 스스로 잘한 점이나 아쉬운 점을 한 문장으로 적어 보세요.': '자기 평가'
+}
+
+# 1~5점 척도 설문 문항
+SURVEY_ITEMS = ['수업 기대도', '긴장도', '재미 예상도', '자신감', '집중도', 
+                '즐거움', '자신감 변화', '재미 변화', '긴장도 변화', '이해도']
+
+# 범주형으로 저장하는 컬럼 (값의 종류가 적고 행마다 반복됨)
+CATEGORICAL_COLUMNS = ['학번', '학생 이름']
+
+# 구글 설문지 타임스탬프 형식 (예: 2025. 3. 20 오후 1:23:45)
+FORM_TIMESTAMP_FORMAT = '%Y. %m. %d %p %I:%M:%S'
+
+@functools.lru_cache(maxsize=64)
+def _compile_header_map(headers):
+    """헤더 행을 분석용 컬럼명 목록으로 변환합니다. 같은 헤더는 한 번만 계산합니다."""
+    # 매핑되지 않은 컬럼은 원래 이름 유지
+    return tuple(SURVEY_COLUMN_MAP.get(header, header) for header in headers)
+
+def _likert_array(raw):
+    """문자열 값 배열을 1~5 범위의 Int8 값과 결측 마스크로 변환합니다. 범위를 벗어난 값은 결측 처리합니다."""
+    # 응답 값의 종류는 몇 개뿐이므로 고유값만 숫자로 변환한 뒤 펼칩니다.
+    codes, uniques = pd.factorize(raw.ravel(), use_na_sentinel=True)
+    unique_numbers = pd.to_numeric(pd.Series(uniques, dtype=object), errors='coerce').to_numpy(dtype=float)
+    unique_numbers = np.append(unique_numbers, np.nan)
+    numbers = unique_numbers[codes]
+    valid = (numbers >= 1) & (numbers <= 5) & (numbers == np.round(numbers))
+    scores = np.where(valid, numbers, 0).astype(np.int8)
+    return scores.reshape(raw.shape), ~valid.reshape(raw.shape)
+
+def _parse_form_timestamps(raw):
+    """구글 설문지 타임스탬프(오전/오후 표기)와 ISO 형식 문자열을 datetime으로 변환합니다."""
+    text = pd.Series(raw, dtype=object).astype('string')
+    localized = text.str.replace('오전', 'AM', regex=False).str.replace('오후', 'PM', regex=False)
+    result = pd.to_datetime(localized, format=FORM_TIMESTAMP_FORMAT, errors='coerce')
+    
+    rest = result.isna() & text.notna()
+    if rest.any():
+        result[rest] = pd.to_datetime(text[rest], errors='coerce', format='ISO8601')
+    return result.to_numpy(dtype='datetime64[ns]')
+
+def _parse_sheet_table(values, report_missing=True):
+    """스프레드시트 셀 값(헤더 행 + 데이터 행)을 데이터프레임을 거치지 않고 바로 SurveyTable로 변환합니다."""
+    if not values:
+        report("데이터가 없습니다.", level='warning')
+        return None
+    
+    # 헤더 행과 실제 데이터 행
+    headers = tuple(values[0])
+    width = len(headers)
+    columns = _compile_header_map(headers)
+    
+    # 행 길이를 헤더에 맞춰 한 번에 맞추기 (부족한 셀은 None, 초과 셀은 제거)
+    rows = [row if len(row) == width else (row[:width] + [None] * (width - len(row)))
+            for row in values[1:]]
+    raw = np.empty((len(rows), width), dtype=object)
+    if rows:
+        raw[:] = rows
+    
+    # 컬럼 존재 여부 확인 및 경고
+    missing_columns = [col for col in SURVEY_ITEMS if col not in columns]
+    if missing_columns and report_missing:
+        report(f"다음 컬럼을 찾을 수 없습니다: {', '.join(missing_columns)}", level='warning')
+        report(f"사용 가능한 컬럼 목록: {', '.join(map(str, columns))}")
+    
+    return SurveyTable.from_raw(columns, raw)
+
+# 타임스탬프 결측값 (pandas NaT의 int64 표현)
+_NAT_INT64 = np.iinfo(np.int64).min
+
+def _code_dtype(n_categories):
+    """범주 수에 맞는 가장 작은 정수 코드 타입을 고릅니다."""
+    if n_categories < np.iinfo(np.int8).max:
+        return np.int8
+    if n_categories < np.iinfo(np.int16).max:
+        return np.int16
+    return np.int32
+
+def _freeze(array):
+    """배열을 쓰기 금지 상태로 만들어 반환합니다."""
+    array.setflags(write=False)
+    return array
+
+class SurveyTable:
+    """설문 데이터를 압축해 저장하는 읽기 전용 표입니다.
+
+    척도 문항은 int8 점수 행렬(scores, 결측은 0)과 비트 단위로 압축한 결측 마스크로,
+    학생 이름·학번·텍스트 응답은 범주 사전(코드 배열 + 범주 목록)으로,
+    타임스탬프는 int64(ns)로 저장합니다. 모든 배열은 쓰기 금지 상태이므로
+    여러 세션이 같은 표를 복사 없이 공유할 수 있습니다.
+    """
+    
+    def __init__(self, items, scores, missing, timestamps, text_columns, column_order):
+        self.items = tuple(items)
+        self.scores = _freeze(scores)
+        self._missing_bits = _freeze(np.packbits(missing, axis=1))
+        self.timestamps = _freeze(timestamps)
+        # 컬럼명 -> (코드 배열, 범주 배열), 결측은 코드 -1
+        self.text_columns = {
+            name: (_freeze(codes), _freeze(categories)) for name, (codes, categories) in text_columns.items()
+        }
+        self.column_order = tuple(column_order)
+        self._item_positions = {item: i for i, item in enumerate(self.items)}
+        self._student_index = None
+        self._fingerprint = None
+        # 기간 단위 -> SurveyRollup
+        self._rollups = {}
+        # 문항별·반별 통계 (SurveyStats)
+        self._stats = None
+    
+    @classmethod
+    def from_frame(cls, df):
+        """설문 데이터프레임(구글 시트, CSV, 예제 데이터)으로 표를 만듭니다."""
+        df = df.loc[:, ~df.columns.duplicated()]
+        items = [item for item in SURVEY_ITEMS if item in df.columns]
+        n_rows = len(df)
+        
+        if items:
+            scores, missing = _likert_array(df[items].astype(object).to_numpy())
+        else:
+            scores = np.zeros((n_rows, 0), dtype=np.int8)
+            missing = np.zeros((n_rows, 0), dtype=bool)
+        
+        if '타임스탬프' in df.columns:
+            column = df['타임스탬프']
+            if not pd.api.types.is_datetime64_any_dtype(column):
+                column = _parse_form_timestamps(column.astype(object).to_numpy())
+            timestamps = pd.DatetimeIndex(column).as_unit('ns').asi8.copy()
+        else:
+            timestamps = np.full(n_rows, _NAT_INT64, dtype=np.int64)
+        
+        text_columns = {}
+        for name in df.columns:
+            if name in items or name == '타임스탬프':
+                continue
+            codes, categories = pd.factorize(df[name], use_na_sentinel=True)
+            categories = np.asarray(categories, dtype=object)
+            text_columns[name] = (codes.astype(_code_dtype(len(categories))), categories)
+        
+        return cls(items, scores, missing, timestamps, text_columns, df.columns)
+    
+    @classmethod
+    def from_raw(cls, columns, raw):
+        """문자열 셀 값 배열(행 x 컬럼)과 분석용 컬럼명으로 데이터프레임을 거치지 않고 표를 만듭니다.
+
+        같은 이름의 컬럼이 여러 개면 첫 번째만 사용합니다.
+        """
+        positions = {}
+        for i, name in enumerate(columns):
+            positions.setdefault(name, i)
+        items = [item for item in SURVEY_ITEMS if item in positions]
+        n_rows = len(raw)
+        
+        if items:
+            scores, missing = _likert_array(raw[:, [positions[item] for item in items]])
+        else:
+            scores = np.zeros((n_rows, 0), dtype=np.int8)
+            missing = np.zeros((n_rows, 0), dtype=bool)
+        
+        if '타임스탬프' in positions:
+            timestamps = _parse_form_timestamps(raw[:, positions['타임스탬프']]).view(np.int64)
+        else:
+            timestamps = np.full(n_rows, _NAT_INT64, dtype=np.int64)
+        
+        text_columns = {}
+        for name, i in positions.items():
+            if name in items or name == '타임스탬프':
+                continue
+            codes, categories = pd.factorize(raw[:, i], use_na_sentinel=True)
+            categories = np.asarray(categories, dtype=object)
+            text_columns[name] = (codes.astype(_code_dtype(len(categories))), categories)
+        
+        return cls(items, scores, missing, timestamps, text_columns, list(positions))
+    
+    @classmethod
+    def concat(cls, tables):
+        """여러 표를 행 방향으로 이어 붙입니다. 범주 사전은 합쳐서 다시 부호화합니다."""
+        tables = [table for table in tables if table is not None]
+        if len(tables) == 1:
+            return tables[0]
+        
+        items = [item for item in SURVEY_ITEMS if all(item in table.items for table in tables)]
+        scores = np.concatenate([table.item_scores(items) for table in tables])
+        missing = np.concatenate([table.item_missing(items) for table in tables])
+        timestamps = np.concatenate([table.timestamps for table in tables])
+        
+        column_order = []
+        for table in tables:
+            for name in table.column_order:
+                if name not in column_order and (name not in SURVEY_ITEMS or name in items):
+                    column_order.append(name)
+        
+        text_columns = {}
+        for name in column_order:
+            if name in items or name == '타임스탬프':
+                continue
+            merged = {}
+            code_parts = []
+            for table in tables:
+                if name in table.text_columns:
+                    codes, categories = table.text_columns[name]
+                    remap = np.array([merged.setdefault(value, len(merged)) for value in categories] + [-1],
+                                     dtype=np.int64)
+                    code_parts.append(remap[codes])
+                else:
+                    code_parts.append(np.full(len(table), -1, dtype=np.int64))
+            categories = np.empty(len(merged), dtype=object)
+            categories[:] = list(merged)
+            text_columns[name] = (np.concatenate(code_parts).astype(_code_dtype(len(merged))), categories)
+        
+        return cls(items, scores, missing, timestamps, text_columns, column_order)
+    
+    def append(self, other):
+        """다른 표의 행을 뒤에 이어 붙인 새 표를 반환합니다.
+
+        이미 만들어 둔 기간별 집계와 문항 통계는 전체를 다시 계산하지 않고 새 행만 더해 새 표로 이어받습니다.
+        """
+        table = SurveyTable.concat([self, other])
+        if table is not self:
+            table._rollups = {period: rollup.extend(table) for period, rollup in self._rollups.items()}
+            if self._stats is not None:
+                table._stats = self._stats.extend(table)
+        return table
+    
+    def __len__(self):
+        return len(self.timestamps)
+    
+    @property
+    def fingerprint(self):
+        """표 내용의 해시 (같은 데이터면 세션이나 로드 시점과 관계없이 같은 값)"""
+        if self._fingerprint is None:
+            digest = hashlib.sha1()
+            digest.update(json.dumps([self.items, [str(name) for name in self.column_order]]).encode())
+            digest.update(self.scores.tobytes())
+            digest.update(self._missing_bits.tobytes())
+            digest.update(self.timestamps.tobytes())
+            for name in sorted(self.text_columns, key=str):
+                codes, categories = self.text_columns[name]
+                digest.update(str(name).encode())
+                digest.update(codes.astype(np.int32).tobytes())
+                digest.update('\x1f'.join(str(value) for value in categories).encode())
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+    
+    @property
+    def missing(self):
+        """척도 문항의 결측 마스크 (행 x 문항)"""
+        return np.unpackbits(self._missing_bits, axis=1, count=len(self.items)).astype(bool)
+    
+    @property
+    def nbytes(self):
+        """표가 차지하는 대략적인 메모리 크기 (바이트)"""
+        total = self.scores.nbytes + self._missing_bits.nbytes + self.timestamps.nbytes
+        for codes, categories in self.text_columns.values():
+            total += codes.nbytes + categories.nbytes
+            total += sum(sys.getsizeof(value) for value in categories)
+        return total
+    
+    def has_column(self, name):
+        """컬럼이 있는지 확인합니다."""
+        return name in self._item_positions or name in self.text_columns or (
+            name == '타임스탬프' and '타임스탬프' in self.column_order)
+    
+    def with_constant(self, name, value):
+        """모든 행의 값이 같은 범주 컬럼을 추가한 새 표를 반환합니다. (예: 반 이름)"""
+        text_columns = dict(self.text_columns)
+        categories = np.empty(1, dtype=object)
+        categories[0] = value
+        text_columns[name] = (np.zeros(len(self), dtype=np.int8), categories)
+        column_order = [column for column in self.column_order if column != name] + [name]
+        return SurveyTable(self.items, self.scores, self.missing, self.timestamps, text_columns, column_order)
+    
+    def item_scores(self, items):
+        """지정한 문항들의 int8 점수 행렬을 반환합니다."""
+        return self.scores[:, [self._item_positions[item] for item in items]]
+    
+    def item_missing(self, items):
+        """지정한 문항들의 결측 마스크를 반환합니다."""
+        return self.missing[:, [self._item_positions[item] for item in items]]
+    
+    def item_matrix(self, items, rows=None):
+        """지정한 문항들의 점수를 결측이 NaN인 실수 행렬로 반환합니다."""
+        positions = [self._item_positions[item] for item in items]
+        if rows is None:
+            scores, missing = self.scores, self.missing
+        else:
+            scores = self.scores[rows]
+            missing = np.unpackbits(self._missing_bits[rows], axis=1, count=len(self.items)).astype(bool)
+        return np.where(missing[:, positions], np.nan, scores[:, positions].astype(float))
+    
+    def text_value(self, name, row):
+        """범주 컬럼의 한 행 값을 반환합니다. 결측이면 None."""
+        if name not in self.text_columns:
+            return None
+        codes, categories = self.text_columns[name]
+        code = codes[row]
+        return None if code < 0 else categories[code]
+    
+    def _build_student_index(self):
+        """학생별 행 위치 색인을 만듭니다.
+
+        행을 (학생 코드, 타임스탬프, 행 위치) 순으로 정렬한 order와 학생별 시작 위치 offsets로
+        각 학생의 응답을 시간순으로 바로 꺼낼 수 있게 하고, 학생별 최신 응답과 평균 점수를 함께 계산합니다.
+        """
+        if '학생 이름' not in self.text_columns:
+            codes = np.full(len(self), -1, dtype=np.int64)
+            categories = np.empty(0, dtype=object)
+        else:
+            codes, categories = self.text_columns['학생 이름']
+            codes = codes.astype(np.int64)
+        
+        # 같은 이름이 여러 범주로 나뉘지 않도록 문자열 기준으로 학생 번호 부여
+        names = sorted({str(name) for name in categories})
+        positions = {name: i for i, name in enumerate(names)}
+        category_to_student = np.array([positions[str(name)] for name in categories] + [-1], dtype=np.int64)
+        students = category_to_student[codes]
+        
+        valid = students >= 0
+        order = np.lexsort((np.arange(len(self)), self.timestamps, students))
+        order = order[valid[order]]
+        counts = np.bincount(students[valid], minlength=len(names))
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        
+        # 학생별 최신 응답 행과 문항별 평균 (결측 제외)
+        latest_rows = order[offsets[1:] - 1] if len(order) else np.empty(0, dtype=np.int64)
+        answered = ~self.missing[valid]
+        scores = np.where(answered, self.scores[valid], 0)
+        sums = np.column_stack([
+            np.bincount(students[valid], weights=scores[:, j], minlength=len(names))
+            for j in range(len(self.items))]) if self.items else np.zeros((len(names), 0))
+        answer_counts = np.column_stack([
+            np.bincount(students[valid], weights=answered[:, j], minlength=len(names))
+            for j in range(len(self.items))]) if self.items else np.zeros((len(names), 0))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(answer_counts > 0, sums / answer_counts, np.nan)
+        
+        return {
+            'names': names,
+            'positions': positions,
+            'order': _freeze(order),
+            'offsets': _freeze(offsets),
+            'latest_rows': _freeze(latest_rows),
+            'means': _freeze(means),
+        }
+    
+    @property
+    def student_index(self):
+        """학생별 행 위치 색인 (처음 사용할 때 한 번만 만듭니다)"""
+        if self._student_index is None:
+            self._student_index = self._build_student_index()
+        return self._student_index
+    
+    def student_names(self):
+        """응답한 학생 이름을 정렬하여 반환합니다."""
+        return list(self.student_index['names'])
+    
+    def student_rows(self, student_name):
+        """학생의 응답 행 위치를 시간순으로 반환합니다."""
+        index = self.student_index
+        student = index['positions'].get(str(student_name))
+        if student is None:
+            return np.array([], dtype=np.int64)
+        return index['order'][index['offsets'][student]:index['offsets'][student + 1]]
+    
+    def student_latest_row(self, student_name):
+        """학생의 가장 최근 응답 행 위치를 반환합니다. 없으면 None."""
+        index = self.student_index
+        student = index['positions'].get(str(student_name))
+        return None if student is None else int(index['latest_rows'][student])
+    
+    def row_labels(self, name, start=0):
+        """범주 컬럼의 start 행 이후 값을 문자열 배열로 반환합니다. 결측은 None."""
+        if name not in self.text_columns:
+            return np.full(len(self) - start, None, dtype=object)
+        codes, categories = self.text_columns[name]
+        lookup = np.empty(len(categories) + 1, dtype=object)
+        lookup[:-1] = [str(value) for value in categories]
+        lookup[-1] = None
+        return lookup[codes[start:]]
+    
+    def rollup(self, period):
+        """기간별 학생 집계(SurveyRollup)를 반환합니다. (처음 사용할 때 한 번만 만듭니다)"""
+        rollup = self._rollups.get(period)
+        if rollup is None:
+            rollup = SurveyRollup.from_table(self, period)
+            self._rollups[period] = rollup
+        return rollup
+    
+    @property
+    def stats(self):
+        """문항별·반별 점수 통계(SurveyStats) (처음 사용할 때 한 번만 만듭니다)"""
+        if self._stats is None:
+            self._stats = SurveyStats.from_table(self)
+        return self._stats
+    
+    def student_vectors(self, items, aggregate='latest'):
+        """모든 학생의 문항 점수 벡터를 (이름 목록, 학생 x 문항 행렬)로 반환합니다.
+
+        aggregate가 'latest'이면 가장 최근 응답, 'mean'이면 학생별 평균 점수를 사용하며 결측은 NaN입니다.
+        """
+        index = self.student_index
+        positions = [self._item_positions[item] for item in items]
+        if aggregate == 'mean':
+            return index['names'], index['means'][:, positions]
+        return index['names'], self.item_matrix(items, rows=index['latest_rows'])
+    
+    def to_frame(self):
+        """데이터프레임으로 변환합니다. (척도 문항은 Int8, 범주 컬럼은 범주형)"""
+        missing = self.missing
+        data = {}
+        for name in self.column_order:
+            if name in self._item_positions:
+                i = self._item_positions[name]
+                data[name] = pd.arrays.IntegerArray(self.scores[:, i].copy(), missing[:, i])
+            elif name == '타임스탬프':
+                data[name] = self.timestamps.view('datetime64[ns]')
+            elif name in self.text_columns:
+                codes, categories = self.text_columns[name]
+                data[name] = pd.Categorical.from_codes(codes.astype(np.int64), categories=pd.Index(categories, dtype=object))
+        return pd.DataFrame(data)
+
+# 장기 추이 집계 기간 단위
+ROLLUP_PERIODS = {
+    'session': '수업별',
+    'week': '주별',
+    'unit': '단원별',
+}
+
+# 단원 이름이 들어 있는 컬럼 (없으면 단원 대신 달 단위로 묶음)
+UNIT_COLUMN = '단원'
+
+# 그룹 키에서 기간 번호가 차지하는 비트 수 ((학생 번호 << 32) | 기간 번호)
+_PERIOD_BITS = 32
+
+def _period_labels(table, period, start=0):
+    """start 행 이후 각 행이 속한 기간의 이름을 반환합니다. 타임스탬프가 없는 행은 None."""
+    timestamps = table.timestamps[start:]
+    days = timestamps.view('datetime64[ns]').astype('datetime64[D]')
+    
+    if period == 'session':
+        # 설문은 수업마다 한 번 하므로 응답 날짜를 수업 회차로 봅니다.
+        dates = days
+    elif period == 'week':
+        # 월요일 기준 (1970-01-01은 목요일)
+        day_numbers = days.astype(np.int64)
+        dates = (day_numbers - (day_numbers + 3) % 7).astype('datetime64[D]')
+    elif period == 'unit':
+        if UNIT_COLUMN in table.text_columns:
+            labels = table.row_labels(UNIT_COLUMN, start)
+            labels[pd.isna(labels)] = '단원 미지정'
+            labels[timestamps == _NAT_INT64] = None
+            return labels
+        dates = days.astype('datetime64[M]')
+    else:
+        raise ValueError(f"알 수 없는 기간 단위입니다: {period}")
+    
+    labels = np.datetime_as_string(dates).astype(object)
+    labels[timestamps == _NAT_INT64] = None
+    return labels
+
+class SurveyRollup:
+    """학생별·기간별(수업, 주, 단원) 문항 점수 합계와 응답 수를 누적한 집계입니다.
+
+    (학생, 기간) 묶음마다 문항별 점수 합계·응답 수와 제출 횟수만 보관하므로 크기가 행 수가 아니라
+    학생 수 x 기간 수에 비례합니다. 표에 행이 추가되면 extend()로 새 행만 더한 새 집계를 만들며,
+    만들어진 집계는 바꾸지 않으므로 여러 세션이 함께 읽을 수 있습니다.
+    """
+    
+    def __init__(self, period, axis_label, items, n_rows, students, periods, period_first,
+                 group_keys, sums, counts, responses):
+        self.period = period
+        # 차트 가로축 이름
+        self.axis_label = axis_label
+        self.items = tuple(items)
+        # 집계에 반영한 표의 행 수
+        self.n_rows = n_rows
+        # 학생 이름과 기간 이름 (번호 = 위치), 기간별 첫 응답 시각 (ns)
+        self.students = tuple(students)
+        self.periods = tuple(periods)
+        self.period_first = _freeze(period_first)
+        # 정렬된 (학생, 기간) 그룹 키와 그룹별 문항 점수 합계, 문항 응답 수, 제출 횟수
+        self.group_keys = _freeze(group_keys)
+        self.sums = _freeze(sums)
+        self.counts = _freeze(counts)
+        self.responses = _freeze(responses)
+        self._student_positions = {name: i for i, name in enumerate(self.students)}
+        self._item_positions = {item: i for i, item in enumerate(self.items)}
+    
+    @classmethod
+    def from_table(cls, table, period):
+        """표 전체로 집계를 만듭니다."""
+        items = table.items
+        if period == 'session':
+            axis_label = '수업일'
+        elif period == 'week':
+            axis_label = '주 (월요일 기준)'
+        else:
+            axis_label = '단원' if UNIT_COLUMN in table.text_columns else '단원 (월별)'
+        empty = cls(period, axis_label, items, 0, (), (), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64),
+                    np.zeros((0, len(items))), np.zeros((0, len(items)), dtype=np.int64),
+                    np.zeros(0, dtype=np.int64))
+        return empty.extend(table)
+    
+    def extend(self, table):
+        """표에서 아직 반영하지 않은 행(n_rows 이후)만 더한 새 집계를 반환합니다.
+
+        문항 구성이 달라졌거나 행이 줄었으면 표 전체로 다시 만듭니다.
+        """
+        if table.items != self.items or len(table) < self.n_rows:
+            return SurveyRollup.from_table(table, self.period)
+        start = self.n_rows
+        if start == len(table):
+            return self
+        
+        student_labels = table.row_labels('학생 이름', start)
+        period_labels = _period_labels(table, self.period, start)
+        valid = ~(pd.isna(student_labels) | pd.isna(period_labels))
+        
+        # 새 행의 학생·기간 이름을 기존 번호에 이어서 부여
+        student_positions = dict(self._student_positions)
+        student_names, student_inverse = np.unique(student_labels[valid].astype(str), return_inverse=True)
+        student_ids = np.array([student_positions.setdefault(name, len(student_positions)) for name in student_names],
+                               dtype=np.int64)
+        period_positions = {name: i for i, name in enumerate(self.periods)}
+        period_names, period_inverse = np.unique(period_labels[valid].astype(str), return_inverse=True)
+        period_ids = np.array([period_positions.setdefault(name, len(period_positions)) for name in period_names],
+                              dtype=np.int64)
+        new_students = student_ids[student_inverse] if len(student_ids) else np.empty(0, dtype=np.int64)
+        new_periods = period_ids[period_inverse] if len(period_ids) else np.empty(0, dtype=np.int64)
+        
+        # 기간별 첫 응답 시각
+        period_first = np.full(len(period_positions), np.iinfo(np.int64).max, dtype=np.int64)
+        period_first[:len(self.periods)] = self.period_first
+        np.minimum.at(period_first, new_periods, table.timestamps[start:][valid])
+        
+        # 기존 그룹과 새 행의 그룹을 합쳐 다시 번호를 매기고, 새 행만 더합니다.
+        new_keys = (new_students << _PERIOD_BITS) | new_periods
+        group_keys, inverse = np.unique(np.concatenate([self.group_keys, new_keys]), return_inverse=True)
+        old_groups, new_groups = inverse[:len(self.group_keys)], inverse[len(self.group_keys):]
+        n_groups = len(group_keys)
+        
+        values = table.item_matrix(self.items, rows=slice(start, None))[valid]
+        answered = ~np.isnan(values)
+        values = np.where(answered, values, 0)
+        sums = np.zeros((n_groups, len(self.items)))
+        counts = np.zeros((n_groups, len(self.items)), dtype=np.int64)
+        responses = np.zeros(n_groups, dtype=np.int64)
+        sums[old_groups] = self.sums
+        counts[old_groups] = self.counts
+        responses[old_groups] = self.responses
+        for j in range(len(self.items)):
+            sums[:, j] += np.bincount(new_groups, weights=values[:, j], minlength=n_groups)
+            counts[:, j] += np.bincount(new_groups, weights=answered[:, j], minlength=n_groups).astype(np.int64)
+        responses += np.bincount(new_groups, minlength=n_groups)
+        
+        return SurveyRollup(self.period, self.axis_label, self.items, len(table), list(student_positions), list(period_positions),
+                            period_first, group_keys, sums, counts, responses)
+    
+    def _means(self, sums, counts, items):
+        """합계와 응답 수로 문항 평균을 계산합니다. 응답이 없으면 NaN."""
+        positions = [self._item_positions[item] for item in items]
+        sums, counts = sums[:, positions], counts[:, positions]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+    
+    def student_series(self, student_name, items):
+        """학생의 기간별 문항 평균을 (기간 이름 목록, 기간 x 문항 행렬)로 시간순으로 반환합니다."""
+        student = self._student_positions.get(str(student_name))
+        if student is None:
+            return [], np.empty((0, len(items)))
+        lo, hi = np.searchsorted(self.group_keys, [student << _PERIOD_BITS, (student + 1) << _PERIOD_BITS])
+        periods = self.group_keys[lo:hi] & ((1 << _PERIOD_BITS) - 1)
+        order = np.argsort(self.period_first[periods], kind='stable')
+        means = self._means(self.sums[lo:hi][order], self.counts[lo:hi][order], items)
+        return [self.periods[period] for period in periods[order]], means
+    
+    def class_series(self, items):
+        """반 전체의 기간별 문항 평균과 응답한 학생 수를 (기간 이름 목록, 기간 x 문항 행렬, 학생 수)로 반환합니다."""
+        periods = self.group_keys & ((1 << _PERIOD_BITS) - 1)
+        n_periods = len(self.periods)
+        sums = np.column_stack([
+            np.bincount(periods, weights=self.sums[:, j], minlength=n_periods) for j in range(len(self.items))
+        ]) if self.items else np.zeros((n_periods, 0))
+        counts = np.column_stack([
+            np.bincount(periods, weights=self.counts[:, j], minlength=n_periods) for j in range(len(self.items))
+        ]) if self.items else np.zeros((n_periods, 0))
+        students = np.bincount(periods, minlength=n_periods)
+        order = np.argsort(self.period_first, kind='stable')
+        return [self.periods[period] for period in order], self._means(sums[order], counts[order], items), students[order]
+
+class SurveyStats:
+    """문항별·반별 점수 통계(평균, 표준편차, 쌍별 상관계수)를 누적한 집계입니다.
+
+    전체와 반('반' 컬럼)마다 문항 쌍 (i, j)를 모두 응답한 행의 수와, 그 행들에서 문항 i의 평균·편차 제곱합,
+    두 문항의 공편차 합을 보관합니다. 새 행은 묶음 통계를 구해 Welford(Chan) 방식으로 기존 값과 합치므로
+    지난 행을 다시 훑지 않고 문항 수의 제곱에 비례하는 계산만 더해집니다. 결측은 0으로 채우지 않고
+    해당 문항(쌍)에서만 빼므로 결과는 pandas의 mean/std/corr(쌍별 완전 관측)와 같습니다.
+    """
+    
+    def __init__(self, items, n_rows, cohorts, counts, means, m2, comoments):
+        self.items = tuple(items)
+        # 집계에 반영한 표의 행 수
+        self.n_rows = n_rows
+        # 반 이름 (집계 배열의 번호 = 위치 + 1, 0번은 전체)
+        self.cohorts = tuple(cohorts)
+        # (반, 문항 i, 문항 j) 배열: 쌍 응답 수, 쌍 응답 행에서 문항 i의 평균과 편차 제곱합, 공편차 합
+        self.counts = _freeze(counts)
+        self.means = _freeze(means)
+        self.m2 = _freeze(m2)
+        self.comoments = _freeze(comoments)
+        self._cohort_positions = {name: i + 1 for i, name in enumerate(self.cohorts)}
+        self._item_positions = {item: i for i, item in enumerate(self.items)}
+    
+    @classmethod
+    def from_table(cls, table):
+        """표 전체로 집계를 만듭니다."""
+        k = len(table.items)
+        zeros = np.zeros((1, k, k))
+        empty = cls(table.items, 0, (), np.zeros((1, k, k), dtype=np.int64), zeros, zeros, zeros)
+        return empty.extend(table)
+    
+    @staticmethod
+    def _batch(values, answered):
+        """행 묶음의 (쌍 응답 수, 평균, 편차 제곱합, 공편차 합)을 문항 x 문항 행렬로 계산합니다."""
+        weights = answered.astype(float)
+        x = np.where(answered, values, 0.0)
+        counts = weights.T @ weights
+        # sums[i, j]: 문항 j도 응답한 행에서 문항 i 점수의 합
+        sums = x.T @ weights
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(counts > 0, sums / np.maximum(counts, 1), 0.0)
+        m2 = np.maximum((x * x).T @ weights - sums * means, 0.0)
+        comoments = x.T @ x - sums * means.T
+        return counts, means, m2, comoments
+    
+    @staticmethod
+    def _merge(current, batch):
+        """두 묶음의 통계를 합칩니다. (Chan 등의 병렬 분산 공식)"""
+        counts_a, means_a, m2_a, comoments_a = current
+        counts_b, means_b, m2_b, comoments_b = batch
+        counts = counts_a + counts_b
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(counts > 0, counts_b / np.maximum(counts, 1), 0.0)
+        delta = means_b - means_a
+        factor = counts_a * weight
+        means = means_a + delta * weight
+        m2 = m2_a + m2_b + delta * delta * factor
+        comoments = comoments_a + comoments_b + delta * np.swapaxes(delta, -1, -2) * factor
+        return counts, means, m2, comoments
+    
+    def extend(self, table):
+        """표에서 아직 반영하지 않은 행(n_rows 이후)만 더한 새 집계를 반환합니다.
+
+        문항 구성이 달라졌거나 행이 줄었으면 표 전체로 다시 만듭니다.
+        """
+        if table.items != self.items or len(table) < self.n_rows:
+            return SurveyStats.from_table(table)
+        start = self.n_rows
+        if start == len(table):
+            return self
+        
+        values = table.item_matrix(self.items, rows=slice(start, None))
+        answered = ~np.isnan(values)
+        
+        # 새 행의 반 이름을 기존 번호에 이어서 부여
+        cohort_labels = table.row_labels(SOURCE_COLUMN, start)
+        cohort_rows = np.flatnonzero(~pd.isna(cohort_labels))
+        cohort_positions = dict(self._cohort_positions)
+        cohort_names, cohort_inverse = np.unique(cohort_labels[cohort_rows].astype(str), return_inverse=True)
+        cohort_ids = [cohort_positions.setdefault(name, len(cohort_positions) + 1) for name in cohort_names]
+        
+        n_cohorts = len(cohort_positions) + 1
+        k = len(self.items)
+        current = []
+        for array in (self.counts, self.means, self.m2, self.comoments):
+            grown = np.zeros((n_cohorts, k, k), dtype=array.dtype)
+            grown[:len(array)] = array
+            current.append(grown)
+        batch = [np.zeros((n_cohorts, k, k)) for _ in current]
+        groups = [(0, slice(None))] + [
+            (cohort_id, cohort_rows[cohort_inverse == g]) for g, cohort_id in enumerate(cohort_ids)]
+        for target, rows in groups:
+            for array, value in zip(batch, self._batch(values[rows], answered[rows])):
+                array[target] = value
+        
+        counts, means, m2, comoments = self._merge(current, batch)
+        return SurveyStats(self.items, len(table), list(cohort_positions), counts.astype(np.int64),
+                           means, m2, comoments)
+    
+    def _cohort(self, cohort):
+        """반 이름의 집계 번호를 반환합니다. (None이면 전체)"""
+        if cohort is None:
+            return 0
+        position = self._cohort_positions.get(str(cohort))
+        if position is None:
+            raise KeyError(f"'{cohort}' 반을 찾을 수 없습니다.")
+        return position
+    
+    def _block(self, array, items, cohort):
+        """집계 배열에서 반과 문항에 해당하는 문항 x 문항 블록을 꺼냅니다."""
+        positions = [self._item_positions[item] for item in items]
+        return array[self._cohort(cohort)][np.ix_(positions, positions)]
+    
+    def item_counts(self, items, cohort=None):
+        """문항별 응답 수를 반환합니다."""
+        return np.diagonal(self._block(self.counts, items, cohort)).copy()
+    
+    def item_means(self, items, cohort=None):
+        """문항별 평균을 반환합니다. 응답이 없으면 NaN."""
+        counts = self.item_counts(items, cohort)
+        return np.where(counts > 0, np.diagonal(self._block(self.means, items, cohort)), np.nan)
+    
+    def item_stds(self, items, cohort=None, ddof=1):
+        """문항별 표준편차를 반환합니다. 응답 수가 ddof 이하이면 NaN."""
+        counts = self.item_counts(items, cohort)
+        m2 = np.diagonal(self._block(self.m2, items, cohort))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(counts > ddof, np.sqrt(m2 / np.maximum(counts - ddof, 1)), np.nan)
+    
+    def correlation(self, items, cohort=None):
+        """두 문항을 모두 응답한 행만으로 구한 문항 x 문항 상관계수 행렬을 반환합니다.
+
+        응답이 2개 미만이거나 분산이 0인 쌍은 NaN입니다.
+        """
+        counts = self._block(self.counts, items, cohort)
+        m2 = self._block(self.m2, items, cohort)
+        comoments = self._block(self.comoments, items, cohort)
+        denominator = np.sqrt(m2 * m2.T)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            correlation = np.where((counts > 1) & (denominator > 0), comoments / denominator, np.nan)
+        return np.clip(correlation, -1.0, 1.0)
+
+# 데이터프레임별로 만든 표 (id -> (약한 참조, 표))
+_survey_table_cache = {}
+_survey_table_cache_lock = threading.Lock()
+
+def as_survey_table(data):
+    """데이터프레임이나 표를 SurveyTable로 변환합니다. 같은 데이터프레임은 한 번만 변환합니다."""
+    if data is None or isinstance(data, SurveyTable):
+        return data
+    
+    key = id(data)
+    with _survey_table_cache_lock:
+        cached = _survey_table_cache.get(key)
+    if cached is not None and cached[0]() is data:
+        return cached[1]
+    
+    table = SurveyTable.from_frame(data)
+    
+    def _discard(_, key=key):
+        with _survey_table_cache_lock:
+            _survey_table_cache.pop(key, None)
+    with _survey_table_cache_lock:
+        _survey_table_cache[key] = (weakref.ref(data, _discard), table)
+    return table
+
+# 디스크 스냅샷 저장소 위치 (기본값은 사용하지 않음)
+# 학생 설문 응답이 디스크에 남으므로 원할 때만 지정합니다. (예: ~/.cache/mathemotion/snapshots)
+SNAPSHOT_STORE_DIR = os.path.expanduser(os.getenv('SNAPSHOT_STORE_DIR', ''))
+
+# 디스크 스냅샷 저장소의 최대 크기 (바이트, 넘으면 오래된 파일부터 삭제)
+SNAPSHOT_STORE_MAX_BYTES = int(os.getenv('SNAPSHOT_STORE_MAX_BYTES', str(512 * 1024 * 1024)))
+
+# 저장 형식 버전 (형식이 바뀌면 이전 파일은 무시)
+_SNAPSHOT_STORE_VERSION = 1
+
+# 헤더 맵과 문항 구성의 해시 (정규화 방식이 바뀌면 이전 파일은 무시)
+_SURVEY_SCHEMA_HASH = hashlib.sha1(
+    json.dumps([SURVEY_COLUMN_MAP, SURVEY_ITEMS, CATEGORICAL_COLUMNS], ensure_ascii=False).encode()).hexdigest()
+
+# 디스크 쓰기는 화면 갱신을 막지 않도록 한 스레드에서 차례로 처리
+_snapshot_store_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='snapshot-store')
+
+def _snapshot_store_enabled():
+    """디스크 스냅샷 저장소를 사용할 수 있는지 확인합니다. (pyarrow 필요)"""
+    return bool(SNAPSHOT_STORE_DIR) and importlib.util.find_spec('pyarrow') is not None
+
+def _snapshot_store_path(source_key):
+    """출처 키에 해당하는 스냅샷 파일 경로를 반환합니다."""
+    digest = hashlib.sha1(json.dumps(list(source_key), ensure_ascii=False).encode()).hexdigest()
+    return os.path.join(SNAPSHOT_STORE_DIR, f'{digest}.arrow')
+
+def _table_to_arrow(table, metadata):
+    """SurveyTable을 Arrow 표로 변환합니다.
+
+    점수 행렬은 고정 길이 리스트(int8), 타임스탬프는 int64, 범주 컬럼은 사전 인코딩 배열로 저장하며
+    표 구성과 출처 정보는 스키마 메타데이터에 JSON으로 넣습니다.
+    """
+    import pyarrow as pa
+    
+    arrays = {'timestamps': pa.array(table.timestamps, type=pa.int64())}
+    if table.items:
+        # 결측 점수는 0이므로 결측 마스크는 따로 저장하지 않습니다.
+        arrays['scores'] = pa.FixedSizeListArray.from_arrays(pa.array(table.scores.ravel()), len(table.items))
+    for i, (name, (codes, categories)) in enumerate(table.text_columns.items()):
+        try:
+            dictionary = pa.array(categories)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # 숫자와 문자열이 섞인 범주는 문자열로 저장
+            dictionary = pa.array([str(value) for value in categories], type=pa.string())
+        indices = pa.array(codes.astype(np.int32), mask=codes < 0)
+        arrays[f'text{i}'] = pa.DictionaryArray.from_arrays(indices, dictionary)
+    
+    metadata = dict(metadata,
+                    version=_SNAPSHOT_STORE_VERSION,
+                    schema=_SURVEY_SCHEMA_HASH,
+                    items=list(table.items),
+                    text_columns=list(table.text_columns),
+                    column_order=list(table.column_order))
+    schema_metadata = {'mathemotion': json.dumps(metadata, ensure_ascii=False)}
+    return pa.table(arrays).replace_schema_metadata(schema_metadata)
+
+def _table_from_arrow(arrow_table):
+    """Arrow 표를 SurveyTable과 메타데이터로 되돌립니다. 점수와 타임스탬프는 복사하지 않고 그대로 사용합니다."""
+    import pyarrow.compute as pc
+    
+    metadata = json.loads(arrow_table.schema.metadata[b'mathemotion'])
+    items = metadata['items']
+    n_rows = arrow_table.num_rows
+    
+    timestamps = arrow_table.column('timestamps').combine_chunks().to_numpy()
+    if items:
+        scores = arrow_table.column('scores').combine_chunks().flatten().to_numpy().reshape(n_rows, len(items))
+    else:
+        scores = np.zeros((n_rows, 0), dtype=np.int8)
+    
+    text_columns = {}
+    for i, name in enumerate(metadata['text_columns']):
+        column = arrow_table.column(f'text{i}').combine_chunks()
+        categories = np.asarray(column.dictionary.to_numpy(zero_copy_only=False), dtype=object)
+        codes = pc.fill_null(column.indices, -1).to_numpy().astype(_code_dtype(len(categories)))
+        text_columns[name] = (codes, categories)
+    
+    table = SurveyTable(items, scores, scores == 0, timestamps, text_columns, metadata['column_order'])
+    return table, metadata
+
+def _write_table_snapshot(source_key, table, metadata):
+    """표를 Arrow IPC 파일로 저장하고 저장소 크기를 정리합니다."""
+    import pyarrow as pa
+    
+    path = _snapshot_store_path(source_key)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(SNAPSHOT_STORE_DIR, exist_ok=True)
+        arrow_table = _table_to_arrow(table, dict(metadata, source=list(source_key)))
+        # 메모리 매핑으로 바로 읽을 수 있도록 압축하지 않은 IPC 파일로 저장
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+                writer.write_table(arrow_table)
+        os.replace(tmp_path, path)
+        _prune_snapshot_store()
+    except Exception as e:
+        # 디스크 저장 실패는 데이터 조회에 영향을 주지 않으므로 경고만 남기고 쓰다 만 파일을 지웁니다.
+        report(f"디스크 스냅샷을 저장하지 못했습니다 ({path}): {str(e)}", level='warning')
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+def _prune_snapshot_store():
+    """저장소가 최대 크기를 넘으면 가장 오래 갱신되지 않은 파일부터 삭제합니다."""
+    entries = []
+    for entry in os.scandir(SNAPSHOT_STORE_DIR):
+        if entry.name.endswith('.arrow'):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= SNAPSHOT_STORE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+def save_table_snapshot(source_key, table, metadata=None):
+    """정규화된 표를 출처 키로 디스크 스냅샷 저장소에 저장합니다. (백그라운드에서 기록)
+
+    metadata에는 출처의 리비전 등 다시 불러올 때 필요한 값을 넣습니다. (JSON으로 저장 가능해야 함)
+    """
+    if table is None or not _snapshot_store_enabled():
+        return None
+    return _snapshot_store_writer.submit(_write_table_snapshot, tuple(source_key), table, metadata or {})
+
+def load_table_snapshot(source_key):
+    """디스크 스냅샷 저장소에서 표를 메모리 매핑으로 읽어 (표, 메타데이터)를 반환합니다. 없으면 (None, None)."""
+    if not _snapshot_store_enabled():
+        return None, None
+    path = _snapshot_store_path(source_key)
+    if not os.path.exists(path):
+        return None, None
+    
+    import pyarrow as pa
+    try:
+        with pa.memory_map(path, 'r') as source:
+            table, metadata = _table_from_arrow(pa.ipc.open_file(source).read_all())
+    except Exception:
+        return None, None
+    if (metadata.get('version') != _SNAPSHOT_STORE_VERSION or metadata.get('schema') != _SURVEY_SCHEMA_HASH
+            or metadata.get('source') != list(source_key)):
+        return None, None
+    return table, metadata
+
+def delete_table_snapshot(source_key):
+    """디스크 스냅샷 저장소에서 출처의 파일을 삭제합니다."""
+    if not SNAPSHOT_STORE_DIR:
+        return
+    try:
+        os.remove(_snapshot_store_path(source_key))
+    except OSError:
+        pass
+
+# 스프레드시트 스냅샷 캐시의 유효 시간 (초)
+SHEET_SNAPSHOT_TTL = int(os.getenv('SHEET_SNAPSHOT_TTL', '60'))
+
+# 증분 동기화 사용 여부 (설문 응답 시트는 행이 뒤에 추가되기만 한다고 가정)
+SHEET_INCREMENTAL_SYNC = os.getenv('SHEET_INCREMENTAL_SYNC', '1') != '0'
+
+# 중간 행 수정을 놓치지 않도록 증분 동기화 중에도 전체를 다시 불러오는 주기 (초)
+SHEET_FULL_RELOAD_INTERVAL = int(os.getenv('SHEET_FULL_RELOAD_INTERVAL', '900'))
+
+# 증분 동기화 때 이미 읽은 행의 수정 여부를 확인하는 검증 구간의 행 수
+# 이미 읽은 행을 이 크기의 블록으로 나눠 블록마다 체크섬을 보관하고, 동기화할 때마다 블록 하나를
+# 차례로 다시 읽어 비교합니다. 시트가 이 행 수 이하면 매번 전체를 확인하고, 더 크면
+# (행 수 / 검증 구간)번의 동기화마다 전체를 한 바퀴 확인합니다.
+SHEET_VERIFY_ROWS = max(int(os.getenv('SHEET_VERIFY_ROWS', '1000')), 1)
+
+# 세션 간에 공유하는 스냅샷이 차지할 수 있는 최대 메모리 (바이트)
+DATASET_CACHE_MAX_BYTES = int(os.getenv('DATASET_CACHE_MAX_BYTES', str(1024 * 1024 * 1024)))
+
+# (스프레드시트 ID, 정규화된 범위) -> 스냅샷 (LRU 순서, 프로세스 전체의 모든 세션이 읽기 전용으로 공유)
+# 스냅샷: {'table', 'loaded_at', 'synced_at', 'full_loaded_at', 'stale',
+#          'headers', 'header_hash', 'row_count', 'last_row_hash',
+#          'block_rows', 'block_checksums', 'verify_cursor'}
+_sheet_snapshots = OrderedDict()
+_sheet_snapshots_lock = threading.Lock()
+_dataset_stats = {'requests': 0, 'loads': 0, 'evictions': 0, 'bytes': 0}
+
+# 스냅샷을 불러오거나 갱신하는 중인 출처 (키 -> {'event', 'result', 'error'})
+_dataset_loads = {}
+_dataset_loads_lock = threading.Lock()
+
+# 출처 -> {세션 ID: 마지막 사용 시각}
+_dataset_sessions = {}
+# 출처 -> 저장할 때 계산한 스냅샷 크기 (바이트, 메모리 한도 계산용)
+_dataset_sizes = {}
+
+def _snapshot_get(key):
+    """스냅샷 캐시에서 출처의 스냅샷을 찾습니다. 찾으면 가장 최근 사용으로 표시합니다."""
+    with _sheet_snapshots_lock:
+        snapshot = _sheet_snapshots.get(key)
+        if snapshot is not None:
+            _sheet_snapshots.move_to_end(key)
+        return snapshot
+
+def _snapshot_put(key, snapshot):
+    """스냅샷을 저장하고, 메모리 한도를 넘으면 오래 사용하지 않은 출처부터 제거합니다.
+
+    제거한 스냅샷은 디스크 저장소에 남아 있으므로 다음 요청에서 다시 불러옵니다.
+    """
+    with _sheet_snapshots_lock:
+        previous = _sheet_snapshots.pop(key, None)
+        if previous is not None and previous['table'] is snapshot['table']:
+            size = _dataset_sizes[key]
+        else:
+            size = snapshot['table'].nbytes
+        _dataset_stats['bytes'] += size - _dataset_sizes.get(key, 0)
+        _sheet_snapshots[key] = snapshot
+        _dataset_sizes[key] = size
+        while _dataset_stats['bytes'] > DATASET_CACHE_MAX_BYTES and len(_sheet_snapshots) > 1:
+            evicted_key, _ = _sheet_snapshots.popitem(last=False)
+            _dataset_stats['bytes'] -= _dataset_sizes.pop(evicted_key)
+            _dataset_stats['evictions'] += 1
+            _dataset_sessions.pop(evicted_key, None)
+
+def _snapshot_pop(key):
+    """스냅샷 캐시에서 출처를 제거합니다."""
+    with _sheet_snapshots_lock:
+        snapshot = _sheet_snapshots.pop(key, None)
+        _dataset_stats['bytes'] -= _dataset_sizes.pop(key, 0)
+        _dataset_sessions.pop(key, None)
+        return snapshot
+
+def _current_session_id():
+    """현재 Streamlit 세션 ID를 반환합니다. Streamlit 밖(명령줄 등)에서는 None."""
+    if not st.runtime.exists():
+        return None
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+def _hold_dataset(key, session_id=None):
+    """세션이 출처의 데이터를 사용하고 있음을 기록합니다. (세션 ID를 알 수 없으면 기록하지 않음)"""
+    session_id = session_id or _current_session_id()
+    if session_id is None:
+        return
+    with _sheet_snapshots_lock:
+        if key in _sheet_snapshots:
+            _dataset_sessions.setdefault(key, {})[session_id] = time.time()
+
+def dataset_registry_report():
+    """세션 간에 공유하는 데이터셋 현황을 반환합니다.
+
+    출처별 행 수, 메모리 크기, 마지막 동기화 시각, 오래된 데이터 여부와 그 데이터를 사용 중인 세션 목록,
+    그리고 전체 요청 수, 실제로 불러온 횟수, 메모리 한도로 제거한 횟수를 담은 사전을 반환합니다.
+    종료된 세션은 목록에서 정리합니다.
+    """
+    runtime = st.runtime.get_instance() if st.runtime.exists() else None
+    with _sheet_snapshots_lock:
+        datasets = []
+        for key, snapshot in reversed(_sheet_snapshots.items()):
+            sessions = _dataset_sessions.get(key, {})
+            if runtime is not None:
+                for session_id in [session_id for session_id in sessions if not runtime.is_active_session(session_id)]:
+                    del sessions[session_id]
+            datasets.append({
+                'spreadsheet_id': key[0],
+                'range': key[1],
+                'rows': len(snapshot['table']),
+                'bytes': _dataset_sizes[key],
+                'synced_at': snapshot['synced_at'],
+                'stale': snapshot['stale'],
+                'sessions': sorted(sessions, key=sessions.get, reverse=True),
+            })
+        return dict(_dataset_stats, datasets=datasets, max_bytes=DATASET_CACHE_MAX_BYTES)
+
+# A1 표기의 셀 범위 (예: A1:O, A2:O500, A:O)
+_A1_CELLS_PATTERN = re.compile(r'^([A-Za-z]*)(\d*)(?::([A-Za-z]*)(\d*))?$')
+
+def _column_index(letters):
+    """열 문자(A, B, ..., AA)를 0부터 시작하는 번호로 변환합니다."""
+    index = 0
+    for char in letters.upper():
+        index = index * 26 + (ord(char) - ord('A') + 1)
+    return index - 1
+
+def _column_letters(index):
+    """0부터 시작하는 열 번호를 열 문자로 변환합니다."""
+    letters = ''
+    index += 1
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+def _split_a1_range(range_name):
+    """A1 표기 범위를 (시트 접두어, 시작 열, 시작 행, 끝 열, 끝 행)으로 나눕니다. 해석할 수 없으면 None."""
+    if '!' in range_name:
+        sheet_name, cells = range_name.split('!', 1)
+        prefix = f"{sheet_name}!"
+    elif ':' in range_name:
+        prefix, cells = '', range_name
+    else:
+        # 시트 이름만 지정한 경우 시트 전체
+        prefix, cells = f"{range_name}!", ''
+    
+    match = _A1_CELLS_PATTERN.match(cells)
+    if not match:
+        return None
+    start_col, start_row, end_col, end_row = match.groups()
+    return (prefix, start_col or 'A', int(start_row) if start_row else 1,
+            end_col or None, int(end_row) if end_row else None)
+
+def _row_hash(row, width):
+    """행 값의 해시를 계산합니다. 헤더 너비를 넘는 셀은 무시합니다."""
+    return hashlib.sha1(json.dumps(list(row[:width]), ensure_ascii=False).encode()).hexdigest()
+
+def _rows_checksum(rows, width, checksum=0):
+    """행 값들의 CRC32 체크섬을 checksum에 이어서 계산합니다. 헤더 너비를 넘는 셀은 무시합니다."""
+    text = ''.join('\x1f'.join(map(str, row[:width])) + '\x1e' for row in rows)
+    return zlib.crc32(text.encode(), checksum)
+
+def _extend_block_checksums(checksums, row_count, rows, width, block_rows):
+    """row_count행까지의 블록별 체크섬 목록에 새 행들을 이어 붙인 새 목록을 반환합니다.
+
+    마지막 블록이 덜 찼으면 그 체크섬에 이어서 계산하므로 이전 행을 다시 읽지 않아도 됩니다.
+    """
+    checksums = list(checksums)
+    start = 0
+    while start < len(rows):
+        offset = (row_count + start) % block_rows
+        chunk = rows[start:start + block_rows - offset]
+        if offset == 0:
+            checksums.append(_rows_checksum(chunk, width))
+        else:
+            checksums[-1] = _rows_checksum(chunk, width, checksums[-1])
+        start += len(chunk)
+    return checksums
+
+def _build_snapshot(values, table):
+    """전체 셀 값과 파싱한 SurveyTable로 새 스냅샷을 만듭니다."""
+    headers = values[0]
+    now = time.time()
+    return {
+        'table': table,
+        'loaded_at': now,
+        'synced_at': now,
+        'full_loaded_at': now,
+        'stale': False,
+        'headers': headers,
+        'header_hash': _row_hash(headers, len(headers)),
+        'row_count': len(values) - 1,
+        'last_row_hash': _row_hash(values[-1], len(headers)) if len(values) > 1 else None,
+        'block_rows': SHEET_VERIFY_ROWS,
+        'block_checksums': _extend_block_checksums([], 0, values[1:], len(headers), SHEET_VERIFY_ROWS),
+        'verify_cursor': 0,
+    }
+
+def _sheet_store_key(key):
+    """시트 스냅샷의 디스크 저장소 출처 키를 만듭니다."""
+    return ('sheet',) + tuple(key)
+
+def _persist_sheet_snapshot(key, snapshot):
+    """시트 스냅샷을 리비전(행 수, 마지막 행 해시)과 함께 디스크에 저장합니다."""
+    save_table_snapshot(_sheet_store_key(key), snapshot['table'], {
+        'revision': f"{snapshot['row_count']}:{snapshot['last_row_hash']}",
+        'synced_at': snapshot['synced_at'],
+        'full_loaded_at': snapshot['full_loaded_at'],
+        'headers': snapshot['headers'],
+        'header_hash': snapshot['header_hash'],
+        'row_count': snapshot['row_count'],
+        'last_row_hash': snapshot['last_row_hash'],
+        'block_rows': snapshot['block_rows'],
+        'block_checksums': snapshot['block_checksums'],
+        'verify_cursor': snapshot['verify_cursor'],
+    })
+
+def _restore_sheet_snapshot(key):
+    """디스크 저장소에 남아 있는 시트 스냅샷을 불러옵니다. 없으면 None.
+
+    마지막 동기화 시각을 그대로 이어받으므로, 오래된 스냅샷이면 다음 요청에서 증분 동기화로
+    그 이후에 추가된 행만 가져옵니다.
+    """
+    table, metadata = load_table_snapshot(_sheet_store_key(key))
+    if table is None:
+        return None
+    return {
+        'table': table,
+        'loaded_at': metadata['synced_at'],
+        'synced_at': metadata['synced_at'],
+        'full_loaded_at': metadata['full_loaded_at'],
+        'stale': False,
+        'headers': metadata['headers'],
+        'header_hash': metadata['header_hash'],
+        'row_count': metadata['row_count'],
+        'last_row_hash': metadata['last_row_hash'],
+        # 검증용 체크섬이 없는 이전 형식이면 다음 동기화에서 전체를 다시 불러옵니다.
+        'block_rows': metadata.get('block_rows'),
+        'block_checksums': metadata.get('block_checksums'),
+        'verify_cursor': metadata.get('verify_cursor', 0),
+    }
+
+def _load_full_snapshot(service, spreadsheet_id, range_name, fetch_values=None):
+    """범위 전체를 내려받아 스냅샷을 만듭니다. 실패하면 None을 반환합니다.
+
+    fetch_values(범위)를 지정하면 그 함수로 셀 값을 가져옵니다. (여러 범위를 batchGet으로 묶을 때)
+    """
+    try:
+        if fetch_values is None:
+            values = _fetch_sheet_values(service, spreadsheet_id, range_name)
+        else:
+            values = fetch_values(range_name)
+        table = _parse_sheet_table(values)
+        if table is None:
+            return None
+        return _build_snapshot(values, table)
+    except SheetsThrottledError:
+        raise
+    except Exception as e:
+        report(f"데이터를 가져오는 중 오류가 발생했습니다: {str(e)}", level='error')
+        return None
+
+def _sync_sheet_tail(service, spreadsheet_id, range_name, snapshot):
+    """마지막으로 읽은 행 이후에 추가된 행만 가져와 스냅샷을 갱신합니다.
+
+    헤더 행, 마지막으로 읽은 행부터 끝까지, 그리고 이미 읽은 행 중 검증할 블록 하나
+    (SHEET_VERIFY_ROWS행, 동기화마다 다음 블록으로 이동)를 batchGet 한 번으로 요청합니다.
+    헤더가 바뀌었거나, 마지막으로 읽은 행의 내용이 달라졌거나(삭제·정렬),
+    검증 블록의 체크섬이 다르면(중간 행 수정) None을 반환하여 호출한 쪽이 전체를 다시 불러오도록 합니다.
+    """
+    parts = _split_a1_range(range_name)
+    if parts is None:
+        return None
+    block_rows, checksums = snapshot.get('block_rows'), snapshot.get('block_checksums')
+    if checksums is None or block_rows != SHEET_VERIFY_ROWS:
+        return None
+    prefix, start_col, start_row, end_col, end_row = parts
+    headers = snapshot['headers']
+    width = len(headers)
+    if end_col is None:
+        end_col = _column_letters(_column_index(start_col) + width - 1)
+    
+    # 겹쳐 읽는 마지막 행 (데이터가 없었다면 첫 데이터 행부터)
+    row_count = snapshot['row_count']
+    tail_start = start_row + max(row_count, 1)
+    if end_row is not None and tail_start > end_row:
+        return dict(snapshot, loaded_at=time.time(), synced_at=time.time(), stale=False)
+    
+    ranges = [f"{prefix}{start_col}{start_row}:{end_col}{start_row}",
+              f"{prefix}{start_col}{tail_start}:{end_col}{end_row or ''}"]
+    block = None
+    if checksums:
+        block = snapshot['verify_cursor'] % len(checksums)
+        block_first = block * block_rows
+        block_last = min(block_first + block_rows, row_count)
+        ranges.append(f"{prefix}{start_col}{start_row + 1 + block_first}:{end_col}{start_row + block_last}")
+    
+    request = service.spreadsheets().values().batchGet(spreadsheetId=spreadsheet_id, ranges=ranges)
+    value_ranges = _execute_sheets_request(
+        service, request, key=('batchGet', spreadsheet_id) + tuple(ranges)).get('valueRanges', [])
+    if len(value_ranges) != len(ranges):
+        return None
+    header_values = value_ranges[0].get('values', [])
+    tail_values = value_ranges[1].get('values', [])
+    
+    # 헤더가 바뀌었으면 전체 다시 불러오기
+    if not header_values or _row_hash(header_values[0], width) != snapshot['header_hash']:
+        return None
+    
+    if row_count > 0:
+        # 마지막으로 읽은 행이 그대로인지 확인
+        if not tail_values or _row_hash(tail_values[0], width) != snapshot['last_row_hash']:
+            return None
+        new_rows = tail_values[1:]
+    else:
+        new_rows = tail_values
+    
+    if block is not None:
+        # 이미 읽은 행 중 검증 블록이 그대로인지 확인 (끝의 빈 행은 응답에서 빠지므로 채워서 비교)
+        block_values = value_ranges[2].get('values', [])
+        block_values = block_values + [[]] * (block_last - block_first - len(block_values))
+        if _rows_checksum(block_values, width) != checksums[block]:
+            return None
+    
+    now = time.time()
+    updated = dict(snapshot, loaded_at=now, synced_at=now, stale=False,
+                   verify_cursor=snapshot['verify_cursor'] + 1)
+    if not new_rows:
+        return updated
+    
+    new_table = _parse_sheet_table([headers] + new_rows, report_missing=False)
+    updated.update(table=snapshot['table'].append(new_table),
+                   row_count=row_count + len(new_rows),
+                   last_row_hash=_row_hash(new_rows[-1], width),
+                   block_checksums=_extend_block_checksums(checksums, row_count, new_rows, width, block_rows))
+    return updated
+
+def get_sheet_snapshot(service, spreadsheet_id, range_name, ttl=None, force_refresh=False, incremental=None,
+                       session_id=None):
+    """스프레드시트 데이터를 스냅샷 캐시를 거쳐 가져옵니다.
+
+    같은 (스프레드시트 ID, 범위)에 대해 TTL 안에서는 이미 파싱한 데이터를 그대로 반환하므로,
+    한 번의 화면 갱신에서 여러 차트를 그려도 시트는 한 번만 내려받습니다.
+    TTL이 지나면 증분 동기화로 새로 추가된 행만 가져오고, 불가능한 경우 전체를 다시 불러옵니다.
+    여러 세션이 동시에 같은 출처를 요청하면 한 호출만 내려받아 파싱하고 나머지는 그 결과를 기다립니다.
+    API 할당량 초과로 갱신하지 못하면 마지막으로 성공한 스냅샷을 오래된 데이터로 표시하여 반환합니다.
+    반환값은 세션 간에 공유되는 읽기 전용 SurveyTable이며, 요청한 세션(session_id, 기본값은 현재
+    Streamlit 세션)을 데이터셋 현황(dataset_registry_report)에 기록합니다.
+    """
+    spreadsheet_id, range_name = normalize_sheet_range(spreadsheet_id, range_name)
+    key = (spreadsheet_id, range_name)
+    if ttl is None:
+        ttl = SHEET_SNAPSHOT_TTL
+    if incremental is None:
+        incremental = SHEET_INCREMENTAL_SYNC
+    
+    table = _load_sheet_snapshot(service, key, ttl, force_refresh, incremental)
+    if table is not None:
+        _hold_dataset(key, session_id)
+    return table
+
+def _load_sheet_snapshot(service, key, ttl, force_refresh, incremental, fetch_values=None):
+    """유효한 스냅샷이 있으면 그 표를, 없으면 출처마다 한 호출만 갱신해 표를 반환합니다.
+
+    데이터셋 현황의 요청 수를 기록합니다. (get_sheet_snapshot과 load_multiple_sheets에서 사용)
+    """
+    with _sheet_snapshots_lock:
+        _dataset_stats['requests'] += 1
+    snapshot = _snapshot_get(key)
+    if snapshot is not None and not force_refresh and time.time() - snapshot['loaded_at'] < ttl:
+        return snapshot['table']
+    return _single_flight(
+        _dataset_loads, _dataset_loads_lock, key,
+        lambda: _refresh_sheet_snapshot(service, key, ttl, force_refresh, incremental, fetch_values))
+
+def _refresh_sheet_snapshot(service, key, ttl, force_refresh, incremental, fetch_values=None):
+    """출처의 스냅샷을 갱신하고 표를 반환합니다. (get_sheet_snapshot에서 출처마다 한 호출만 실행)
+
+    fetch_values는 전체를 다시 불러올 때 셀 값을 가져오는 함수입니다. (기본값은 범위마다 values.get)
+    """
+    spreadsheet_id, range_name = key
+    # 기다리는 동안 앞선 호출이 이미 갱신했을 수 있으므로 다시 확인합니다.
+    snapshot = _snapshot_get(key)
+    if snapshot is None and not force_refresh:
+        # 재시작 후 첫 요청이거나 메모리 한도로 제거된 출처면 디스크에 저장된 스냅샷에서 시작
+        snapshot = _restore_sheet_snapshot(key)
+        if snapshot is not None:
+            _snapshot_put(key, snapshot)
+    now = time.time()
+    if snapshot and not force_refresh and now - snapshot['loaded_at'] < ttl:
+        return snapshot['table']
+    
+    with _sheet_snapshots_lock:
+        _dataset_stats['loads'] += 1
+    try:
+        updated = None
+        if (snapshot and incremental and not force_refresh
+                and now - snapshot['full_loaded_at'] < SHEET_FULL_RELOAD_INTERVAL):
+            try:
+                updated = _sync_sheet_tail(service, spreadsheet_id, range_name, snapshot)
+            except SheetsThrottledError:
+                raise
+            except Exception:
+                # 증분 동기화에 실패하면 전체 다시 불러오기로 대체
+                updated = None
+        if updated is None:
+            updated = _load_full_snapshot(service, spreadsheet_id, range_name, fetch_values)
+    except SheetsThrottledError as e:
+        if snapshot is None:
+            report(f"구글 스프레드시트 요청 한도를 초과했습니다. 잠시 후 다시 시도해주세요. ({str(e)})", level='error')
+            return None
+        # 마지막으로 성공한 스냅샷을 오래된 데이터로 제공 (TTL 동안 재요청하지 않음)
+        updated = dict(snapshot, loaded_at=time.time(), stale=True)
+    if updated is None:
+        if snapshot is None:
+            return None
+        # 가져오기에 실패해도 마지막 스냅샷을 오래된 데이터로 제공하고, 화면을 다시 그릴 때마다
+        # 실패한 스프레드시트를 곧바로 다시 요청하지 않도록 TTL이 지난 뒤에 다시 시도합니다.
+        updated = dict(snapshot, loaded_at=time.time(), stale=True)
+    
+    _snapshot_put(key, updated)
+    if not updated['stale'] and (snapshot is None or updated['table'] is not snapshot['table']):
+        _persist_sheet_snapshot(key, updated)
+    return updated['table']
+
+def get_sheet_snapshot_status(spreadsheet_id, range_name):
+    """캐시된 스냅샷의 상태를 반환합니다. (마지막 동기화 시각, 행 수, 오래된 데이터 여부)"""
+    spreadsheet_id, range_name = normalize_sheet_range(spreadsheet_id, range_name)
+    with _sheet_snapshots_lock:
+        snapshot = _sheet_snapshots.get((spreadsheet_id, range_name))
+    if snapshot is None:
+        return None
+    return {
+        'synced_at': snapshot['synced_at'],
+        'row_count': snapshot['row_count'],
+        'stale': snapshot['stale'],
+    }
+
+def invalidate_sheet_snapshot(spreadsheet_id=None, range_name=None):
+    """스냅샷 캐시를 비웁니다. ID나 범위를 지정하면 해당 항목만 제거합니다."""
+    if spreadsheet_id is not None and range_name is not None:
+        spreadsheet_id, range_name = normalize_sheet_range(spreadsheet_id, range_name)
+    
+    removed = []
+    with _sheet_snapshots_lock:
+        keys = list(_sheet_snapshots)
+    for key in keys:
+        if spreadsheet_id is not None and key[0] != spreadsheet_id.strip():
+            continue
+        if range_name is not None and key[1] != range_name:
+            continue
+        _snapshot_pop(key)
+        removed.append(key)
+    if spreadsheet_id is not None and range_name is not None:
+        removed.append((spreadsheet_id, range_name))
+    
+    # 디스크에 저장된 스냅샷도 함께 삭제하여 다음 요청에서 전체를 다시 불러오게 합니다.
+    for key in set(removed):
+        delete_table_snapshot(_sheet_store_key(key))
+
+# 여러 스프레드시트를 동시에 불러올 때 사용할 최대 작업자 수
+SHEET_FETCH_WORKERS = int(os.getenv('SHEET_FETCH_WORKERS', '4'))
+
+# 여러 반을 합친 데이터에서 출처(반)를 나타내는 컬럼
+SOURCE_COLUMN = '반'
+
+def source_label(spreadsheet_id, range_name):
+    """출처의 기본 이름으로 범위의 시트 이름을 사용합니다."""
+    if '!' in range_name:
+        return range_name.split('!', 1)[0].strip("'")
+    return range_name or spreadsheet_id
+
+def _fetch_sheet_batch(service, spreadsheet_id, range_names):
+    """같은 스프레드시트의 여러 범위를 values.batchGet 한 번으로 가져옵니다."""
+    if len(range_names) == 1:
+        return [_fetch_sheet_values(service, spreadsheet_id, range_names[0])]
+    request = service.spreadsheets().values().batchGet(
+        spreadsheetId=spreadsheet_id, ranges=list(range_names))
+    value_ranges = _execute_sheets_request(
+        service, request, key=('batchGet', spreadsheet_id) + tuple(range_names)).get('valueRanges', [])
+    return [value_range.get('values', []) for value_range in value_ranges]
+
+def parse_sheet_sources(text):
+    """'스프레드시트 ID, 범위[, 반 이름]' 형식의 줄 목록을 출처 목록으로 변환합니다."""
+    sources = []
+    for line in text.splitlines():
+        parts = [part.strip() for part in line.split(',')]
+        if len(parts) < 2 or not parts[0] or not parts[1]:
+            continue
+        sources.append(tuple(parts[:3]))
+    return sources
+
+class _SheetBatchFetch:
+    """같은 스프레드시트에서 전체를 다시 불러올 범위들을 처음 필요할 때 values.batchGet 한 번으로 가져옵니다.
+
+    묶지 않은 범위(증분 동기화에 실패해 전체를 다시 불러오게 된 경우 등)는 따로 가져옵니다.
+    """
+    
+    def __init__(self, service, spreadsheet_id, range_names):
+        self.service = service
+        self.spreadsheet_id = spreadsheet_id
+        self.range_names = list(range_names)
+        self._values = None
+        self._error = None
+        self._lock = threading.Lock()
+    
+    def __call__(self, range_name):
+        if range_name not in self.range_names:
+            return _fetch_sheet_values(self.service, self.spreadsheet_id, range_name)
+        with self._lock:
+            # 요청이 실패하면 같은 묶음의 다른 범위에서 다시 보내지 않습니다.
+            if self._values is None and self._error is None:
+                try:
+                    self._values = dict(zip(self.range_names, _fetch_sheet_batch(
+                        self.service, self.spreadsheet_id, self.range_names)))
+                except Exception as e:
+                    self._error = e
+        if self._error is not None:
+            raise self._error
+        return self._values.get(range_name, [])
+
+def _expects_full_load(key, incremental, now):
+    """출처를 갱신할 때 전체를 다시 불러오게 될지 미리 판단합니다. (같은 스프레드시트의 전체 불러오기를 묶는 데 사용)"""
+    if not incremental or _split_a1_range(key[1]) is None:
+        return True
+    snapshot = _snapshot_get(key)
+    if snapshot is None:
+        # 디스크에 스냅샷이 있으면 그것에서 시작해 증분 동기화
+        return not (_snapshot_store_enabled() and os.path.exists(_snapshot_store_path(_sheet_store_key(key))))
+    return now - snapshot['full_loaded_at'] >= SHEET_FULL_RELOAD_INTERVAL
+
+# 여러 반을 합친 표를 보관할 출처 목록 수
+COMBINED_TABLE_CACHE_SIZE = 16
+
+# 출처 목록((출처, 반 이름), ...) -> (출처별 표의 약한 참조, 합친 표) (LRU 순서)
+_combined_tables = OrderedDict()
+_combined_tables_lock = threading.Lock()
 
-# Google Sheets API 설정
-SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']
+def _combine_source_tables(parts):
+    """(출처, 반 이름, 표) 목록에 '반' 컬럼을 붙여 하나의 표로 합칩니다.
 
-def get_google_sheets_service():
-    """구글 스프레드시트 서비스 객체를 생성합니다."""
-    try:
-        # Streamlit Cloud 환경에서 실행 중인 경우
-        if 'GOOGLE_CREDENTIALS' in st.secrets:
-            credentials_json = st.secrets['GOOGLE_CREDENTIALS']
-            st.success("Streamlit Cloud 환경에서 인증 정보를 성공적으로 로드했습니다.")
+    출처별 표가 지난번과 모두 같은 객체이면 그때 합친 표를 그대로 반환하므로, 화면을 다시 그릴 때마다
+    문항 통계, 학생 색인, 기간별 집계와 지문을 다시 계산하지 않습니다.
+    """
+    key = tuple((source, label) for source, label, _ in parts)
+    with _combined_tables_lock:
+        cached = _combined_tables.get(key)
+        if cached is not None and all(ref() is table for ref, (_, _, table) in zip(cached[0], parts)):
+            _combined_tables.move_to_end(key)
+            return cached[1]
+    
+    combined = SurveyTable.concat([table.with_constant(SOURCE_COLUMN, label) for _, label, table in parts])
+    with _combined_tables_lock:
+        # 교체된 스냅샷의 표를 붙잡아 두지 않도록 출처별 표는 약한 참조로 보관합니다.
+        _combined_tables[key] = (tuple(weakref.ref(table) for _, _, table in parts), combined)
+        _combined_tables.move_to_end(key)
+        while len(_combined_tables) > COMBINED_TABLE_CACHE_SIZE:
+            _combined_tables.popitem(last=False)
+    return combined
+
+def load_multiple_sheets(service, sources, max_workers=None, ttl=None):
+    """여러 반의 설문 데이터를 한 번에 불러와 하나의 SurveyTable로 합칩니다.
+
+    sources는 (스프레드시트 ID, 범위) 또는 (스프레드시트 ID, 범위, 반 이름)의 목록입니다.
+    출처마다 get_sheet_snapshot과 같은 스냅샷 갱신(디스크 스냅샷, 증분 동기화, 오래된 데이터 제공)을 거치고
+    다른 세션이 같은 출처를 불러오는 중이면 그 결과를 기다려 함께 사용합니다.
+    전체를 다시 불러올 범위는 같은 스프레드시트끼리 values.batchGet 한 번으로 묶고
+    서로 다른 스프레드시트는 제한된 작업자 풀로 동시에 갱신합니다.
+    결과에는 출처를 나타내는 '반' 컬럼이 추가되며, 출처 데이터가 바뀌지 않았으면 같은 표 객체를 반환합니다.
+    ttl은 스냅샷 캐시의 유효 시간입니다. (기본값 SHEET_SNAPSHOT_TTL)
+    """
+    if max_workers is None:
+        max_workers = SHEET_FETCH_WORKERS
+    if ttl is None:
+        ttl = SHEET_SNAPSHOT_TTL
+    incremental = SHEET_INCREMENTAL_SYNC
+    
+    # 출처 정규화 및 캐시 확인
+    entries = []
+    pending = {}
+    full_ranges = {}
+    now = time.time()
+    for source in sources:
+        spreadsheet_id, range_name = normalize_sheet_range(source[0], source[1])
+        label = source[2] if len(source) > 2 and source[2] else source_label(spreadsheet_id, range_name)
+        key = (spreadsheet_id, range_name)
+        entries.append((key, label))
+        snapshot = _snapshot_get(key)
+        if snapshot is None or now - snapshot['loaded_at'] >= ttl:
+            keys = pending.setdefault(spreadsheet_id, [])
+            if key not in keys:
+                keys.append(key)
+                if _expects_full_load(key, incremental, now):
+                    full_ranges.setdefault(spreadsheet_id, []).append(range_name)
+    
+    # 출처 -> 갱신한 표 (실패하면 None)
+    refreshed = {}
+    
+    def refresh_spreadsheet(spreadsheet_id, keys):
+        fetch_values = _SheetBatchFetch(service, spreadsheet_id, full_ranges.get(spreadsheet_id, []))
+        for key in keys:
+            try:
+                refreshed[key] = _load_sheet_snapshot(service, key, ttl, False, incremental, fetch_values)
+            except Exception as e:
+                refreshed[key] = None
+                report(f"{spreadsheet_id} 스프레드시트를 가져오는 중 오류가 발생했습니다: {str(e)}", level='warning')
+    
+    # 스프레드시트별로 동시에 갱신 (Streamlit 호출은 메인 스레드에서만)
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending)))) as executor:
+            for future in [executor.submit(refresh_spreadsheet, spreadsheet_id, keys)
+                           for spreadsheet_id, keys in pending.items()]:
+                future.result()
+    
+    parts = []
+    for key, label in entries:
+        if key in refreshed:
+            table = refreshed[key]
         else:
-            # 로컬 환경에서 실행 중인 경우
-            credentials_path = os.getenv('GOOGLE_CREDENTIALS_PATH')
-            
-            # 직접 경로 지정 (개발 환경용)
-            if not credentials_path:
-                # 기본 경로 시도
-                if os.path.exists('credentials.json'):
-                    credentials_path = 'credentials.json'
-                    st.info("현재 디렉토리의 credentials.json 파일을 사용합니다.")
-                else:
-                    # 인증 파일 업로드 기능으로 설정된 경우
-                    if 'google_credentials' in st.session_state:
-                        credentials_json = st.session_state['google_credentials']
-                        credentials = service_account.Credentials.from_service_account_info(
-                            json.loads(credentials_json), scopes=SCOPES)
-                        service = build('sheets', 'v4', credentials=credentials)
-                        return service
-                    else:
-                        st.error("Google API 인증 정보가 설정되지 않았습니다.")
-                        st.info("다음 방법 중 하나로 Google API 인증 정보를 설정해주세요:")
-                        st.info("1. 환경 변수 GOOGLE_CREDENTIALS_PATH에 인증 파일 경로 설정")
-                        st.info("2. 프로젝트 루트 디렉토리에 credentials.json 파일 위치시키기")
-                        st.info("3. 사이드바에서 인증 파일 업로드")
-                        st.info("4. Streamlit Cloud를 사용하는 경우 st.secrets에 GOOGLE_CREDENTIALS 설정")
-                        return None
-            
-            with open(credentials_path, 'r') as f:
-                credentials_json = f.read()
-            st.success(f"{credentials_path}에서 인증 정보를 성공적으로 로드했습니다.")
-        
-        credentials = service_account.Credentials.from_service_account_info(
-            json.loads(credentials_json), scopes=SCOPES)
-        service = build('sheets', 'v4', credentials=credentials)
-        return service
-    except FileNotFoundError:
-        st.error(f"인증 파일을 찾을 수 없습니다. 경로를 확인해주세요.")
-        return None
-    except json.JSONDecodeError:
-        st.error("인증 파일이 올바른 JSON 형식이 아닙니다.")
-        return None
-    except Exception as e:
-        st.error(f"구글 스프레드시트 서비스 생성 중 오류가 발생했습니다: {str(e)}")
+            table = _load_sheet_snapshot(service, key, ttl, False, incremental)
+        if table is None:
+            report(f"'{label}' 데이터를 가져오지 못했습니다.", level='warning')
+            continue
+        _hold_dataset(key)
+        parts.append((key, label, table))
+    
+    if not parts:
         return None
+    return _combine_source_tables(parts)
 
-def get_sheet_data(service, spreadsheet_id, range_name):
-    """구글 스프레드시트에서 데이터를 가져옵니다."""
+def load_sheet_sources(service, sources, ttl=None):
+    """설정한 출처 목록의 데이터를 불러옵니다. 출처가 하나면 스냅샷을, 여럿이면 반별로 합친 표를 반환합니다."""
+    if len(sources) == 1:
+        return get_sheet_snapshot(service, sources[0][0], sources[0][1], ttl=ttl)
+    return load_multiple_sheets(service, sources, ttl=ttl)
+
+# CSV 파일 최대 크기 (바이트)
+CSV_MAX_BYTES = int(os.getenv('CSV_MAX_BYTES', str(1024 * 1024 * 1024)))
+
+# CSV를 나눠 읽는 단위 (pandas는 행 수, pyarrow는 바이트)
+CSV_CHUNK_ROWS = int(os.getenv('CSV_CHUNK_ROWS', '50000'))
+CSV_CHUNK_BYTES = int(os.getenv('CSV_CHUNK_BYTES', str(16 * 1024 * 1024)))
+
+# CSV 파서 ('auto'이면 pyarrow가 설치되어 있을 때 pyarrow 사용)
+CSV_ENGINE = os.getenv('CSV_ENGINE', 'auto')
+
+# CSV에서 읽는 컬럼 (분석에 쓰지 않는 컬럼은 읽지 않음)
+CSV_COLUMNS = set(SURVEY_COLUMN_MAP.values()) | {UNIT_COLUMN, SOURCE_COLUMN}
+
+def _source_size(source):
+    """파일 경로나 파일 객체의 남은 크기(바이트)를 반환합니다. 알 수 없으면 None."""
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    # Streamlit 업로드 파일은 크기를 바로 알려줍니다.
+    size = getattr(source, 'size', None)
+    if size is not None:
+        return size
     try:
-        # 스프레드시트 ID와 범위가 뒤바뀐 경우를 확인
-        if '!' in spreadsheet_id and not '!' in range_name:
-            spreadsheet_id, range_name = range_name, spreadsheet_id
-            st.info("스프레드시트 ID와 범위가 교정되었습니다.")
-        
-        # 시트 이름에 특수 문자가 있는 경우 작은따옴표로 감싸기
-        if '!' in range_name:
-            sheet_name, cell_range = range_name.split('!', 1)
-            if ('.' in sheet_name or ' ' in sheet_name) and not (sheet_name.startswith("'") and sheet_name.endswith("'")):
-                sheet_name = f"'{sheet_name}'"
-            range_name = f"{sheet_name}!{cell_range}"
-        
-        sheet = service.spreadsheets()
-        result = sheet.values().get(spreadsheetId=spreadsheet_id, range=range_name).execute()
-        values = result.get('values', [])
-        
-        if not values:
-            st.warning("데이터가 없습니다.")
-            return None
-            
-        # 헤더 행 가져오기
-        headers = values[0]
-        
-        # 실제 데이터 행 가져오기
-        data = values[1:]
-        
-        # 데이터프레임 생성
-        df = pd.DataFrame(data)
-        
-        # 컬럼 수가 맞지 않는 경우 처리
-        if len(headers) > len(df.columns):
-            # 부족한 컬럼 추가
-            for i in range(len(df.columns), len(headers)):
-                df[i] = None
-        elif len(headers) < len(df.columns):
-            # 초과 컬럼 제거
-            df = df.iloc[:, :len(headers)]
-        
-        # 컬럼명 설정
-        df.columns = headers
-        
-        # 설문 문항 컬럼명 정리 (기존 컬럼명과 새로운 컬럼명 매핑)
-        survey_columns = {
-            '타임스탬프': '타임스탬프',
-            '📌 학생 번호를 선택하세요.': '학번',
-            '🧑‍🎓 학생 이름을 입력하세요.': '학생 이름',
-            '🤩 오늘 수학 수업이 기대돼요. (1점: 전혀 기대되지 않아요 ~ 5점: 매우 기대돼요)': '수업 기대도',
-            '😨 오늘 수학 수업이 좀 긴장돼요. (1점: 전혀 긴장되지 않아요 ~ 5점: 매우 긴장돼요)': '긴장도',
-            '🎲 오늘 배우는 수학 내용이 재미있을 것 같아요. (1점: 전혀 재미없을 것 같아요 ~ 5점: 매우 재미있을 것 같아요)': '재미 예상도',
-            '💪 오늘 수업을 잘 해낼 자신이 있어요. (1점: 전혀 자신 없어요 ~ 5점: 매우 자신 있어요)': '자신감',
-            '🎯 지금 수업에 집중하고 있어요. (1점: 전혀 집중하지 못해요 ~ 5점: 완전히 집중하고 있어요)': '집중도',
-            '😆 지금 수업이 즐거워요. (1점: 전혀 즐겁지 않아요 ~ 5점: 매우 즐거워요)': '즐거움',
-            '🌟 이제 수학 공부에 자신감이 더 생겼어요. (1점: 전혀 그렇지 않아요 ~ 5점: 매우 그래요)': '자신감 변화',
-            '🎉 수업 후에 수학이 전보다 더 재미있어졌어요. (1점: 전혀 그렇지 않아요 ~ 5점: 매우 그래요)': '재미 변화',
-            '😌 수업 후에는 수학 시간에 전보다 덜 긴장돼요. (1점: 전혀 그렇지 않아요 ~ 5점: 매우 그래요)': '긴장도 변화',
-            '🧠 오늘 수업 내용을 잘 이해했어요. (1점: 전혀 이해하지 못했어요 ~ 5점: 매우 잘 이해했어요)': '이해도',
-            '📋 ✏️ 오늘 배운 수학 내용을 한 줄로 요약해 보세요.': '수업 요약',
-            '📋 💭 오늘 수업에서 스스로 잘한 점이나 아쉬운 점을 한 문장으로 적어 보세요.': '자기 평가'
-        }
-        
-        # 컬럼명 매핑
-        mapped_columns = {}
-        for orig_col in df.columns:
-            if orig_col in survey_columns:
-                mapped_columns[orig_col] = survey_columns[orig_col]
-            else:
-                # 매핑되지 않은 컬럼은 원래 이름 유지
-                mapped_columns[orig_col] = orig_col
-        
-        # 컬럼명 변경
-        df = df.rename(columns=mapped_columns)
-        
-        # 숫자형 데이터 변환
-        numeric_columns = ['수업 기대도', '긴장도', '재미 예상도', '자신감', '집중도', 
-                         '즐거움', '자신감 변화', '재미 변화', '긴장도 변화', '이해도']
-        for col in numeric_columns:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        # 컬럼 존재 여부 확인 및 경고
-        missing_columns = [col for col in numeric_columns if col not in df.columns]
-        if missing_columns:
-            st.warning(f"다음 컬럼을 찾을 수 없습니다: {', '.join(missing_columns)}")
-            st.info("사용 가능한 컬럼 목록:")
-            st.write(df.columns.tolist())
-        
-        return df
-    except Exception as e:
-        st.error(f"데이터를 가져오는 중 오류가 발생했습니다: {str(e)}")
+        position = source.tell()
+        end = source.seek(0, os.SEEK_END)
+        source.seek(position)
+        return end - position
+    except (AttributeError, OSError):
         return None
 
-def load_example_data():
-    """예제 데이터를 생성합니다."""
-    # 학생 이름 리스트
-    student_names = ["김철수", "이영희", "박민준", "정서연", "최준호", 
-                     "강지민", "윤지현", "장현우", "한소희", "송민석"]
-    
-    # 날짜 생성
-    dates = pd.date_range(start="2025-03-20", periods=1, freq='D')
-    
-    # 빈 데이터프레임 생성
-    rows = []
-    
-    # 각 학생별 데이터 생성
-    for student_name in student_names:
-        for date in dates:
-            # 랜덤 데이터 생성
-            row = {
-                '타임스탬프': date.strftime('%Y-%m-%d %H:%M:%S'),
-                '학번': np.random.randint(1, 31),
-                '학생 이름': student_name,
-                '수업 기대도': np.random.randint(1, 6),
-                '긴장도': np.random.randint(1, 6),
-                '재미 예상도': np.random.randint(1, 6),
-                '자신감': np.random.randint(1, 6),
-                '집중도': np.random.randint(1, 6),
-                '즐거움': np.random.randint(1, 6),
-                '자신감 변화': np.random.randint(1, 6),
-                '재미 변화': np.random.randint(1, 6),
-                '긴장도 변화': np.random.randint(1, 6),
-                '이해도': np.random.randint(1, 6),
-                '수업 요약': '오늘은 이차방정식의 근의 공식에 대해 배웠습니다.',
-                '자기 평가': '집중해서 들었지만 계산 과정에서 실수했습니다.'
-            }
-            rows.append(row)
+def _csv_chunks_pandas(source, positions, chunk_rows):
+    """pandas로 필요한 컬럼만 chunk_rows행씩 읽어 문자열 배열로 반환합니다."""
+    reader = pd.read_csv(source, usecols=positions, dtype=str, chunksize=chunk_rows, encoding='utf-8-sig',
+                         keep_default_na=False, na_values=[''])
+    with reader:
+        for chunk in reader:
+            yield chunk.to_numpy(dtype=object)
+
+def _csv_chunks_pyarrow(source, header, positions, chunk_bytes):
+    """pyarrow 스트리밍 리더로 필요한 컬럼만 chunk_bytes씩 읽어 문자열 배열로 반환합니다."""
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    
+    # 중복된 질문이 있어도 구분되도록 헤더 이름은 직접 지정합니다.
+    column_names = [f'{i}' for i in range(len(header))]
+    names = [column_names[i] for i in positions]
+    reader = pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(column_names=column_names, skip_rows=1, block_size=chunk_bytes),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=names, column_types={name: pa.string() for name in names},
+            strings_can_be_null=True))
+    for batch in reader:
+        if batch.num_rows:
+            yield np.column_stack([column.to_numpy(zero_copy_only=False) for column in batch.columns])
+
+def _content_digest(source):
+    """파일 경로나 파일 객체 내용의 SHA-256 해시를 계산합니다. 파일 객체는 처음 위치로 되돌립니다."""
+    digest = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+    else:
+        source.seek(0)
+        for block in iter(lambda: source.read(1024 * 1024), b''):
+            digest.update(block)
+        source.seek(0)
+    return digest.hexdigest()
+
+def read_survey_csv(source, engine=None, chunk_rows=None, max_bytes=None, report_missing=True):
+    """설문 CSV(구글 설문지 응답 내보내기 등)를 나눠 읽어 SurveyTable로 반환합니다.
+
+    긴 질문 헤더는 구글 시트와 같은 헤더 맵으로 분석용 컬럼명으로 바꾸고, 분석에 쓰는 컬럼만 읽으며,
+    척도 문항은 조각마다 바로 int8로 변환하므로 원본보다 훨씬 작은 메모리로 큰 파일을 읽을 수 있습니다.
+    engine은 'pandas', 'pyarrow', 'auto'(pyarrow가 설치되어 있으면 사용) 중 하나입니다.
+    파일이 max_bytes(기본값 CSV_MAX_BYTES)보다 크면 ValueError를 발생시킵니다.
+    같은 내용의 파일을 이미 읽은 적이 있으면 디스크 스냅샷 저장소에서 바로 불러옵니다.
+    """
+    if max_bytes is None:
+        max_bytes = CSV_MAX_BYTES
+    size = _source_size(source)
+    if size is not None and size > max_bytes:
+        raise ValueError(
+            f"CSV 파일이 너무 큽니다. ({size / 1024 / 1024:.0f}MB, 최대 {max_bytes / 1024 / 1024:.0f}MB)")
+    
+    # 헤더만 먼저 읽어 필요한 컬럼을 정합니다.
+    header = list(pd.read_csv(source, nrows=0, encoding='utf-8-sig').columns)
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    columns = _compile_header_map(tuple(header))
+    positions = [i for i, name in enumerate(columns) if name in CSV_COLUMNS]
+    names = [columns[i] for i in positions]
+    
+    source_key = ('csv', _content_digest(source)) if _snapshot_store_enabled() else None
+    table = load_table_snapshot(source_key)[0] if source_key else None
+    if table is None:
+        table = _parse_survey_csv(source, header, positions, names, engine, chunk_rows)
+        if source_key:
+            save_table_snapshot(source_key, table, {'revision': source_key[1]})
+    
+    # 컬럼 존재 여부 확인 및 경고
+    missing_columns = [col for col in SURVEY_ITEMS if not table.has_column(col)]
+    if missing_columns and report_missing:
+        report(f"다음 컬럼을 찾을 수 없습니다: {', '.join(missing_columns)}", level='warning')
+        report(f"사용 가능한 컬럼 목록: {', '.join(map(str, columns))}")
+    
+    return table
+
+def _parse_survey_csv(source, header, positions, names, engine=None, chunk_rows=None):
+    """CSV의 지정한 컬럼을 조각 단위로 읽어 하나의 SurveyTable로 합칩니다."""
+    if engine is None:
+        engine = CSV_ENGINE
+    if engine == 'auto':
+        engine = 'pyarrow' if importlib.util.find_spec('pyarrow') else 'pandas'
+    if engine not in ('pyarrow', 'pandas'):
+        raise ValueError(f"알 수 없는 CSV 파서입니다: {engine}")
+    
+    tables = None
+    if engine == 'pyarrow':
+        try:
+            tables = [SurveyTable.from_raw(names, raw)
+                      for raw in _csv_chunks_pyarrow(source, header, positions, CSV_CHUNK_BYTES)]
+        except ValueError:
+            # pyarrow는 열 개수가 다른 행을 읽지 못하므로 pandas로 처음부터 다시 읽습니다.
+            if hasattr(source, 'seek'):
+                source.seek(0)
+    if tables is None:
+        tables = [SurveyTable.from_raw(names, raw)
+                  for raw in _csv_chunks_pandas(source, positions, chunk_rows or CSV_CHUNK_ROWS)]
+    
+    if tables:
+        return SurveyTable.concat(tables)
+    return SurveyTable.from_raw(names, np.empty((0, len(names)), dtype=object))
+
+# 예제 데이터 학생 이름 (학생이 더 많으면 번호를 붙여 만듦)
+EXAMPLE_STUDENT_NAMES = ["김철수", "이영희", "박민준", "정서연", "최준호",
+                         "강지민", "윤지현", "장현우", "한소희", "송민석"]
+
+# 예제 데이터의 서술형 응답
+EXAMPLE_SUMMARY = '오늘은 이차방정식의 근의 공식에 대해 배웠습니다.'
+EXAMPLE_EVALUATION = '집중해서 들었지만 계산 과정에서 실수했습니다.'
+
+# 앱의 '예제 데이터 사용'에 쓰는 난수 시드 (화면을 다시 그려도, 세션이 달라도 같은 데이터를 보여 주고
+# 표 지문이 같아 렌더 캐시를 함께 씀)
+EXAMPLE_DATA_SEED = 20250320
+
+def _example_responses(n_students, n_sessions, n_classes, missing_rate, seed):
+    """합성 설문 응답을 열 단위 배열로 만듭니다. (행 순서: 회차 -> 반 -> 학생)
+
+    학생마다 성향(평균 점수)이 달라 문항 간 상관관계와 학생별 차이가 나타나도록
+    (학생 성향 + 잡음)을 반올림해 1~5점으로 자릅니다. 모든 값은 한 번의 배열 연산으로 만듭니다.
+    """
+    rng = np.random.default_rng(seed)
+    n_rows = n_sessions * n_classes * n_students
+    
+    # 같은 회차의 응답이 모여 있도록 회차마다 모든 반, 모든 학생의 행을 둡니다.
+    session = np.repeat(np.arange(n_sessions), n_classes * n_students)
+    cohort = np.tile(np.repeat(np.arange(n_classes), n_students), n_sessions)
+    number = np.tile(np.arange(n_students), n_sessions * n_classes)
+    student = cohort * n_students + number
+    
+    names = np.array(EXAMPLE_STUDENT_NAMES, dtype=object)
+    suffix = (np.arange(n_classes * n_students) // len(names)).astype(str).astype(object)
+    suffix[:len(names)] = ''
+    student_names = names[np.arange(n_classes * n_students) % len(names)] + suffix
+    
+    # 수업일(평일)마다 오후 1시부터 10분 동안 제출
+    days = pd.bdate_range(start="2025-03-20", periods=n_sessions).to_numpy()
+    timestamps = (days[session] + np.timedelta64(13, 'h')
+                  + rng.integers(0, 600, n_rows).astype('timedelta64[s]'))
+    
+    bias = rng.normal(0, 0.8, n_classes * n_students)
+    scores = np.clip(np.rint(3 + bias[student][:, None] + rng.normal(0, 1, (n_rows, len(SURVEY_ITEMS)))), 1, 5)
+    missing = rng.random(scores.shape) < missing_rate if missing_rate > 0 else np.zeros(scores.shape, dtype=bool)
+    
+    return {
+        'timestamps': timestamps,
+        'cohorts': np.array([f'{c + 1}반' for c in range(n_classes)], dtype=object)[cohort],
+        'numbers': number + 1,
+        'names': student_names[student],
+        'scores': scores.astype(np.int64),
+        'missing': missing,
+    }
+
+def load_example_data(n_students=10, n_sessions=1, n_classes=1, missing_rate=0.0, seed=None):
+    """예제 데이터를 생성합니다.
+
+    기본값은 앱의 '예제 데이터 사용'과 같은 학생 10명, 1회차 데이터이며, 크기를 키워
+    성능 측정용 합성 데이터로도 사용합니다. (n_students는 반마다의 학생 수)
+    반이 둘 이상이면 '반' 컬럼을 추가합니다. missing_rate 비율의 척도 응답은 결측으로 둡니다.
+    """
+    data = _example_responses(n_students, n_sessions, n_classes, missing_rate, seed)
+    n_rows = len(data['names'])
+    
+    columns = {
+        '타임스탬프': pd.DatetimeIndex(data['timestamps']).strftime('%Y-%m-%d %H:%M:%S'),
+        '학번': data['numbers'],
+        '학생 이름': data['names'],
+    }
+    for j, item in enumerate(SURVEY_ITEMS):
+        columns[item] = pd.arrays.IntegerArray(data['scores'][:, j].copy(), data['missing'][:, j].copy())
+    columns['수업 요약'] = np.full(n_rows, EXAMPLE_SUMMARY, dtype=object)
+    columns['자기 평가'] = np.full(n_rows, EXAMPLE_EVALUATION, dtype=object)
+    if n_classes > 1:
+        columns[SOURCE_COLUMN] = data['cohorts']
     
     # 데이터프레임 생성
-    df = pd.DataFrame(rows)
-    return df
+    return pd.DataFrame(columns)
 
-def create_visualization(df, chart_type, student_name=None):
-    """지정된 차트 유형에 따라 시각화를 생성하고 base64로 인코딩된 이미지를 반환합니다."""
-    if df is None:
-        return None, "데이터를 찾을 수 없습니다."
+def example_sheet_values(n_students=10, n_sessions=1, n_classes=1, missing_rate=0.0, ragged_rate=0.0, seed=None):
+    """예제 데이터를 구글 시트 API 응답의 values 형식(헤더 행 + 문자열 행 목록)으로 만듭니다.
+
+    헤더는 구글 설문지 질문 그대로이고 타임스탬프는 설문지 형식(오전/오후)입니다.
+    결측 응답은 빈 문자열이며, ragged_rate 비율의 행은 시트 API처럼 끝의 빈 셀(서술형 응답)이
+    잘린 짧은 행이 됩니다. 반이 둘 이상이면 타임스탬프 다음에 '반' 컬럼을 둡니다.
+    """
+    data = _example_responses(n_students, n_sessions, n_classes, missing_rate, seed)
+    n_rows = len(data['names'])
+    rng = np.random.default_rng(None if seed is None else seed + 1)
     
-    # 필요한 컬럼 목록
-    required_columns = ['수업 기대도', '긴장도', '재미 예상도', '자신감', '집중도', 
-                     '즐거움', '자신감 변화', '재미 변화', '긴장도 변화', '이해도']
+    stamps = pd.DatetimeIndex(data['timestamps']).strftime(FORM_TIMESTAMP_FORMAT)
+    stamps = stamps.str.replace('AM', '오전', regex=False).str.replace('PM', '오후', regex=False)
+    headers = list(SURVEY_COLUMN_MAP)
+    columns = [np.asarray(stamps, dtype=object)]
+    if n_classes > 1:
+        headers.insert(1, SOURCE_COLUMN)
+        columns.append(data['cohorts'])
+    columns.append(data['numbers'].astype(str).astype(object))
+    columns.append(data['names'])
+    scores = data['scores'].astype(str).astype(object)
+    scores[data['missing']] = ''
+    columns.extend(scores.T)
+    columns.append(np.full(n_rows, EXAMPLE_SUMMARY, dtype=object))
+    columns.append(np.full(n_rows, EXAMPLE_EVALUATION, dtype=object))
     
-    # 누락된 컬럼 확인
-    missing_columns = [col for col in required_columns if col not in df.columns]
-    if missing_columns:
-        return None, f"다음 컬럼을 찾을 수 없습니다: {', '.join(missing_columns)}"
+    rows = np.column_stack(columns).tolist()
+    # 서술형 응답을 비운 행은 시트 API가 끝의 빈 셀을 보내지 않습니다.
+    for i in np.flatnonzero(rng.random(n_rows) < ragged_rate):
+        rows[i] = rows[i][:-2]
+    return [headers] + rows
+
+# 선 그래프 대신 집계 화면으로 바꾸는 학생 수 기준
+ALL_STUDENTS_AGGREGATE_THRESHOLD = int(os.getenv('ALL_STUDENTS_AGGREGATE_THRESHOLD', '40'))
+# 학생 수가 기준을 넘을 때 사용할 집계 화면 ('heatmap' 또는 'distribution')
+ALL_STUDENTS_LARGE_VIEW = os.getenv('ALL_STUDENTS_LARGE_VIEW', 'heatmap')
+
+# '모든 학생 응답 비교' 화면 종류
+ALL_STUDENTS_VIEWS = {
+    'auto': '자동',
+    'lines': '선 그래프',
+    'heatmap': '히트맵 (학생 x 문항)',
+    'distribution': '문항별 점수 분포',
+}
+
+# 히트맵에서 학생 이름을 표시하는 최대 학생 수
+HEATMAP_NAME_LIMIT = 60
+
+def _resolve_all_students_view(n_students, view=None):
+    """학생 수에 맞는 '모든 학생 응답 비교' 화면 종류를 정합니다."""
+    if view in (None, 'auto'):
+        return 'lines' if n_students <= ALL_STUDENTS_AGGREGATE_THRESHOLD else ALL_STUDENTS_LARGE_VIEW
+    return view
+
+# 서버에서 이미지를 그리지 않고 Vega-Lite 명세를 보내는 형식
+VEGA_LITE_FORMAT = 'vega-lite'
+
+# 렌더 품질 프로필 (배포 기본값은 RENDER_PROFILE 환경 변수, 요청마다 선택 가능)
+RENDER_PROFILES = {
+    'preview': {'label': '빠른 미리보기', 'format': 'png', 'dpi': 60},
+    'standard': {'label': '표준', 'format': 'png', 'dpi': 110},
+    'print': {'label': '인쇄용 (300dpi)', 'format': 'png', 'dpi': 300},
+    'svg': {'label': 'SVG (벡터)', 'format': 'svg', 'dpi': 100},
+    'webp': {'label': 'WebP', 'format': 'webp', 'dpi': 110, 'pil_kwargs': {'quality': 80, 'method': 4}},
+    'png8': {'label': '압축 PNG (256색)', 'format': 'png', 'dpi': 110, 'colors': 256},
+    # 집계된 값만 보내고 브라우저에서 그림 (툴팁, 확대 지원)
+    'vega': {'label': '브라우저 렌더링 (Vega-Lite)', 'format': VEGA_LITE_FORMAT, 'extension': 'vl.json'},
+}
+DEFAULT_RENDER_PROFILE = os.getenv('RENDER_PROFILE', 'standard')
+
+# 이미지 형식별 MIME 타입
+_IMAGE_MIME_TYPES = {'png': 'image/png', 'svg': 'image/svg+xml', 'webp': 'image/webp',
+                     VEGA_LITE_FORMAT: 'application/vnd.vegalite.v5+json'}
+
+# 인코딩된 차트 (data: 이미지 바이트, mime: MIME 타입, profile: 프로필 이름, encode_seconds: 렌더 시간)
+RenderedChart = namedtuple('RenderedChart', ['data', 'mime', 'profile', 'encode_seconds'])
+
+# 프로필별 인코딩 통계 (프로필 -> {'count', 'bytes', 'seconds'})
+_render_profile_stats = {}
+_render_profile_stats_lock = threading.Lock()
+
+def _record_render_profile(profile_name, size, seconds):
+    """렌더 프로필별 이미지 크기와 렌더 시간을 기록합니다."""
+    with _render_profile_stats_lock:
+        stats = _render_profile_stats.setdefault(profile_name, {'count': 0, 'bytes': 0, 'seconds': 0.0})
+        stats['count'] += 1
+        stats['bytes'] += size
+        stats['seconds'] += seconds
+
+def render_profile_stats():
+    """프로필별 평균 이미지 크기(바이트)와 평균 인코딩 시간(초)을 반환합니다."""
+    with _render_profile_stats_lock:
+        return {
+            name: {
+                'count': stats['count'],
+                'avg_bytes': stats['bytes'] / stats['count'],
+                'avg_seconds': stats['seconds'] / stats['count'],
+            }
+            for name, stats in _render_profile_stats.items()
+        }
+
+# 차트 렌더 캐시의 최대 크기 (바이트)
+RENDER_CACHE_MAX_BYTES = int(os.getenv('RENDER_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+# (데이터 지문, 차트 유형, 학생 이름, 렌더 옵션) -> RenderedChart (LRU 순서)
+_render_cache = OrderedDict()
+_render_cache_lock = threading.Lock()
+_render_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'bytes': 0}
+
+def _render_cache_get(key):
+    """렌더 캐시에서 이미지를 찾습니다. 찾으면 가장 최근 사용으로 표시합니다."""
+    with _render_cache_lock:
+        image = _render_cache.get(key)
+        if image is None:
+            _render_cache_stats['misses'] += 1
+            return None
+        _render_cache.move_to_end(key)
+        _render_cache_stats['hits'] += 1
+        return image
+
+def _render_cache_put(key, image):
+    """렌더 캐시에 이미지를 저장하고, 용량을 넘으면 오래 사용하지 않은 항목부터 제거합니다."""
+    size = len(image.data)
+    if size > RENDER_CACHE_MAX_BYTES:
+        return
+    with _render_cache_lock:
+        previous = _render_cache.pop(key, None)
+        if previous is not None:
+            _render_cache_stats['bytes'] -= len(previous.data)
+        _render_cache[key] = image
+        _render_cache_stats['bytes'] += size
+        while _render_cache_stats['bytes'] > RENDER_CACHE_MAX_BYTES:
+            _, evicted = _render_cache.popitem(last=False)
+            _render_cache_stats['bytes'] -= len(evicted.data)
+            _render_cache_stats['evictions'] += 1
+
+def render_cache_stats():
+    """렌더 캐시의 적중/미적중 횟수, 항목 수와 사용 중인 용량을 반환합니다."""
+    with _render_cache_lock:
+        return dict(_render_cache_stats, entries=len(_render_cache), max_bytes=RENDER_CACHE_MAX_BYTES)
+
+def clear_render_cache():
+    """렌더 캐시를 비웁니다."""
+    with _render_cache_lock:
+        _render_cache.clear()
+        _render_cache_stats['bytes'] = 0
+
+# 학생 한 명을 대상으로 하는 차트
+STUDENT_CHART_TYPES = ('학생별 설문 응답', '학생별 변화 추이', '학생별 장기 추이')
+
+# 기간별 추이 차트 (view로 기간 단위를 지정, ROLLUP_PERIODS 참고)
+TREND_CHART_TYPES = ('학생별 장기 추이', '반 전체 장기 추이')
+
+# 문항 통계 차트 (view로 반 이름을 지정, 기본값은 전체)
+STATS_CHART_TYPES = ('문항별 평균 점수', '문항별 상관관계')
+
+def create_visualization(df, chart_type, student_name=None, korean_font=None, view=None, profile=None):
+    """지정된 차트 유형에 따라 시각화를 생성하고 인코딩된 이미지(RenderedChart)를 반환합니다.
+
+    같은 데이터(지문 기준)와 같은 차트 요청은 프로세스 전체에서 공유하는 렌더 캐시에서 바로 반환합니다.
+    df에는 데이터프레임이나 SurveyTable을 넘길 수 있으며, 차트는 압축된 SurveyTable에서 바로 읽습니다.
+    korean_font를 지정하지 않으면 프로세스에서 공유하는 한글 폰트를 사용합니다.
+    view는 '모든 학생 응답 비교'의 화면 종류(ALL_STUDENTS_VIEWS 참고, 기본값은 학생 수에 따라 자동)나
+    장기 추이 차트의 기간 단위(ROLLUP_PERIODS 참고, 기본값은 수업별),
+    문항 통계 차트의 반 이름(기본값은 전체)입니다.
+    profile은 렌더 품질 프로필입니다. (RENDER_PROFILES 참고, 기본값은 DEFAULT_RENDER_PROFILE)
+    """
+    if df is None:
+        return None, "데이터를 찾을 수 없습니다."
+    table = as_survey_table(df)
+    if profile is None:
+        profile = DEFAULT_RENDER_PROFILE
+    if profile not in RENDER_PROFILES:
+        return None, f"알 수 없는 렌더 프로필입니다: {profile}"
     
     # 한글 폰트 설정
-    korean_font = set_korean_font()
+    if korean_font is None:
+        korean_font = get_korean_font()
     
-    # 그래프 초기화
-    plt.clf()
-    plt.close('all')
+    key = _render_cache_key(table, chart_type, student_name, view, profile, korean_font)
+    _, _, student_name, view = key[:4]
     
-    # 그래프 생성
-    fig = plt.figure(figsize=(12, 8), dpi=100)
+    chart = _render_cache_get(key)
+    if chart is not None:
+        return chart, None
     
-    try:
-        if chart_type == '학생별 설문 응답':
-            if student_name is None:
-                return None, "학생 이름을 지정해주세요."
-            
-            student_data = df[df['학생 이름'] == student_name]
-            if student_data.empty:
-                return None, f"'{student_name}' 학생을 찾을 수 없습니다."
-            
-            survey_items = ['수업 기대도', '긴장도', '재미 예상도', '자신감', '집중도', 
-                        '즐거움', '자신감 변화', '재미 변화', '긴장도 변화', '이해도']
-            
+    chart, error = _render_visualization(table, chart_type, student_name, korean_font, view, profile)
+    if chart is not None:
+        _render_cache_put(key, chart)
+    return chart, error
+
+def _render_cache_key(table, chart_type, student_name, view, profile, korean_font):
+    """렌더 캐시 키 (지문, 차트 유형, 학생 이름, view, 프로필, 폰트)를 만듭니다.
+
+    차트에 영향을 주지 않는 학생 이름과 view는 None으로, 기본 view는 실제 값으로 바꿔 넣습니다.
+    """
+    if chart_type not in STUDENT_CHART_TYPES:
+        student_name = None
+    if chart_type == '모든 학생 응답 비교':
+        view = _resolve_all_students_view(len(table.student_names()), view)
+    elif chart_type in TREND_CHART_TYPES:
+        view = view or 'session'
+    elif chart_type not in STATS_CHART_TYPES:
+        view = None
+    return (table.fingerprint, chart_type, student_name, view, profile, _font_source(korean_font))
+
+def _chart_spec(table, chart_type, student_name, view=None):
+    """SurveyTable에서 차트를 그리는 데 필요한 값만 뽑아 차트 명세(dict)를 만듭니다.
+
+    명세는 숫자 배열과 문자열로만 이루어져 있어 다른 프로세스로 보낼 수 있습니다.
+    (명세, 오류 메시지)를 반환합니다.
+    """
+    if chart_type == '학생별 설문 응답':
+        if student_name is None:
+            return None, "학생 이름을 지정해주세요."
+        
+        # 학생의 가장 최근 응답
+        row = table.student_latest_row(student_name)
+        if row is None:
+            return None, f"'{student_name}' 학생을 찾을 수 없습니다."
+        
+        spec = {
+            'kind': 'bars',
+            'title': f'{student_name} 학생의 설문 응답',
+            'labels': SURVEY_ITEMS,
             # 결측값 처리
-            values = student_data[survey_items].iloc[0].fillna(0)
-            
-            ax = fig.add_subplot(111)
-            bars = ax.bar(range(len(survey_items)), values)
-            
-            # 한글 폰트 적용
-            ax.set_title(f'{student_name} 학생의 설문 응답', fontsize=16, fontweight='bold', fontproperties=korean_font)
-            ax.set_xticks(range(len(survey_items)))
-            ax.set_xticklabels(survey_items, rotation=45, ha='right', fontsize=10, fontproperties=korean_font)
-            ax.set_ylabel('점수 (1-5)', fontsize=12, fontproperties=korean_font)
-            ax.set_ylim(0, 5)
-            
-            # 막대 위에 값 표시
-            for bar in bars:
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{height:.1f}',
-                    ha='center', va='bottom', fontproperties=korean_font)
-            
-            # 자기 평가 정보 추가
-            if '수업 요약' in student_data.columns and '자기 평가' in student_data.columns:
-                evaluation_text = f"\n수업 요약: {student_data['수업 요약'].iloc[0]}\n"
-                evaluation_text += f"자기 평가: {student_data['자기 평가'].iloc[0]}"
-                plt.figtext(0.02, 0.02, evaluation_text, fontsize=10, wrap=True, fontproperties=korean_font)
-        
-        elif chart_type == '문항별 평균 점수':
-            survey_items = ['수업 기대도', '긴장도', '재미 예상도', '자신감', '집중도', 
-                        '즐거움', '자신감 변화', '재미 변화', '긴장도 변화', '이해도']
-            
+            'values': np.nan_to_num(table.item_matrix(SURVEY_ITEMS, rows=[row])[0]),
+            'ylabel': '점수 (1-5)',
+        }
+        
+        # 자기 평가 정보 추가
+        if table.has_column('수업 요약') and table.has_column('자기 평가'):
+            evaluation_text = f"\n수업 요약: {table.text_value('수업 요약', row) or ''}\n"
+            evaluation_text += f"자기 평가: {table.text_value('자기 평가', row) or ''}"
+            spec['footnote'] = evaluation_text
+        return spec, None
+    
+    elif chart_type == '문항별 평균 점수':
+        # 누적 통계에서 읽음 (결측은 해당 문항에서만 제외)
+        stats = table.stats
+        if view is not None and view not in stats.cohorts:
+            return None, f"'{view}' 반을 찾을 수 없습니다."
+        return {
+            'kind': 'bars',
+            'title': f"{f'{view} ' if view else ''}문항별 평균 점수 (오차 막대: 표준편차)",
+            'labels': SURVEY_ITEMS,
+            'values': stats.item_means(SURVEY_ITEMS, view),
+            'errors': stats.item_stds(SURVEY_ITEMS, view),
+            'ylabel': '평균 점수 (1-5)',
+            'value_format': '.2f',
+        }, None
+    
+    elif chart_type == '학생별 변화 추이':
+        if student_name is None:
+            return None, "학생 이름을 지정해주세요."
+        
+        row = table.student_latest_row(student_name)
+        if row is None:
+            return None, f"'{student_name}' 학생을 찾을 수 없습니다."
+        
+        changes = ['자신감 변화', '재미 변화', '긴장도 변화']
+        return {
+            'kind': 'bars',
+            'title': f'{student_name} 학생의 수업 전후 변화',
+            'labels': changes,
             # 결측값 처리
-            means = df[survey_items].fillna(0).mean()
-            stds = df[survey_items].fillna(0).std()
-            
-            ax = fig.add_subplot(111)
-            bars = ax.bar(range(len(survey_items)), means, yerr=stds, capsize=5)
-            
-            ax.set_title('문항별 평균 점수 (오차 막대: 표준편차)', fontsize=16, fontweight='bold', fontproperties=korean_font)
-            ax.set_xticks(range(len(survey_items)))
-            ax.set_xticklabels(survey_items, rotation=45, ha='right', fontsize=10, fontproperties=korean_font)
-            ax.set_ylabel('평균 점수 (1-5)', fontsize=12, fontproperties=korean_font)
-            ax.set_ylim(0, 5)
-            
-            # 막대 위에 값 표시
-            for bar in bars:
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{height:.2f}',
-                    ha='center', va='bottom', fontproperties=korean_font)
-        
-        elif chart_type == '학생별 변화 추이':
+            'values': np.nan_to_num(table.item_matrix(changes, rows=[row])[0]),
+            'ylabel': '변화 점수 (1-5)',
+            'label_fontsize': 12,
+        }, None
+    
+    elif chart_type == '문항별 상관관계':
+        # 누적 통계에서 읽음 (두 문항을 모두 응답한 행만 사용)
+        stats = table.stats
+        if view is not None and view not in stats.cohorts:
+            return None, f"'{view}' 반을 찾을 수 없습니다."
+        return {
+            'kind': 'correlation',
+            'title': f"{f'{view} ' if view else ''}문항별 상관관계",
+            'labels': SURVEY_ITEMS,
+            'matrix': stats.correlation(SURVEY_ITEMS, view),
+        }, None
+    
+    elif chart_type == '모든 학생 응답 비교':
+        if not table.has_column('학생 이름'):
+            return None, "데이터에 '학생 이름' 컬럼이 없습니다."
+        students, profiles = table.student_vectors(SURVEY_ITEMS)
+        return {
+            'kind': 'all_students',
+            'students': list(students),
+            'profiles': profiles,
+            'items': SURVEY_ITEMS,
+            'view': _resolve_all_students_view(len(students), view),
+            'name_limit': HEATMAP_NAME_LIMIT,
+        }, None
+    
+    elif chart_type in TREND_CHART_TYPES:
+        if not table.has_column('타임스탬프'):
+            return None, "데이터에 '타임스탬프' 컬럼이 없어 추이를 볼 수 없습니다."
+        period = view or 'session'
+        if period not in ROLLUP_PERIODS:
+            return None, f"알 수 없는 기간 단위입니다: {period}"
+        rollup = table.rollup(period)
+        
+        if chart_type == '학생별 장기 추이':
             if student_name is None:
                 return None, "학생 이름을 지정해주세요."
-            
-            student_data = df[df['학생 이름'] == student_name]
-            if student_data.empty:
-                return None, f"'{student_name}' 학생을 찾을 수 없습니다."
-            
-            changes = ['자신감 변화', '재미 변화', '긴장도 변화']
-            # 결측값 처리
-            values = student_data[changes].iloc[0].fillna(0)
-            
-            ax = fig.add_subplot(111)
-            bars = ax.bar(range(len(changes)), values)
-            
-            ax.set_title(f'{student_name} 학생의 수업 전후 변화', fontsize=16, fontweight='bold', fontproperties=korean_font)
-            ax.set_xticks(range(len(changes)))
-            ax.set_xticklabels(changes, rotation=45, ha='right', fontsize=12, fontproperties=korean_font)
-            ax.set_ylabel('변화 점수 (1-5)', fontsize=12, fontproperties=korean_font)
-            ax.set_ylim(0, 5)
-            
-            # 막대 위에 값 표시
-            for bar in bars:
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{height:.1f}',
-                    ha='center', va='bottom', fontproperties=korean_font)
-        
-        elif chart_type == '문항별 상관관계':
-            survey_items = ['수업 기대도', '긴장도', '재미 예상도', '자신감', '집중도', 
-                        '즐거움', '자신감 변화', '재미 변화', '긴장도 변화', '이해도']
-            
-            # 결측값 처리
-            correlation_matrix = df[survey_items].fillna(0).corr()
-            ax = fig.add_subplot(111)
-            sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', center=0, fmt='.2f', ax=ax)
-            
-            ax.set_title('문항별 상관관계', fontsize=16, fontweight='bold', fontproperties=korean_font)
-            ax.set_xticklabels(ax.get_xticklabels(), rotation=45, ha='right', fontsize=10, fontproperties=korean_font)
-            ax.set_yticklabels(ax.get_yticklabels(), fontsize=10, fontproperties=korean_font)
+            labels, values = rollup.student_series(student_name, SURVEY_ITEMS)
+            if not labels:
+                return None, f"'{student_name}' 학생의 날짜가 있는 응답을 찾을 수 없습니다."
+            title = f'{student_name} 학생의 {ROLLUP_PERIODS[period]} 변화 추이'
+        else:
+            labels, values, students = rollup.class_series(SURVEY_ITEMS)
+            if not labels:
+                return None, "날짜가 있는 응답을 찾을 수 없습니다."
+            # 기간별 응답 학생 수를 눈금에 함께 표시
+            labels = [f'{label} ({count}명)' for label, count in zip(labels, students)]
+            title = f'반 전체 {ROLLUP_PERIODS[period]} 평균 점수 추이'
         
-        # 여백 조정
-        plt.tight_layout(pad=3.0)
+        return {
+            'kind': 'trend',
+            'title': title,
+            'labels': labels,
+            'values': values,
+            'items': SURVEY_ITEMS,
+            'xlabel': rollup.axis_label,
+        }, None
+    
+    return None, f"알 수 없는 차트 유형입니다: {chart_type}"
+
+def _font_source(korean_font):
+    """FontProperties를 다른 프로세스에 넘길 수 있는 폰트 파일 경로나 이름으로 바꿉니다."""
+    return korean_font.get_file() or korean_font.get_name()
+
+# 렌더링에 사용할 프로세스 수 (0이면 요청한 스레드에서 직접 렌더링)
+RENDER_PROCESS_WORKERS = int(os.getenv('RENDER_PROCESS_WORKERS', '0'))
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+def _get_render_pool():
+    """렌더링용 프로세스 풀을 반환합니다. 설정되지 않았으면 None을 반환합니다."""
+    global _render_pool
+    if RENDER_PROCESS_WORKERS <= 0:
+        return None
+    with _render_pool_lock:
+        if _render_pool is None:
+            # 스레드가 있는 프로세스를 fork하지 않도록 spawn 방식으로 작업 프로세스를 띄웁니다.
+            _render_pool = ProcessPoolExecutor(
+                max_workers=RENDER_PROCESS_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _render_pool
+
+def _reset_render_pool(pool):
+    """비정상 종료된 프로세스 풀을 버려 다음 요청에서 새로 만들게 합니다."""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is pool:
+            _render_pool = None
+    pool.shutdown(wait=False)
+
+def _render_spec(spec, korean_font, profile):
+    """차트 명세를 렌더링 엔진으로 그려 (이미지 바이트, 소요 시간)을 반환합니다.
+
+    프로세스 풀이 설정되어 있으면 작업 프로세스에서 렌더링하고,
+    풀이 비정상 종료되면 현재 스레드에서 대신 렌더링합니다.
+    Vega-Lite 프로필은 명세를 JSON으로 바꾸기만 하므로 항상 현재 스레드에서 처리합니다.
+    """
+    if RENDER_PROFILES[profile]['format'] == VEGA_LITE_FORMAT:
+        return vega_charts.render_chart(spec)
+    
+    import chart_engine
+    
+    args = (spec, _font_source(korean_font), RENDER_PROFILES[profile])
+    pool = _get_render_pool()
+    if pool is not None:
+        try:
+            return pool.submit(chart_engine.render_chart, *args).result()
+        except BrokenProcessPool:
+            _reset_render_pool(pool)
+    return chart_engine.render_chart(*args)
+
+def _render_visualization(table, chart_type, student_name, korean_font, view=None, profile=DEFAULT_RENDER_PROFILE):
+    """SurveyTable로 차트를 그려 인코딩된 이미지를 반환합니다. (캐시를 거치지 않음)"""
+    # 누락된 컬럼 확인
+    missing_columns = [col for col in SURVEY_ITEMS if not table.has_column(col)]
+    if missing_columns:
+        return None, f"다음 컬럼을 찾을 수 없습니다: {', '.join(missing_columns)}"
+    
+    try:
+        spec, error = _chart_spec(table, chart_type, student_name, view)
+        if error:
+            return None, error
         
-        # 그래프를 base64로 인코딩
-        buf = BytesIO()
-        plt.savefig(buf, format='png', bbox_inches='tight', dpi=300, facecolor='white')
-        buf.seek(0)
-        img_str = base64.b64encode(buf.getvalue()).decode()
-        plt.close()
+        # 렌더 프로필에 맞게 그리고 인코딩
+        data, seconds = _render_spec(spec, korean_font, profile)
+        _record_render_profile(profile, len(data), seconds)
         
-        return img_str, None
+        mime = _IMAGE_MIME_TYPES[RENDER_PROFILES[profile]['format']]
+        return RenderedChart(data, mime, profile, seconds), None
     except Exception as e:
         return None, f"시각화 생성 중 오류가 발생했습니다: {str(e)}"
 
+# 일괄 내보내기에 포함할 학생별 차트
+REPORT_CHART_TYPES = ['학생별 설문 응답', '학생별 변화 추이']
+
+# 일괄 내보내기 형식
+EXPORT_FORMATS = {
+    'pdf': 'PDF (학생당 한 쪽)',
+    'zip': 'ZIP (차트 이미지)',
+}
+_EXPORT_MIME_TYPES = {'pdf': 'application/pdf', 'zip': 'application/zip'}
+
+# 일괄 내보내기에 사용할 프로세스 수 (1 이하이면 현재 스레드에서 렌더링)
+EXPORT_PROCESS_WORKERS = int(os.getenv('EXPORT_PROCESS_WORKERS', str(os.cpu_count() or 1)))
+
+def safe_filename(name):
+    """파일 이름에 쓸 수 없는 문자를 밑줄로 바꿉니다."""
+    return re.sub(r'[\\/:*?"<>|\s]+', '_', str(name)).strip('_') or 'student'
+
+def _completed_future(fn, *args):
+    """함수를 바로 실행하고 결과를 담은 Future를 반환합니다. (프로세스 풀 없이 내보낼 때 사용)"""
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+def _finish_chart_job(entry, profile):
+    """render_chart_jobs의 작업 하나를 마무리해 (작업, RenderedChart, 오류 메시지)를 반환합니다."""
+    job, key, future, chart, error = entry
+    if future is not None:
+        try:
+            data, seconds = future.result()
+        except Exception as e:
+            return job, None, f"시각화 생성 중 오류가 발생했습니다: {str(e)}"
+        _record_render_profile(profile, len(data), seconds)
+        chart = RenderedChart(data, _IMAGE_MIME_TYPES[RENDER_PROFILES[profile]['format']], profile, seconds)
+        _render_cache_put(key, chart)
+    return job, chart, error
+
+def render_chart_jobs(df, jobs, korean_font=None, profile=None, max_workers=None, executor=None):
+    """여러 차트를 프로세스 풀에서 병렬로 렌더링하고 (작업, RenderedChart, 오류 메시지)를 작업 순서대로 내보냅니다.
+
+    jobs는 (차트 유형, 학생 이름, view)의 목록이며, 렌더 캐시에 있는 차트는 다시 그리지 않고
+    새로 그린 차트는 렌더 캐시에 저장합니다. 명령줄 일괄 분석처럼 여러 데이터를 연달아 그릴 때는
+    executor에 프로세스 풀을 넘겨 함께 사용할 수 있으며, 넘기지 않으면 max_workers
+    (기본값 EXPORT_PROCESS_WORKERS)개의 프로세스로 풀을 만들고 끝나면 닫습니다.
+    """
+    import chart_engine
+    
+    table = as_survey_table(df)
+    if profile is None:
+        profile = DEFAULT_RENDER_PROFILE
+    if profile not in RENDER_PROFILES:
+        raise ValueError(f"알 수 없는 렌더 프로필입니다: {profile}")
+    if korean_font is None:
+        korean_font = get_korean_font()
+    font_source = _font_source(korean_font)
+    vega = RENDER_PROFILES[profile]['format'] == VEGA_LITE_FORMAT
+    missing_columns = [col for col in SURVEY_ITEMS if not table.has_column(col)]
+    
+    workers = EXPORT_PROCESS_WORKERS if max_workers is None else max_workers
+    own_executor = executor is None and workers > 1 and len(jobs) > 1
+    if own_executor:
+        executor = ProcessPoolExecutor(
+            max_workers=min(workers, len(jobs)), mp_context=multiprocessing.get_context('spawn'))
+    submit = executor.submit if executor is not None else _completed_future
+    # 순서대로 내보내기 위해 앞선 작업부터 기다리되, 동시에 진행하는 작업 수는 제한합니다.
+    window = max(workers, 1) * 2
+    
+    pending = deque()
+    try:
+        for job in jobs:
+            chart_type, student_name, view = job
+            key = _render_cache_key(table, chart_type, student_name, view, profile, korean_font)
+            chart = _render_cache_get(key)
+            if chart is not None:
+                pending.append((job, key, None, chart, None))
+            elif missing_columns:
+                pending.append((job, key, None, None, f"다음 컬럼을 찾을 수 없습니다: {', '.join(missing_columns)}"))
+            else:
+                try:
+                    spec, error = _chart_spec(table, chart_type, key[2], key[3])
+                except Exception as e:
+                    spec, error = None, f"시각화 생성 중 오류가 발생했습니다: {str(e)}"
+                future = None
+                if spec is not None and vega:
+                    future = _completed_future(vega_charts.render_chart, spec)
+                elif spec is not None:
+                    future = submit(chart_engine.render_chart, spec, font_source, RENDER_PROFILES[profile])
+                pending.append((job, key, future, None, error))
+            
+            while len(pending) > window:
+                yield _finish_chart_job(pending.popleft(), profile)
+        while pending:
+            yield _finish_chart_job(pending.popleft(), profile)
+    finally:
+        if own_executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+def export_student_reports(df, output, export_format='pdf', korean_font=None, profile=None,
+                           progress=None, max_workers=None):
+    """모든 학생의 '학생별 설문 응답'과 '학생별 변화 추이' 차트를 PDF 또는 ZIP 하나로 내보냅니다.
+
+    학생별 렌더링은 프로세스 풀에서 병렬로 실행하고, 끝난 결과는 학생 순서대로 output(파일 경로나
+    바이너리 파일 객체)에 바로 기록하므로 메모리에는 처리 중인 학생의 이미지만 남습니다.
+    progress(완료한 학생 수, 전체 학생 수)를 지정하면 학생 한 명을 기록할 때마다 호출합니다.
+    PDF는 래스터 이미지만 담을 수 있으므로 SVG나 브라우저 렌더링 프로필을 고르면 인쇄용 PNG로,
+    ZIP은 브라우저 렌더링 프로필을 고르면 표준 PNG로 내보냅니다.
+    요약(dict: students, exported, skipped, bytes, seconds)을 반환합니다.
+    """
+    import chart_engine
+    
+    started = time.perf_counter()
+    table = as_survey_table(df)
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"알 수 없는 내보내기 형식입니다: {export_format}")
+    if korean_font is None:
+        korean_font = get_korean_font()
+    if profile is None:
+        profile = DEFAULT_RENDER_PROFILE
+    if export_format == 'pdf' and RENDER_PROFILES[profile]['format'] not in chart_engine.RASTER_FORMATS:
+        profile = 'print'
+    elif RENDER_PROFILES[profile]['format'] == VEGA_LITE_FORMAT:
+        profile = 'standard'
+    settings = RENDER_PROFILES[profile]
+    font_source = _font_source(korean_font)
+    extension = settings['format']
+    
+    students = table.student_names()
+    summary = {'students': len(students), 'exported': 0, 'skipped': [], 'bytes': 0, 'seconds': 0.0}
+    
+    workers = EXPORT_PROCESS_WORKERS if max_workers is None else max_workers
+    executor = None
+    if workers > 1 and len(students) > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=min(workers, len(students)), mp_context=multiprocessing.get_context('spawn'))
+    submit = executor.submit if executor is not None else _completed_future
+    # 순서대로 기록하기 위해 앞서 제출한 학생부터 기다리되, 동시에 진행하는 작업 수는 제한합니다.
+    window = max(workers, 1) * 2
+    
+    if export_format == 'pdf':
+        from matplotlib.backends.backend_pdf import PdfPages
+        writer = PdfPages(output)
+    else:
+        # 이미지는 이미 압축되어 있으므로 다시 압축하지 않습니다.
+        writer = zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED)
+    
+    def write_student(index, name, future):
+        results = future.result()
+        for data, seconds in results:
+            _record_render_profile(profile, len(data), seconds)
+        if export_format == 'pdf':
+            writer.savefig(chart_engine.report_page(
+                f'{name} 학생의 설문 보고서', [data for data, _ in results], font_source))
+        else:
+            for chart_type, (data, _) in zip(REPORT_CHART_TYPES, results):
+                writer.writestr(
+                    f'{index:03d}_{safe_filename(name)}_{safe_filename(chart_type)}.{extension}', data)
+        summary['exported'] += 1
+    
+    try:
+        with writer:
+            pending = deque()
+            for index, name in enumerate(students, start=1):
+                specs = []
+                for chart_type in REPORT_CHART_TYPES:
+                    spec, error = _chart_spec(table, chart_type, name)
+                    if error:
+                        break
+                    specs.append(spec)
+                if len(specs) != len(REPORT_CHART_TYPES):
+                    summary['skipped'].append(name)
+                else:
+                    pending.append((index, name, submit(chart_engine.render_charts, specs, font_source, settings)))
+                
+                # 마지막 학생까지 제출했으면 남은 작업을 모두 기록합니다.
+                while len(pending) >= window or (pending and index == len(students)):
+                    done = pending[0][0]
+                    write_student(*pending.popleft())
+                    if progress is not None:
+                        progress(done, len(students))
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    
+    if isinstance(output, (str, bytes, os.PathLike)):
+        summary['bytes'] = os.path.getsize(output)
+    else:
+        summary['bytes'] = output.tell()
+    summary['seconds'] = time.perf_counter() - started
+    return summary
+
+# 백그라운드 새로고침 기본 간격 (초, 0이면 데이터를 불러와도 자동으로 시작하지 않음)
+BACKGROUND_REFRESH_INTERVAL = int(os.getenv('BACKGROUND_REFRESH_INTERVAL', '0'))
+# 새로고침 간격의 최솟값 (초, Sheets API 할당량 보호)
+BACKGROUND_REFRESH_MIN_INTERVAL = 30
+
+# 새로고침할 때마다 미리 렌더링하는 교사용 차트 (차트 유형, view)
+PRERENDER_CHARTS = [('문항별 평균 점수', None), ('문항별 상관관계', None), ('모든 학생 응답 비교', 'auto')]
+
+class SheetRefresher:
+    """설정한 스프레드시트를 주기적으로 동기화하고 교사용 차트를 미리 렌더링해 두는 백그라운드 작업자입니다.
+
+    매 주기마다 스냅샷을 갱신(증분 동기화)하고 PRERENDER_CHARTS를 렌더 캐시에 넣어 두므로,
+    '분석 실행' 버튼은 준비된 이미지를 바로 보여줍니다. 같은 출처 목록에는 프로세스에 하나만 실행되며
+    여러 세션이 함께 사용합니다.
+    """
+    
+    def __init__(self, service, sources, interval, profile, korean_font):
+        self.service = service
+        self.sources = sources
+        self.interval = max(interval, BACKGROUND_REFRESH_MIN_INTERVAL)
+        self.profile = profile
+        self.korean_font = korean_font
+        self.started_at = time.time()
+        # 마지막 실행 결과 (시각은 time.time() 값)
+        self.last_run = None
+        self.synced_at = None
+        self.rendered_at = None
+        self.rows = None
+        self.charts = 0
+        self.seconds = None
+        self.error = None
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sheet-refresher', daemon=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def stop(self):
+        """작업자를 멈춥니다. 진행 중인 새로고침은 끝까지 실행합니다."""
+        self._stopped.set()
+        self._wake.set()
+    
+    @property
+    def running(self):
+        return self._thread.is_alive() and not self._stopped.is_set()
+    
+    def configure(self, interval=None, profile=None):
+        """간격이나 렌더 프로필을 바꾸고 바로 한 번 새로고침합니다."""
+        if interval is not None:
+            self.interval = max(interval, BACKGROUND_REFRESH_MIN_INTERVAL)
+        if profile is not None:
+            self.profile = profile
+        self._wake.set()
+    
+    def _run(self):
+        while not self._stopped.is_set():
+            self.refresh()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+    
+    def refresh(self):
+        """데이터를 한 번 동기화하고 교사용 차트를 미리 렌더링합니다."""
+        started = time.perf_counter()
+        self.last_run = time.time()
+        try:
+            # TTL 0: 캐시가 있어도 새로 추가된 응답을 확인 (출처마다 가능하면 증분 동기화)
+            # 새 응답이 없으면 같은 표 객체가 돌아오므로 아래 렌더링은 모두 렌더 캐시에서 끝납니다.
+            table = load_sheet_sources(self.service, self.sources, ttl=0)
+            if table is None:
+                self.error = "데이터를 가져오지 못했습니다."
+                return
+            stale = [source for source in self.sources
+                     if (get_sheet_snapshot_status(source[0], source[1]) or {}).get('stale')]
+            if not stale:
+                self.synced_at = time.time()
+            self.rows = len(table)
+            
+            jobs = [(chart_type, None, view) for chart_type, view in PRERENDER_CHARTS]
+            errors = [error for _, chart, error in render_chart_jobs(
+                table, jobs, korean_font=self.korean_font, profile=self.profile,
+                max_workers=1, executor=_get_render_pool()) if chart is None]
+            self.charts = len(jobs) - len(errors)
+            self.rendered_at = time.time()
+            self.error = errors[0] if errors else None
+            if stale:
+                self.error = f"{len(stale)}개 출처를 갱신하지 못해 이전 데이터를 사용했습니다."
+        except Exception as e:
+            self.error = f"새로고침 중 오류가 발생했습니다: {str(e)}"
+        finally:
+            self.seconds = time.perf_counter() - started
+    
+    def status(self):
+        """작업자 상태 (실행 여부, 간격, 마지막 동기화·렌더링 시각, 행 수, 다음 실행 예정 시각, 오류)"""
+        return {
+            'running': self.running,
+            'interval': self.interval,
+            'profile': self.profile,
+            'started_at': self.started_at,
+            'last_run': self.last_run,
+            'synced_at': self.synced_at,
+            'rendered_at': self.rendered_at,
+            'next_run': self.last_run + self.interval if self.running and self.last_run else None,
+            'rows': self.rows,
+            'charts': self.charts,
+            'seconds': self.seconds,
+            'error': self.error,
+        }
+
+# 출처 목록 -> SheetRefresher
+_sheet_refreshers = {}
+_sheet_refreshers_lock = threading.Lock()
+
+def _refresher_key(sources):
+    """출처 목록을 정규화해 작업자 키로 만듭니다."""
+    key = []
+    for source in sources:
+        spreadsheet_id, range_name = normalize_sheet_range(source[0], source[1])
+        key.append((spreadsheet_id, range_name) + tuple(source[2:3]))
+    return tuple(key)
+
+def start_sheet_refresher(service, sources, interval=None, profile=None, korean_font=None):
+    """출처 목록의 백그라운드 새로고침을 시작합니다. 이미 실행 중이면 간격과 프로필만 바꿉니다."""
+    key = _refresher_key(sources)
+    if interval is None:
+        interval = BACKGROUND_REFRESH_INTERVAL or SHEET_SNAPSHOT_TTL
+    if profile is None:
+        profile = DEFAULT_RENDER_PROFILE
+    with _sheet_refreshers_lock:
+        refresher = _sheet_refreshers.get(key)
+        if refresher is not None and refresher.running:
+            refresher.configure(interval, profile)
+            return refresher
+        refresher = SheetRefresher(service, list(key), interval, profile, korean_font or get_korean_font())
+        _sheet_refreshers[key] = refresher
+        refresher.start()
+        return refresher
+
+def stop_sheet_refresher(sources=None):
+    """출처 목록의 백그라운드 새로고침을 멈춥니다. 출처를 지정하지 않으면 모두 멈춥니다."""
+    with _sheet_refreshers_lock:
+        keys = list(_sheet_refreshers) if sources is None else [_refresher_key(sources)]
+        for key in keys:
+            refresher = _sheet_refreshers.pop(key, None)
+            if refresher is not None:
+                refresher.stop()
+
+def sheet_refresher_status(sources):
+    """출처 목록의 백그라운드 새로고침 상태를 반환합니다. 작업자가 없으면 None."""
+    with _sheet_refreshers_lock:
+        refresher = _sheet_refreshers.get(_refresher_key(sources))
+    return None if refresher is None else refresher.status()
+
+def _clock(timestamp):
+    """시각(time.time() 값)을 '시:분:초'로 나타냅니다."""
+    return time.strftime('%H:%M:%S', time.localtime(timestamp)) if timestamp else '-'
+
+def _freshness_caption(sources):
+    """불러온 데이터와 미리 렌더링한 차트의 기준 시각을 한 줄로 만듭니다. 알 수 없으면 None."""
+    statuses = [get_sheet_snapshot_status(source[0], source[1]) for source in sources]
+    synced = [status['synced_at'] for status in statuses if status]
+    parts = [f"🕒 데이터 기준 {_clock(min(synced))}"] if synced else []
+    refresher = sheet_refresher_status(sources)
+    if refresher and refresher['running']:
+        parts.append(f"차트 미리 준비 {_clock(refresher['rendered_at'])}")
+        parts.append(f"{refresher['interval']}초마다 자동 새로고침")
+        if refresher['error']:
+            parts.append(f"⚠️ {refresher['error']}")
+    return ' · '.join(parts) or None
+
 def analyze_survey_data(spreadsheet_id, range_name, chart_type, student_name=None):
-    """구글 스프레드시트에서 데이터를 가져와서 시각화를 생성합니다."""
+    """구글 스프레드시트에서 데이터를 가져와서 시각화를 생성합니다. (스냅샷 캐시 사용)"""
     try:
         service = get_google_sheets_service()
         if service is None:
             return None, "구글 스프레드시트 서비스를 초기화할 수 없습니다. 인증 정보를 확인해주세요."
         
-        df = get_sheet_data(service, spreadsheet_id, range_name)
-        if df is None:
+        table = get_sheet_snapshot(service, spreadsheet_id, range_name)
+        if table is None:
             return None, "데이터를 가져오는데 실패했습니다. 스프레드시트 ID와 범위를 확인해주세요."
         
-        img_str, error = create_visualization(df, chart_type, student_name)
+        chart, error = create_visualization(table, chart_type, student_name)
         if error:
             return None, error
         
-        return img_str, None
+        return chart, None
     except Exception as e:
         return None, f"분석 중 오류가 발생했습니다: {str(e)}"
 
+def show_chart(chart, container=st):
+    """인코딩된 차트를 원본 바이트 그대로 표시하고 크기와 인코딩 시간을 함께 보여줍니다."""
+    if chart.mime == _IMAGE_MIME_TYPES[VEGA_LITE_FORMAT]:
+        # 브라우저에서 그리므로 명세(JSON)만 보냅니다.
+        container.vega_lite_chart(spec=json.loads(chart.data), use_container_width=True)
+        container.caption(
+            f"{RENDER_PROFILES[chart.profile]['label']} · {len(chart.data) / 1024:.1f}KB · "
+            f"명세 생성 {chart.encode_seconds * 1000:.1f}ms")
+        return
+    if chart.mime == 'image/svg+xml':
+        container.image(chart.data.decode(), use_container_width=True)
+    else:
+        container.image(chart.data, use_container_width=True)
+    container.caption(
+        f"{RENDER_PROFILES[chart.profile]['label']} · {len(chart.data) / 1024:.0f}KB · "
+        f"인코딩 {chart.encode_seconds * 1000:.0f}ms")
+
+def setup_page():
+    """페이지 설정과 커스텀 CSS를 적용합니다. main()의 첫 Streamlit 호출이어야 합니다."""
+    st.set_page_config(page_title="학생 설문 분석 MCP", layout="wide")
+    st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+
 def main():
+    # 페이지 설정 (모듈 import 시에는 Streamlit 호출을 하지 않습니다)
+    setup_page()
+    
     # 앱 제목 표시
     st.markdown('<h1 class="main-title">📊 학생 설문 분석 MCP</h1>', unsafe_allow_html=True)
     
-    # 한글 폰트 설정
-    korean_font = set_korean_font()
+    # 한글 폰트 설정 (프로세스당 한 번만 탐색)
+    korean_font = get_korean_font()
     
     # 사이드바 설정
     st.sidebar.title('🌈 설정')
@@ -485,6 +3173,12 @@ def main():
             except Exception as e:
                 st.error(f"인증 파일 처리 중 오류 발생: {str(e)}")
     
+    # 차트 품질 (요청마다 선택, 기본값은 배포 설정)
+    render_profile = st.sidebar.selectbox(
+        '🖼️ 차트 품질', list(RENDER_PROFILES),
+        index=list(RENDER_PROFILES).index(DEFAULT_RENDER_PROFILE) if DEFAULT_RENDER_PROFILE in RENDER_PROFILES else 0,
+        format_func=lambda name: RENDER_PROFILES[name]['label'])
+    
     # 데이터 입력 방식 선택
     data_input_method = st.sidebar.radio(
         "데이터 입력 방식", 
@@ -495,21 +3189,69 @@ def main():
     df = None
     spreadsheet_id = None
     range_name = None
+    # 데이터와 미리 렌더링한 차트의 기준 시각 (스프레드시트 모드)
+    freshness = None
     
     if data_input_method == "📊 구글 스프레드시트 사용":
         st.sidebar.header('📋 스프레드시트 설정')
         spreadsheet_id = st.sidebar.text_input('📝 스프레드시트 ID를 입력하세요')
         range_name = st.sidebar.text_input('📍 데이터 범위를 입력하세요 (예: Sheet1!A1:F100)')
+        extra_sources = st.sidebar.text_area(
+            '🏫 다른 반 함께 불러오기 (선택)',
+            help="한 줄에 하나씩 '스프레드시트 ID, 범위, 반 이름' 형식으로 입력하세요.")
         
-        if spreadsheet_id and range_name:
+        sources = [(spreadsheet_id, range_name)] if spreadsheet_id and range_name else []
+        sources += parse_sheet_sources(extra_sources)
+        
+        if sources:
+            # 캐시된 스냅샷을 버리고 시트를 다시 불러오기
+            if st.sidebar.button('🔄 데이터 새로고침', use_container_width=True):
+                for source in sources:
+                    invalidate_sheet_snapshot(source[0], source[1])
+            
             service = get_google_sheets_service()
             if service:
                 with st.spinner('구글 스프레드시트에서 데이터를 가져오는 중...'):
-                    df = get_sheet_data(service, spreadsheet_id, range_name)
+                    # 여러 반이면 한 번에 불러와 합치기
+                    df = load_sheet_sources(service, sources)
                     if df is not None:
                         st.sidebar.success("스프레드시트에서 데이터를 성공적으로 가져왔습니다. ✅")
+                        for source in sources:
+                            status = get_sheet_snapshot_status(source[0], source[1])
+                            if status and status['stale']:
+                                synced_at = time.strftime('%H:%M:%S', time.localtime(status['synced_at']))
+                                st.sidebar.warning(f"요청 한도 초과로 {synced_at}에 불러온 데이터를 표시합니다. ({source[1]})")
                     else:
                         st.sidebar.error("데이터를 가져오는데 실패했습니다. 스프레드시트 ID와 범위를 확인해주세요.")
+                
+                # 백그라운드 새로고침 (새 응답 확인과 교사용 차트 미리 렌더링)
+                if df is not None:
+                    if BACKGROUND_REFRESH_INTERVAL and sheet_refresher_status(sources) is None:
+                        start_sheet_refresher(service, sources, profile=render_profile, korean_font=korean_font)
+                    with st.sidebar.expander('⏱️ 자동 새로고침', expanded=False):
+                        refresher = sheet_refresher_status(sources)
+                        default_interval = refresher['interval'] if refresher else (
+                            BACKGROUND_REFRESH_INTERVAL or SHEET_SNAPSHOT_TTL)
+                        interval = st.number_input(
+                            '새로고침 간격 (초)', min_value=BACKGROUND_REFRESH_MIN_INTERVAL,
+                            value=max(int(default_interval), BACKGROUND_REFRESH_MIN_INTERVAL), step=30)
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            if st.button('▶️ 시작', use_container_width=True):
+                                start_sheet_refresher(service, sources, interval, render_profile, korean_font)
+                        with col2:
+                            if st.button('⏹️ 중지', use_container_width=True, disabled=refresher is None):
+                                stop_sheet_refresher(sources)
+                        refresher = sheet_refresher_status(sources)
+                        if refresher and refresher['running']:
+                            st.caption(
+                                f"🟢 실행 중 · 마지막 동기화 {_clock(refresher['synced_at'])} · "
+                                f"다음 실행 {_clock(refresher['next_run'])} · {refresher['rows'] or 0}행")
+                            if refresher['error']:
+                                st.caption(f"⚠️ {refresher['error']}")
+                        else:
+                            st.caption("⚪ 멈춤 · 시작하면 새 응답을 주기적으로 확인하고 교사용 차트를 미리 그려 둡니다.")
+                    freshness = _freshness_caption(sources)
             else:
                 st.sidebar.error("구글 스프레드시트 서비스 초기화에 실패했습니다. 인증 정보를 확인해주세요.")
         else:
@@ -519,16 +3261,26 @@ def main():
         uploaded_file = st.sidebar.file_uploader("설문 데이터 CSV 업로드", type=['csv'])
         if uploaded_file is not None:
             try:
-                df = pd.read_csv(uploaded_file)
-                st.sidebar.success("파일이 성공적으로 업로드되었습니다. ✅")
+                # 같은 업로드는 세션에 보관한 표를 그대로 사용합니다. (화면을 다시 그릴 때마다 파일 전체를 해시하지 않음)
+                upload_key = (getattr(uploaded_file, 'file_id', None) or uploaded_file.name, uploaded_file.size)
+                cached = st.session_state.get('csv_upload')
+                if cached is not None and cached[0] == upload_key:
+                    df = cached[1]
+                else:
+                    # 큰 파일도 나눠서 읽고, 구글 시트와 같은 방식으로 컬럼명과 값을 변환합니다.
+                    with st.spinner('CSV 파일을 읽는 중...'):
+                        df = read_survey_csv(uploaded_file)
+                    st.session_state['csv_upload'] = (upload_key, df)
+                st.sidebar.success(f"파일이 성공적으로 업로드되었습니다. ({len(df)}행) ✅")
             except Exception as e:
                 st.sidebar.error(f"파일 로드 중 오류가 발생했습니다: {str(e)}")
     else:  # 예제 데이터 사용
-        df = load_example_data()
+        df = load_example_data(seed=EXAMPLE_DATA_SEED)
         st.sidebar.success("예제 데이터가 로드되었습니다. ✅")
     
-    # 데이터가 로드된 경우에만 탭 표시
-    if df is not None:
+    # 데이터가 로드된 경우에만 탭 표시 (모든 화면은 압축된 SurveyTable에서 읽음)
+    table = as_survey_table(df)
+    if table is not None:
         # 탭 생성: 학생용 / 교사용
         tab1, tab2 = st.tabs(["👨‍🎓 학생용", "👨‍🏫 교사용"])
         
@@ -537,8 +3289,8 @@ def main():
             st.header("🧩 내 설문 데이터 확인하기")
             
             # 학생 이름 선택
-            if '학생 이름' in df.columns:
-                student_options = sorted(df['학생 이름'].unique().tolist())
+            if table.has_column('학생 이름'):
+                student_options = table.student_names()
                 
                 col1, col2 = st.columns([3, 1])
                 with col1:
@@ -549,26 +3301,31 @@ def main():
                 if student_name and show_data:
                     # 학생별 설문 응답 차트
                     with st.spinner('데이터를 분석하는 중...'):
-                        if data_input_method == "📊 구글 스프레드시트 사용" and spreadsheet_id and range_name:
-                            # 구글 스프레드시트 데이터 분석
-                            img_str, error = analyze_survey_data(spreadsheet_id, range_name, '학생별 설문 응답', student_name)
-                        else:
-                            # 로컬 데이터 분석
-                            img_str, error = create_visualization(df, '학생별 설문 응답', student_name)
+                        # 이미 불러온 데이터로 분석 (스프레드시트는 스냅샷을 공유)
+                        chart, error = create_visualization(
+                            table, '학생별 설문 응답', student_name, korean_font=korean_font, profile=render_profile)
                             
-                        if img_str:
+                        if chart:
                             st.success(f'"{student_name}" 학생의 설문 응답 분석이 완료되었습니다!')
-                            st.image(f"data:image/png;base64,{img_str}", use_container_width=True)
+                            show_chart(chart)
                             
                             # 변화 추이 차트
-                            if data_input_method == "📊 구글 스프레드시트 사용" and spreadsheet_id and range_name:
-                                img_str2, error2 = analyze_survey_data(spreadsheet_id, range_name, '학생별 변화 추이', student_name)
-                            else:
-                                img_str2, error2 = create_visualization(df, '학생별 변화 추이', student_name)
+                            chart2, error2 = create_visualization(
+                                table, '학생별 변화 추이', student_name, korean_font=korean_font, profile=render_profile)
                                 
-                            if img_str2:
+                            if chart2:
                                 st.subheader("📈 수업 전후 변화")
-                                st.image(f"data:image/png;base64,{img_str2}", use_container_width=True)
+                                show_chart(chart2)
+                            
+                            # 여러 수업에 응답했으면 수업별 변화 추이도 표시
+                            sessions, _ = table.rollup('session').student_series(student_name, SURVEY_ITEMS)
+                            if len(sessions) > 1:
+                                chart3, error3 = create_visualization(
+                                    table, '학생별 장기 추이', student_name, korean_font=korean_font,
+                                    view='session', profile=render_profile)
+                                if chart3:
+                                    st.subheader("📅 수업별 변화 추이")
+                                    show_chart(chart3)
                         else:
                             st.error(error)
             else:
@@ -577,98 +3334,110 @@ def main():
         # 전체 데이터 분석 (교사용 탭)
         with tab2:
             st.header("📊 전체 학생 설문 분석")
+            if freshness:
+                st.caption(freshness)
             
             # 분석 유형 선택
-            chart_options = ['문항별 평균 점수', '문항별 상관관계', '모든 학생 응답 비교']
+            chart_options = ['문항별 평균 점수', '문항별 상관관계', '모든 학생 응답 비교', '장기 추이']
             chart_type = st.selectbox('📈 분석 유형 선택', chart_options)
             
+            # 장기 추이: 기간 단위와 대상(반 전체 또는 학생 한 명) 선택
+            trend_period = None
+            trend_student = None
+            if chart_type == '장기 추이':
+                col1, col2 = st.columns(2)
+                with col1:
+                    trend_period = st.selectbox('📅 기간 단위', list(ROLLUP_PERIODS), format_func=ROLLUP_PERIODS.get)
+                with col2:
+                    trend_target = st.selectbox('👥 대상', ['반 전체'] + table.student_names())
+                if trend_target == '반 전체':
+                    chart_type = '반 전체 장기 추이'
+                else:
+                    chart_type = '학생별 장기 추이'
+                    trend_student = trend_target
+            
+            # 문항 통계: 여러 반을 불러온 경우 반 선택 (기본값은 전체)
+            cohort = None
+            if chart_type in STATS_CHART_TYPES and len(table.stats.cohorts) > 1:
+                cohort = st.selectbox('🏫 반 선택', [None] + list(table.stats.cohorts),
+                                      format_func=lambda name: '전체' if name is None else name)
+            
+            # 모든 학생 비교 화면 종류 (자동: 학생 수가 많으면 집계 화면으로 전환)
+            all_students_view = None
+            if chart_type == '모든 학생 응답 비교':
+                all_students_view = st.selectbox(
+                    '🖼️ 표시 방식', list(ALL_STUDENTS_VIEWS), format_func=ALL_STUDENTS_VIEWS.get)
+            
             # 분석 버튼
             if st.button('✨ 분석 실행', use_container_width=True):
                 with st.spinner('데이터를 분석하는 중...'):
                     if chart_type == '모든 학생 응답 비교':
                         # 모든 학생의 데이터를 한 페이지에 표시
-                        if '학생 이름' in df.columns:
-                            students = sorted(df['학생 이름'].unique().tolist())
-                            
-                            # 학생별 응답을 그리드 형태로 표시
-                            st.subheader(f"📋 전체 {len(students)}명의 학생 응답")
-                            
-                            survey_items = ['수업 기대도', '긴장도', '재미 예상도', '자신감', '집중도', 
-                                        '즐거움', '자신감 변화', '재미 변화', '긴장도 변화', '이해도']
+                        if table.has_column('학생 이름'):
+                            st.subheader(f"📋 전체 {len(table.student_names())}명의 학생 응답")
                             
                             # 모든 학생 데이터를 하나의 큰 차트로 시각화
-                            try:
-                                fig = plt.figure(figsize=(12, 8), dpi=100)
-                                ax = fig.add_subplot(111)
-                                
-                                # 각 학생별로 다른 색상 사용
-                                colors = plt.cm.tab20(np.linspace(0, 1, len(students)))
-                                
-                                for i, student in enumerate(students):
-                                    student_data = df[df['학생 이름'] == student]
-                                    values = []
-                                    for item in survey_items:
-                                        if item in student_data.columns:
-                                            val = student_data[item].iloc[0]
-                                            values.append(float(val) if pd.notna(val) else 0)
-                                        else:
-                                            values.append(0)
-                                            
-                                    # 각 학생의 데이터를 선 그래프로 표시
-                                    ax.plot(range(len(survey_items)), values, marker='o', 
-                                           color=colors[i], label=student, linewidth=2, alpha=0.7)
-                                
-                                # 차트 설정
-                                ax.set_title('모든 학생의 설문 응답 비교', fontsize=16, fontweight='bold', fontproperties=korean_font)
-                                ax.set_xticks(range(len(survey_items)))
-                                ax.set_xticklabels(survey_items, rotation=45, ha='right', fontsize=10, fontproperties=korean_font)
-                                ax.set_ylabel('점수 (1-5)', fontsize=12, fontproperties=korean_font)
-                                ax.set_ylim(0, 5)
-                                ax.grid(True, linestyle='--', alpha=0.7)
-                                
-                                # 범례 추가
-                                ax.legend(title='학생 이름', bbox_to_anchor=(1.05, 1), loc='upper left', 
-                                          prop=korean_font, fontsize=9)
-                                
-                                # 여백 조정
-                                plt.tight_layout(pad=3.0)
-                                
-                                # 그래프를 base64로 인코딩
-                                buf = BytesIO()
-                                plt.savefig(buf, format='png', bbox_inches='tight', dpi=300, facecolor='white')
-                                buf.seek(0)
-                                img_str = base64.b64encode(buf.getvalue()).decode()
-                                plt.close()
-                                
+                            chart, error = create_visualization(
+                                table, chart_type, korean_font=korean_font, view=all_students_view,
+                                profile=render_profile)
+                            if chart:
                                 # 이미지 표시
-                                st.image(f"data:image/png;base64,{img_str}", use_container_width=True)
+                                show_chart(chart)
                                 
                                 # 평균값도 함께 표시
                                 st.subheader("📌 문항별 평균 점수")
-                                if data_input_method == "📊 구글 스프레드시트 사용" and spreadsheet_id and range_name:
-                                    avg_img_str, _ = analyze_survey_data(spreadsheet_id, range_name, '문항별 평균 점수')
-                                else:
-                                    avg_img_str, _ = create_visualization(df, '문항별 평균 점수')
-                                
-                                if avg_img_str:
-                                    st.image(f"data:image/png;base64,{avg_img_str}", use_container_width=True)
+                                avg_chart, _ = create_visualization(
+                                    table, '문항별 평균 점수', korean_font=korean_font, profile=render_profile)
                                 
-                            except Exception as e:
-                                st.error(f"시각화 중 오류가 발생했습니다: {str(e)}")
+                                if avg_chart:
+                                    show_chart(avg_chart)
+                            else:
+                                st.error(f"시각화 중 오류가 발생했습니다: {error}")
                         else:
                             st.error("데이터에 '학생 이름' 컬럼이 없습니다.")
                     else:
-                        # 기존 차트 타입 (평균 점수, 상관관계)
-                        if data_input_method == "📊 구글 스프레드시트 사용" and spreadsheet_id and range_name:
-                            img_str, error = analyze_survey_data(spreadsheet_id, range_name, chart_type)
-                        else:
-                            img_str, error = create_visualization(df, chart_type)
+                        # 기존 차트 타입 (평균 점수, 상관관계)과 장기 추이
+                        chart, error = create_visualization(
+                            table, chart_type, trend_student, korean_font=korean_font, view=trend_period or cohort,
+                            profile=render_profile)
                             
-                        if img_str:
+                        if chart:
                             st.success('분석이 완료되었습니다!')
-                            st.image(f"data:image/png;base64,{img_str}", use_container_width=True)
+                            show_chart(chart)
                         else:
                             st.error(error)
+            
+            # 학생별 보고서 일괄 내보내기
+            if table.has_column('학생 이름'):
+                st.divider()
+                st.subheader("📦 학생별 보고서 일괄 내보내기")
+                export_format = st.radio(
+                    '내보내기 형식', list(EXPORT_FORMATS), format_func=EXPORT_FORMATS.get, horizontal=True)
+                
+                if st.button('📦 보고서 만들기', use_container_width=True):
+                    progress_bar = st.progress(0.0, text='보고서를 만드는 중...')
+                    
+                    def report_progress(done, total):
+                        progress_bar.progress(done / total, text=f'보고서를 만드는 중... ({done}/{total}명)')
+                    
+                    # 결과는 임시 파일에 바로 기록하여 모든 이미지를 메모리에 두지 않습니다.
+                    with tempfile.TemporaryFile() as output:
+                        try:
+                            summary = export_student_reports(
+                                table, output, export_format, korean_font=korean_font,
+                                profile=render_profile, progress=report_progress)
+                        except Exception as e:
+                            st.error(f"보고서를 만드는 중 오류가 발생했습니다: {str(e)}")
+                        else:
+                            st.success(
+                                f"{summary['exported']}명의 보고서를 {summary['seconds']:.1f}초 만에 만들었습니다. "
+                                f"({summary['bytes'] / 1024 / 1024:.1f}MB)")
+                            if summary['skipped']:
+                                st.warning(f"응답을 찾을 수 없어 제외한 학생: {', '.join(summary['skipped'])}")
+                            output.seek(0)
+                            st.download_button(
+                                '⬇️ 보고서 내려받기', output.read(), file_name=f'학생별_보고서.{export_format}',
+                                mime=_EXPORT_MIME_TYPES[export_format], use_container_width=True)
     else:
         if data_input_method == "📊 구글 스프레드시트 사용":
             st.info("👈 사이드바에서 스프레드시트 ID와 범위를 입력한 후 데이터를 불러와주세요.")
@@ -677,6 +3446,26 @@ def main():
         else:
             st.error("예제 데이터를 로드하는 중 오류가 발생했습니다.")
     
+    # 차트 렌더 캐시 현황 (프로세스 전체 공유)
+    cache_stats = render_cache_stats()
+    st.sidebar.caption(
+        f"🗂️ 차트 캐시: 적중 {cache_stats['hits']}회 · 미적중 {cache_stats['misses']}회 · "
+        f"{cache_stats['entries']}개 ({cache_stats['bytes'] / 1024 / 1024:.1f}MB)")
+    
+    # 세션 간에 공유하는 스프레드시트 데이터 현황
+    registry = dataset_registry_report()
+    if registry['datasets']:
+        sessions = {session_id for dataset in registry['datasets'] for session_id in dataset['sessions']}
+        st.sidebar.caption(
+            f"🔗 공유 데이터: {len(registry['datasets'])}개 ({registry['bytes'] / 1024 / 1024:.1f}MB) · "
+            f"사용 중인 세션 {len(sessions)}개 · 요청 {registry['requests']}회 중 불러오기 {registry['loads']}회")
+    
+    # 품질 프로필별 평균 이미지 크기와 인코딩 시간
+    for name, stats in render_profile_stats().items():
+        st.sidebar.caption(
+            f"📦 {RENDER_PROFILES[name]['label']}: 평균 {stats['avg_bytes'] / 1024:.0f}KB · "
+            f"{stats['avg_seconds'] * 1000:.0f}ms ({stats['count']}회)")
+    
     # 앱 사용법 안내
     with st.expander("📚 앱 사용 안내", expanded=False):
         st.markdown("""
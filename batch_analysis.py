@@ -0,0 +1,275 @@
+"""설문 차트 일괄 분석 (명령줄)
+
+브라우저 없이 여러 반의 차트를 한 번에 렌더링해 출력 디렉토리에 저장하고,
+실행 결과를 JSON 요약으로 남깁니다. cron 등에서 야간 사전 계산에 사용합니다.
+
+    python -m batch_analysis "1AbC...,Sheet1!A1:O,1반" data/2반.csv -o charts
+    python -m batch_analysis --sources-file sources.txt --chart 문항별 평균 점수 --chart 학생별 설문 응답
+
+출처는 CSV 파일 경로이거나 웹 앱과 같은 '스프레드시트 ID, 범위[, 반 이름]' 형식의 문자열입니다.
+데이터 읽기와 차트 렌더링은 웹 앱(app.py)과 같은 함수를 사용하며,
+Streamlit 화면 대신 로그로 안내 메시지를 남기는 리포터를 사용합니다.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import app
+
+logger = logging.getLogger('batch_analysis')
+
+# 반 전체 차트 (기본으로 그리는 차트)
+CLASS_CHART_TYPES = ('문항별 평균 점수', '문항별 상관관계', '모든 학생 응답 비교', '반 전체 장기 추이')
+
+# 그릴 수 있는 모든 차트 (학생별 차트는 모든 학생에 대해 하나씩 그림)
+CHART_TYPES = CLASS_CHART_TYPES + app.STUDENT_CHART_TYPES
+
+# 리포터 메시지 수준 -> 로그 수준
+_LOG_LEVELS = {
+    'success': logging.INFO,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+}
+
+class RunReporter:
+    """분석 함수의 안내 메시지를 로그로 남기고 실행 요약에 넣기 위해 모아 둡니다."""
+
+    def __init__(self):
+        self.messages = []
+        self.context = None
+        self._lock = threading.Lock()
+
+    def _add(self, level, message):
+        logger.log(_LOG_LEVELS[level], message)
+        with self._lock:
+            self.messages.append({'level': level, 'source': self.context, 'message': str(message)})
+
+    def success(self, message):
+        self._add('success', message)
+
+    def info(self, message):
+        self._add('info', message)
+
+    def warning(self, message):
+        self._add('warning', message)
+
+    def error(self, message):
+        self._add('error', message)
+
+def parse_source(text):
+    """명령줄 출처를 ('csv', 경로, 이름) 또는 ('sheet', (스프레드시트 ID, 범위), 이름)으로 변환합니다."""
+    text = text.strip()
+    if os.path.isfile(text):
+        return 'csv', text, os.path.splitext(os.path.basename(text))[0]
+    sources = app.parse_sheet_sources(text)
+    if not sources:
+        raise ValueError(f"CSV 파일 경로나 '스프레드시트 ID, 범위[, 반 이름]' 형식이 아닙니다: {text}")
+    source = sources[0]
+    spreadsheet_id, range_name = app.normalize_sheet_range(source[0], source[1])
+    label = source[2] if len(source) > 2 and source[2] else app.source_label(spreadsheet_id, range_name)
+    return 'sheet', (spreadsheet_id, range_name), label
+
+def load_source(kind, location, service=None):
+    """출처의 설문 데이터를 SurveyTable로 불러옵니다. 실패하면 None을 반환합니다."""
+    if kind == 'csv':
+        return app.read_survey_csv(location)
+    if kind == 'example':
+        return app.as_survey_table(app.load_example_data())
+    if service is None:
+        return None
+    return app.get_sheet_snapshot(service, *location)
+
+def chart_jobs(table, chart_types, period='session', view=None):
+    """차트 유형 목록을 render_chart_jobs에 넘길 (차트 유형, 학생 이름, view) 목록으로 펼칩니다."""
+    jobs = []
+    for chart_type in chart_types:
+        if chart_type in app.TREND_CHART_TYPES:
+            chart_view = period
+        elif chart_type == '모든 학생 응답 비교':
+            chart_view = view
+        else:
+            chart_view = None
+        if chart_type in app.STUDENT_CHART_TYPES:
+            jobs.extend((chart_type, name, chart_view) for name in table.student_names())
+        else:
+            jobs.append((chart_type, None, chart_view))
+    return jobs
+
+def chart_filename(chart_type, student_name, chart_format):
+    """차트 파일 이름을 만듭니다. (학생별 차트는 차트 유형 디렉토리 아래 학생 이름)"""
+    if student_name is None:
+        return f"{app.safe_filename(chart_type)}.{chart_format}"
+    return os.path.join(app.safe_filename(chart_type), f"{app.safe_filename(student_name)}.{chart_format}")
+
+def run(sources, chart_types, output_dir, profile=None, period='session', view=None,
+        max_workers=None, reporter=None):
+    """출처마다 차트를 렌더링해 output_dir/<반 이름>/ 아래에 저장하고 실행 요약(dict)을 반환합니다.
+
+    sources는 parse_source()의 결과 목록입니다. 모든 출처가 프로세스 풀 하나를 함께 사용합니다.
+    """
+    started = time.perf_counter()
+    if profile is None:
+        profile = app.DEFAULT_RENDER_PROFILE
+    workers = app.EXPORT_PROCESS_WORKERS if max_workers is None else max_workers
+    reporter = reporter or RunReporter()
+    previous = app.set_reporter(reporter)
+    # 파일 확장자 (브라우저 렌더링 프로필은 Vega-Lite 명세 JSON으로 저장)
+    settings = app.RENDER_PROFILES[profile]
+    chart_format = settings.get('extension', settings['format'])
+
+    summary = {
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'output_dir': os.path.abspath(output_dir),
+        'profile': profile,
+        'workers': workers,
+        'chart_types': list(chart_types),
+        'sources': [],
+        'charts': [],
+    }
+    executor = None
+    try:
+        service = None
+        if any(kind == 'sheet' for kind, _, _ in sources):
+            service = app.get_google_sheets_service()
+        korean_font = app.get_korean_font()
+        if workers > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+        used_dirs = set()
+        for kind, location, label in sources:
+            reporter.context = label
+            entry = {'source': location if kind != 'sheet' else ', '.join(location), 'label': label,
+                     'rendered': 0, 'failed': 0, 'error': None}
+            summary['sources'].append(entry)
+            load_started = time.perf_counter()
+            try:
+                table = load_source(kind, location, service)
+            except Exception as e:
+                reporter.error(f"'{label}' 데이터를 불러오는 중 오류가 발생했습니다: {str(e)}")
+                table = None
+            entry['load_seconds'] = round(time.perf_counter() - load_started, 3)
+            if table is None or len(table) == 0:
+                entry['error'] = "데이터를 불러오지 못했습니다."
+                continue
+            entry['rows'] = len(table)
+            entry['students'] = len(table.student_names())
+
+            # 반 이름이 같은 출처는 디렉토리를 나눠 덮어쓰지 않게 합니다.
+            source_dir = app.safe_filename(label)
+            while source_dir in used_dirs:
+                source_dir += '_'
+            used_dirs.add(source_dir)
+
+            jobs = chart_jobs(table, chart_types, period, view)
+            results = app.render_chart_jobs(
+                table, jobs, korean_font=korean_font, profile=profile,
+                max_workers=workers, executor=executor)
+            for (chart_type, student_name, _), chart, error in results:
+                record = {'source': label, 'chart_type': chart_type, 'student': student_name}
+                if chart is None:
+                    record['error'] = error
+                    entry['failed'] += 1
+                    reporter.warning(f"{label} / {chart_type}{f' / {student_name}' if student_name else ''}: {error}")
+                else:
+                    path = os.path.join(output_dir, source_dir, chart_filename(chart_type, student_name, chart_format))
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with open(path, 'wb') as f:
+                        f.write(chart.data)
+                    record.update(path=os.path.relpath(path, output_dir), bytes=len(chart.data),
+                                  render_seconds=round(chart.encode_seconds, 4))
+                    entry['rendered'] += 1
+                summary['charts'].append(record)
+    finally:
+        reporter.context = None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        app.set_reporter(previous)
+
+    summary['rendered'] = sum(entry['rendered'] for entry in summary['sources'])
+    summary['failed'] = (sum(entry['failed'] for entry in summary['sources'])
+                         + sum(entry['error'] is not None for entry in summary['sources']))
+    summary['ok'] = summary['failed'] == 0 and bool(summary['sources'])
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+    summary['messages'] = reporter.messages
+    return summary
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m batch_analysis',
+        description='설문 데이터의 차트를 일괄 렌더링하고 JSON 실행 요약을 남깁니다.')
+    parser.add_argument('sources', nargs='*', metavar='SOURCE',
+                        help="CSV 파일 경로 또는 '스프레드시트 ID, 범위[, 반 이름]'")
+    parser.add_argument('--sources-file', metavar='FILE',
+                        help='한 줄에 출처 하나씩 적은 파일 (빈 줄과 #으로 시작하는 줄은 무시)')
+    parser.add_argument('--example', action='store_true', help='예제 데이터를 출처로 추가')
+    parser.add_argument('-c', '--chart', action='append', dest='charts', metavar='CHART',
+                        help=f"그릴 차트 유형 (여러 번 지정 가능, 'all'은 모든 차트, 기본값: 반 전체 차트) "
+                             f"선택지: {', '.join(CHART_TYPES)}")
+    parser.add_argument('-o', '--output-dir', default='batch_output', help='출력 디렉토리 (기본값: batch_output)')
+    parser.add_argument('--profile', default=app.DEFAULT_RENDER_PROFILE, choices=list(app.RENDER_PROFILES),
+                        help='렌더 품질 프로필')
+    parser.add_argument('--period', default='session', choices=list(app.ROLLUP_PERIODS),
+                        help='장기 추이 차트의 기간 단위')
+    parser.add_argument('--view', default=None, choices=list(app.ALL_STUDENTS_VIEWS),
+                        help="'모든 학생 응답 비교'의 표시 방식 (기본값: 학생 수에 따라 자동)")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='렌더링 프로세스 수 (기본값: EXPORT_PROCESS_WORKERS, 1이면 현재 프로세스에서 렌더링)')
+    parser.add_argument('--credentials', metavar='FILE', help='Google API 서비스 계정 인증 파일')
+    parser.add_argument('--summary', metavar='FILE',
+                        help="실행 요약 JSON 경로 (기본값: <출력 디렉토리>/summary.json, '-'이면 표준 출력)")
+    parser.add_argument('-q', '--quiet', action='store_true', help='경고와 오류만 출력')
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO,
+                        format='%(asctime)s %(levelname)s %(message)s', stream=sys.stderr)
+
+    texts = list(args.sources)
+    if args.sources_file:
+        with open(args.sources_file, encoding='utf-8') as f:
+            texts.extend(line for line in f if line.strip() and not line.lstrip().startswith('#'))
+    try:
+        sources = [parse_source(text) for text in texts]
+    except ValueError as e:
+        parser.error(str(e))
+    if args.example:
+        sources.append(('example', None, '예제 데이터'))
+    if not sources:
+        parser.error('출처를 하나 이상 지정해주세요.')
+
+    chart_types = args.charts or list(CLASS_CHART_TYPES)
+    if 'all' in chart_types:
+        chart_types = list(CHART_TYPES)
+    unknown = [chart_type for chart_type in chart_types if chart_type not in CHART_TYPES]
+    if unknown:
+        parser.error(f"알 수 없는 차트 유형입니다: {', '.join(unknown)}")
+    if args.credentials:
+        os.environ['GOOGLE_CREDENTIALS_PATH'] = args.credentials
+
+    summary = run(sources, chart_types, args.output_dir, profile=args.profile, period=args.period,
+                  view=args.view, max_workers=args.workers)
+
+    text = json.dumps(summary, ensure_ascii=False, indent=2)
+    if args.summary == '-':
+        print(text)
+    else:
+        summary_path = args.summary or os.path.join(args.output_dir, 'summary.json')
+        os.makedirs(os.path.dirname(os.path.abspath(summary_path)), exist_ok=True)
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        logger.info(f"차트 {summary['rendered']}개 완료, 실패 {summary['failed']}개 "
+                    f"({summary['seconds']:.1f}초). 요약: {summary_path}")
+    return 0 if summary['ok'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
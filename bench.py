@@ -0,0 +1,360 @@
+"""분석 파이프라인 성능 측정 (명령줄)
+
+합성 설문 데이터(app.load_example_data, app.example_sheet_values)를 크기별로 만들어
+단계마다 따로 시간을 잽니다.
+
+    python -m bench                       # small, medium, large 크기 모두 측정
+    python -m bench --size large -r 10    # 한 크기만 10번 반복
+    python -m bench --students 50 --sessions 200 --classes 4 > bench_output.txt
+
+측정 단계는 app import 시간, 합성 데이터 생성, 가짜 Sheets 서비스를 통한 get_sheet_data 파싱과
+증분 동기화(헤더 + 추가된 행), 반마다 출처가 따로 있는 load_multiple_sheets의 전체 불러오기·캐시·증분 동기화,
+create_visualization의 차트 유형별 시간, '모든 학생 응답 비교'의 화면 종류별 시간, PNG 인코딩입니다.
+결과는 실행 기록(JSON Lines)에 쌓이고, 같은 환경·같은 크기의 최근 기록 중앙값보다 느려진 단계와
+import 시간 예산을 넘긴 경우를 회귀로 표시합니다. (--fail-on-regression이면 종료 코드 1)
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+
+# 측정이 디스크 스냅샷 저장소와 API 할당량 대기에 영향을 받지 않도록 app을 불러오기 전에 설정합니다.
+os.environ.setdefault('SNAPSHOT_STORE_DIR', '')
+os.environ.setdefault('SHEETS_QUOTA_PER_MINUTE', '1000000')
+
+import app
+
+# 측정할 데이터 크기 (n_students는 반마다의 학생 수)
+SIZES = {
+    'small': {'n_students': 10, 'n_sessions': 1, 'n_classes': 1},
+    'medium': {'n_students': 30, 'n_sessions': 20, 'n_classes': 3},
+    'large': {'n_students': 40, 'n_sessions': 100, 'n_classes': 10},
+}
+
+# 모든 크기에 공통인 결측 응답 비율과 끝 셀이 잘린 행 비율
+MISSING_RATE = 0.05
+RAGGED_RATE = 0.1
+
+# 증분 동기화 측정에서 한 번에 추가하는 행 수 (출처마다)
+TAIL_ROWS = 5
+
+# 여러 출처 측정에서 반(출처)을 나눠 담는 스프레드시트 수
+MULTI_SOURCE_SPREADSHEETS = 2
+
+# 차트 유형별로 측정할 (학생 차트 여부, view)
+CHART_CASES = {
+    '학생별 설문 응답': (True, None),
+    '학생별 변화 추이': (True, None),
+    '학생별 장기 추이': (True, 'session'),
+    '문항별 평균 점수': (False, None),
+    '문항별 상관관계': (False, None),
+    '반 전체 장기 추이': (False, 'session'),
+}
+
+# 'import app'에 허용하는 시간 (초, 무거운 모듈은 처음 쓸 때 불러오므로 보통 1초 미만)
+IMPORT_BUDGET_SECONDS = float(os.getenv('BENCH_IMPORT_BUDGET', '1.0'))
+
+# 실행 기록 파일 (한 줄에 실행 한 번)
+BENCH_HISTORY_PATH = os.getenv(
+    'BENCH_HISTORY_PATH', os.path.join(os.path.expanduser('~'), '.cache', 'mathemotion', 'bench_history.jsonl'))
+
+# 회귀로 판단하는 기준: 기준값보다 이 비율 이상, 그리고 이 시간(초) 이상 느려진 경우
+REGRESSION_TOLERANCE = 0.25
+REGRESSION_MIN_SECONDS = 0.002
+
+class _FakeRequest:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self, http=None, num_retries=0):
+        return self.result
+
+class FakeSheetsService:
+    """구글 시트 API 대신 미리 만든 values를 돌려주는 서비스입니다. (네트워크 없이 파싱만 측정)
+
+    sheets는 (스프레드시트 ID, 시트 이름) -> 셀 값(헤더 행 + 데이터 행) 사전입니다.
+    범위의 행 번호만 해석하므로 증분 동기화의 헤더 행·마지막 행 이후 요청도 실제 API처럼 잘라서 돌려줍니다.
+    calls에는 요청마다 (메서드 이름, 스프레드시트 ID, 범위 목록)이 쌓입니다.
+    """
+
+    def __init__(self, sheets):
+        self.sheets = sheets
+        self.calls = []
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def _value_range(self, spreadsheet_id, range_name):
+        prefix, _, start_row, _, end_row = app._split_a1_range(range_name)
+        rows = self.sheets[(spreadsheet_id, prefix.rstrip('!').strip("'"))]
+        return {'range': range_name, 'values': rows[start_row - 1:end_row]}
+
+    def get(self, spreadsheetId, range, **kwargs):
+        self.calls.append(('get', spreadsheetId, [range]))
+        return _FakeRequest(self._value_range(spreadsheetId, range))
+
+    def batchGet(self, spreadsheetId, ranges, **kwargs):
+        self.calls.append(('batchGet', spreadsheetId, list(ranges)))
+        return _FakeRequest({'valueRanges': [self._value_range(spreadsheetId, range_name) for range_name in ranges]})
+
+def measure(fn, repeat):
+    """fn을 한 번 미리 실행한 뒤 repeat번 실행하고 {'median', 'min'} (초)를 반환합니다."""
+    fn()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return {'median': statistics.median(times), 'min': min(times)}
+
+def measure_import(repeat=3):
+    """새 파이썬 프로세스에서 'import app'에 걸리는 시간 중 가장 짧은 값(초)을 반환합니다."""
+    code = 'import time; started = time.perf_counter(); import app; print(time.perf_counter() - started)'
+    root = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True)
+        times.append(float(result.stdout.strip().splitlines()[-1]))
+    return min(times)
+
+def _chart_stage(df, chart_type, student_name, view, korean_font):
+    """렌더 캐시를 비우고 차트 하나를 그리는 측정 함수를 만듭니다."""
+    def run():
+        app.clear_render_cache()
+        chart, error = app.create_visualization(df, chart_type, student_name, korean_font, view=view, profile='standard')
+        if error:
+            raise RuntimeError(f"{chart_type}: {error}")
+    return run
+
+def _png_encode_stage(df, korean_font):
+    """미리 그려 둔 그래프를 PNG로 인코딩만 하는 측정 함수를 만듭니다. (문항별 상관관계)"""
+    import chart_engine
+
+    spec, _ = app._chart_spec(app.as_survey_table(df), '문항별 상관관계', None)
+    fig = chart_engine.new_figure()
+    chart_engine.DRAWERS[spec['kind']](fig, spec, chart_engine.font_properties(app._font_source(korean_font)))
+    fig.tight_layout(pad=3.0)
+    profile = app.RENDER_PROFILES['standard']
+    return lambda: chart_engine.encode_figure(fig, profile)
+
+def _tail_rows(params, seed):
+    """증분 동기화 측정에서 시트 끝에 덧붙일 새 응답 행을 만듭니다."""
+    values = app.example_sheet_values(params['n_students'], 1, 1, missing_rate=MISSING_RATE, seed=seed)
+    return values[1:TAIL_ROWS + 1]
+
+def _multi_source_stages(params, repeat):
+    """반마다 따로 있는 시트 출처를 load_multiple_sheets로 불러오는 단계들을 측정합니다.
+
+    반은 MULTI_SOURCE_SPREADSHEETS개의 스프레드시트에 나눠 담으므로 같은 스프레드시트의 범위는
+    batchGet 한 번으로 묶이고, 스프레드시트끼리는 작업자 풀에서 동시에 갱신됩니다.
+    """
+    sheets, sources = {}, []
+    for i in range(params['n_classes']):
+        spreadsheet_id, sheet_name = f'bench-{i % MULTI_SOURCE_SPREADSHEETS}', f'{i + 1}반'
+        sheets[(spreadsheet_id, sheet_name)] = app.example_sheet_values(
+            params['n_students'], params['n_sessions'], 1, missing_rate=MISSING_RATE, ragged_rate=RAGGED_RATE, seed=i)
+        sources.append((spreadsheet_id, f'{sheet_name}!A1:O', sheet_name))
+    service = FakeSheetsService(sheets)
+    tail = _tail_rows(params, seed=len(sources))
+
+    def load(ttl=None):
+        if app.load_multiple_sheets(service, sources, ttl=ttl) is None:
+            raise RuntimeError("가짜 시트 데이터를 불러오지 못했습니다.")
+
+    def full():
+        app.invalidate_sheet_snapshot()
+        load()
+
+    def append():
+        for rows in sheets.values():
+            rows.extend(tail)
+        load(ttl=0)
+
+    stages = {}
+    stages['multi_source_full'] = measure(full, repeat)
+    # TTL 안의 재요청 (합친 표를 그대로 반환)
+    stages['multi_source_cached'] = measure(load, repeat)
+    # TTL이 지난 뒤 바뀐 것이 없는 경우 (출처마다 헤더 + 마지막 행만 확인)
+    stages['multi_source_tail_sync'] = measure(lambda: load(ttl=0), repeat)
+    # 출처마다 새 행이 추가된 경우 (추가된 행만 파싱해 이어 붙이고 다시 합침)
+    stages['multi_source_tail_append'] = measure(append, repeat)
+    app.invalidate_sheet_snapshot()
+    return stages
+
+def run_size(params, repeat, korean_font):
+    """한 크기의 합성 데이터로 모든 단계를 측정해 {단계: {'median', 'min'}}을 반환합니다."""
+    stages = {}
+    stages['generate_frame'] = measure(lambda: app.load_example_data(**params, missing_rate=MISSING_RATE, seed=0), repeat)
+    stages['generate_sheet_values'] = measure(
+        lambda: app.example_sheet_values(**params, missing_rate=MISSING_RATE, ragged_rate=RAGGED_RATE, seed=0), repeat)
+
+    # 캐시를 비우고 가짜 서비스에서 내려받아 파싱 (스냅샷, SurveyTable, 데이터프레임까지)
+    rows = app.example_sheet_values(**params, missing_rate=MISSING_RATE, ragged_rate=RAGGED_RATE, seed=0)
+    service = FakeSheetsService({('bench', 'Sheet1'): rows})
+    def parse():
+        app.invalidate_sheet_snapshot()
+        if app.get_sheet_data(service, 'bench', 'Sheet1!A1:P') is None:
+            raise RuntimeError("가짜 시트 데이터를 파싱하지 못했습니다.")
+    stages['sheet_parse'] = measure(parse, repeat)
+
+    # TTL이 지난 뒤 새 행이 추가된 경우 (헤더 + 추가된 행만 batchGet으로 받아 이어 붙임)
+    tail = _tail_rows(params, seed=1)
+    def tail_append():
+        rows.extend(tail)
+        if app.get_sheet_snapshot(service, 'bench', 'Sheet1!A1:P', ttl=0, incremental=True) is None:
+            raise RuntimeError("가짜 시트 데이터를 동기화하지 못했습니다.")
+    stages['sheet_tail_append'] = measure(tail_append, repeat)
+    app.invalidate_sheet_snapshot()
+
+    stages.update(_multi_source_stages(params, repeat))
+
+    df = app.load_example_data(**params, missing_rate=MISSING_RATE, seed=0)
+    student_name = df['학생 이름'].iloc[0]
+    for chart_type, (per_student, view) in CHART_CASES.items():
+        stages[f'chart:{chart_type}'] = measure(
+            _chart_stage(df, chart_type, student_name if per_student else None, view, korean_font), repeat)
+    for view in ('lines', 'heatmap', 'distribution'):
+        stages[f'all_students:{view}'] = measure(
+            _chart_stage(df, '모든 학생 응답 비교', None, view, korean_font), repeat)
+    stages['png_encode'] = measure(_png_encode_stage(df, korean_font), repeat)
+    app.clear_render_cache()
+    return len(df), stages
+
+def _machine():
+    """같은 환경의 기록끼리만 비교하기 위한 실행 환경 정보"""
+    return {'node': platform.node(), 'python': platform.python_version(), 'cpus': os.cpu_count()}
+
+def _git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_history(path):
+    """실행 기록을 읽습니다. 파일이 없으면 빈 목록을 반환합니다."""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def append_history(path, record):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+def baselines(history, machine, size_params, runs):
+    """같은 환경·같은 크기로 측정한 최근 runs개 기록의 단계별 중앙값을 반환합니다."""
+    samples = {}
+    for record in [record for record in history if record.get('machine') == machine][::-1]:
+        size = next((size for size in record['sizes'].values() if size['params'] == size_params), None)
+        if size is None:
+            continue
+        for stage, result in size['stages'].items():
+            if len(samples.setdefault(stage, [])) < runs:
+                samples[stage].append(result['median'])
+    return {stage: statistics.median(values) for stage, values in samples.items()}
+
+def find_regressions(record, history, runs):
+    """기록을 이전 기록과 비교해 회귀 목록 [(크기, 단계, 현재 값, 기준 값)]을 반환합니다."""
+    regressions = []
+    if record['import_seconds'] > IMPORT_BUDGET_SECONDS:
+        regressions.append(('-', 'import_app', record['import_seconds'], IMPORT_BUDGET_SECONDS))
+    for name, size in record['sizes'].items():
+        reference = baselines(history, record['machine'], size['params'], runs)
+        for stage, result in size['stages'].items():
+            baseline = reference.get(stage)
+            if baseline is None:
+                continue
+            current = result['median']
+            if current > baseline * (1 + REGRESSION_TOLERANCE) and current - baseline > REGRESSION_MIN_SECONDS:
+                regressions.append((name, stage, current, baseline))
+    return regressions
+
+def format_report(record, history, runs):
+    """측정 결과를 기준값과 함께 표 형태의 문자열로 만듭니다."""
+    lines = [f"커밋 {record['commit'] or '-'} · {record['recorded_at']} · 반복 {record['repeat']}회",
+             f"import app: {record['import_seconds'] * 1000:.0f}ms (예산 {IMPORT_BUDGET_SECONDS * 1000:.0f}ms)"]
+    flagged = {(name, stage) for name, stage, _, _ in find_regressions(record, history, runs)}
+    for name, size in record['sizes'].items():
+        params = size['params']
+        lines.append('')
+        lines.append(f"[{name}] 학생 {params['n_students']}명 x 반 {params['n_classes']}개 x "
+                     f"{params['n_sessions']}회차 = {size['rows']}행")
+        lines.append(f"{'단계':<28}{'중앙값':>10}{'최소':>10}{'기준':>10}{'변화':>9}")
+        reference = baselines(history, record['machine'], params, runs)
+        for stage, result in size['stages'].items():
+            baseline = reference.get(stage)
+            change = f"{(result['median'] / baseline - 1) * 100:+.0f}%" if baseline else '-'
+            mark = '  ⚠️ 회귀' if (name, stage) in flagged else ''
+            lines.append(f"{stage:<28}{result['median'] * 1000:>9.1f}ms{result['min'] * 1000:>8.1f}ms"
+                         f"{(f'{baseline * 1000:.1f}ms' if baseline else '-'):>10}{change:>9}{mark}")
+    return '\n'.join(lines)
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m bench',
+        description='합성 설문 데이터로 분석 파이프라인의 단계별 시간을 측정하고 이전 기록과 비교합니다.')
+    parser.add_argument('--size', action='append', dest='sizes', choices=list(SIZES),
+                        help='측정할 크기 (여러 번 지정 가능, 기본값: 모두)')
+    parser.add_argument('--students', type=int, help='반마다의 학생 수 (지정하면 이 크기 하나만 측정)')
+    parser.add_argument('--sessions', type=int, default=1, help='수업 회차 수 (--students와 함께 사용)')
+    parser.add_argument('--classes', type=int, default=1, help='반 수 (--students와 함께 사용)')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='단계마다 반복 횟수 (기본값: 5)')
+    parser.add_argument('--history', default=BENCH_HISTORY_PATH, help=f'실행 기록 파일 (기본값: {BENCH_HISTORY_PATH})')
+    parser.add_argument('--baseline-runs', type=int, default=5, help='비교할 최근 기록 수 (기본값: 5)')
+    parser.add_argument('--no-record', action='store_true', help='실행 기록에 남기지 않음')
+    parser.add_argument('--fail-on-regression', action='store_true', help='회귀가 있으면 종료 코드 1을 반환')
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s %(levelname)s %(message)s', stream=sys.stderr)
+    # 한글 폰트가 없는 환경에서 글자마다 나오는 경고가 측정 결과를 가리지 않도록 합니다.
+    warnings.filterwarnings('ignore', message='Glyph .* missing from font')
+    if args.repeat < 1:
+        parser.error('--repeat는 1 이상이어야 합니다.')
+
+    if args.students:
+        sizes = {f'{args.students}x{args.classes}x{args.sessions}': {
+            'n_students': args.students, 'n_sessions': args.sessions, 'n_classes': args.classes}}
+    else:
+        sizes = {name: SIZES[name] for name in (args.sizes or SIZES)}
+
+    record = {
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': _git_commit(),
+        'machine': _machine(),
+        'repeat': args.repeat,
+        'import_seconds': measure_import(),
+        'sizes': {},
+    }
+    korean_font = app.get_korean_font()
+    for name, params in sizes.items():
+        rows, stages = run_size(params, args.repeat, korean_font)
+        record['sizes'][name] = {'params': params, 'rows': rows, 'stages': stages}
+
+    history = load_history(args.history)
+    print(format_report(record, history, args.baseline_runs))
+    regressions = find_regressions(record, history, args.baseline_runs)
+    if regressions:
+        print(f"\n⚠️ 회귀 {len(regressions)}건: " + ', '.join(
+            f"{name}/{stage} {current * 1000:.1f}ms (기준 {baseline * 1000:.1f}ms)"
+            for name, stage, current, baseline in regressions))
+    if not args.no_record:
+        append_history(args.history, record)
+    return 1 if regressions and args.fail_on_regression else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
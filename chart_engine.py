@@ -0,0 +1,364 @@
+"""차트 렌더링 엔진
+
+pyplot의 전역 상태 대신 Figure와 Agg 캔버스를 직접 사용하므로
+여러 세션(스레드)에서 동시에 호출해도 서로의 그래프에 영향을 주지 않습니다.
+Streamlit에 의존하지 않고 숫자 배열과 문자열로 된 차트 명세만 받으므로
+별도 프로세스(ProcessPoolExecutor)에서도 그대로 실행할 수 있습니다.
+"""
+import functools
+import threading
+import time
+from io import BytesIO
+
+import numpy as np
+import matplotlib
+import matplotlib.font_manager as fm
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+from matplotlib.transforms import Bbox
+from PIL import Image
+
+# 그래프 기본 크기와 해상도
+FIGURE_SIZE = (12, 8)
+FIGURE_DPI = 100
+
+@functools.lru_cache(maxsize=None)
+def font_properties(font_source):
+    """폰트 파일 경로나 폰트 이름으로 FontProperties를 만듭니다. (프로세스마다 한 번)"""
+    if font_source and font_source.lower().endswith(('.ttf', '.otf', '.ttc')):
+        return fm.FontProperties(fname=font_source)
+    return fm.FontProperties(family=font_source or 'DejaVu Sans')
+
+def new_figure():
+    """pyplot에 등록되지 않는 독립된 Figure를 만듭니다."""
+    fig = Figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+    FigureCanvasAgg(fig)
+    return fig
+
+def _label_bars(ax, bars, value_format, font):
+    """막대 위에 값을 표시합니다. (응답이 없어 값이 NaN인 막대는 비워 둡니다)"""
+    for bar in bars:
+        height = bar.get_height()
+        if not np.isfinite(height):
+            continue
+        ax.text(bar.get_x() + bar.get_width()/2., height,
+            format(height, value_format),
+            ha='center', va='bottom', fontproperties=font)
+
+def draw_bars(fig, spec, font):
+    """문항별 막대 그래프를 그립니다. (학생별 응답, 수업 전후 변화, 문항별 평균)"""
+    labels = spec['labels']
+    ax = fig.add_subplot(111)
+    bars = ax.bar(range(len(labels)), spec['values'],
+                  **({'yerr': spec['errors'], 'capsize': 5} if spec.get('errors') is not None else {}))
+
+    ax.set_title(spec['title'], fontsize=16, fontweight='bold', fontproperties=font)
+    ax.set_xticks(range(len(labels)))
+    ax.set_xticklabels(labels, rotation=45, ha='right', fontsize=spec.get('label_fontsize', 10), fontproperties=font)
+    ax.set_ylabel(spec['ylabel'], fontsize=12, fontproperties=font)
+    ax.set_ylim(0, 5)
+    _label_bars(ax, bars, spec.get('value_format', '.1f'), font)
+
+    if spec.get('footnote'):
+        fig.text(0.02, 0.02, spec['footnote'], fontsize=10, wrap=True, fontproperties=font)
+
+def draw_correlation(fig, spec, font):
+    """문항 간 상관계수 히트맵을 그립니다."""
+    # seaborn은 이 차트에서만 쓰고 import 비용이 크므로 처음 그릴 때 불러옵니다.
+    import seaborn as sns
+    
+    labels = spec['labels']
+    ax = fig.add_subplot(111)
+    sns.heatmap(spec['matrix'], annot=True, cmap='coolwarm', center=0, fmt='.2f', ax=ax,
+                xticklabels=labels, yticklabels=labels)
+
+    ax.set_title(spec['title'], fontsize=16, fontweight='bold', fontproperties=font)
+    ax.set_xticklabels(ax.get_xticklabels(), rotation=45, ha='right', fontsize=10, fontproperties=font)
+    ax.set_yticklabels(ax.get_yticklabels(), fontsize=10, fontproperties=font)
+
+def draw_all_students(fig, spec, font):
+    """모든 학생의 응답 벡터를 한 번에 그립니다.
+
+    'lines'는 학생별 선을 하나의 LineCollection으로 그리고,
+    'heatmap'과 'distribution'은 학생 x 문항 히트맵이나 문항별 점수 분포로 집계하여 그립니다.
+    어느 경우든 그리는 객체 수가 학생 수에 비례하지 않습니다.
+    """
+    students, profiles, items, view = spec['students'], spec['profiles'], spec['items'], spec['view']
+    x = np.arange(len(items))
+    ax = fig.add_subplot(111)
+
+    if view == 'lines':
+        values = np.nan_to_num(profiles)
+        # 각 학생별로 다른 색상 사용
+        colors = matplotlib.colormaps['tab20'](np.linspace(0, 1, len(students)))
+        segments = np.stack([np.broadcast_to(x, values.shape), values], axis=-1)
+        ax.add_collection(LineCollection(segments, colors=colors, linewidths=2, alpha=0.7))
+        ax.scatter(np.tile(x, len(students)), values.ravel(), c=np.repeat(colors, len(x), axis=0),
+                   s=36, alpha=0.7, zorder=3)
+        ax.set_xlim(-0.5, len(x) - 0.5)
+        ax.set_ylabel('점수 (1-5)', fontsize=12, fontproperties=font)
+        ax.set_ylim(0, 5)
+        ax.grid(True, linestyle='--', alpha=0.7)
+
+        # 범례 추가 (학생별 선 대신 가벼운 대리 객체 사용)
+        handles = [Line2D([], [], color=color, marker='o', linewidth=2, alpha=0.7) for color in colors]
+        ax.legend(handles, students, title='학생 이름', bbox_to_anchor=(1.05, 1), loc='upper left',
+                  prop=font, title_fontproperties=font)
+        title = '모든 학생의 설문 응답 비교'
+
+    elif view == 'heatmap':
+        image = ax.imshow(profiles, aspect='auto', cmap='YlOrRd', vmin=1, vmax=5, interpolation='nearest')
+        colorbar = fig.colorbar(image, ax=ax)
+        colorbar.set_label('점수 (1-5)', fontproperties=font)
+        if len(students) <= spec['name_limit']:
+            ax.set_yticks(range(len(students)))
+            ax.set_yticklabels(students, fontsize=8, fontproperties=font)
+        else:
+            ax.set_yticks([])
+            ax.set_ylabel(f'학생 ({len(students)}명)', fontsize=12, fontproperties=font)
+        title = f'모든 학생의 설문 응답 비교 ({len(students)}명)'
+
+    elif view == 'distribution':
+        # 문항별로 각 점수를 고른 학생 비율을 누적 막대로 표시
+        answered = np.maximum((~np.isnan(profiles)).sum(axis=0), 1)
+        colors = matplotlib.colormaps['RdYlGn'](np.linspace(0.1, 0.9, 5))
+        bottom = np.zeros(len(x))
+        for score in range(1, 6):
+            share = (profiles == score).sum(axis=0) / answered * 100
+            ax.bar(x, share, bottom=bottom, color=colors[score - 1], label=f'{score}점')
+            bottom += share
+        ax.set_ylabel('응답 비율 (%)', fontsize=12, fontproperties=font)
+        ax.set_ylim(0, 100)
+        ax.legend(title='점수', bbox_to_anchor=(1.02, 1), loc='upper left',
+                  prop=font, title_fontproperties=font)
+        title = f'문항별 점수 분포 ({len(students)}명)'
+
+    else:
+        raise ValueError(f"알 수 없는 화면 종류입니다: {view}")
+
+    ax.set_title(title, fontsize=16, fontweight='bold', fontproperties=font)
+    ax.set_xticks(x)
+    ax.set_xticklabels(items, rotation=45, ha='right', fontsize=10, fontproperties=font)
+
+# 추이 차트에서 눈금 이름을 모두 표시하는 최대 기간 수 (넘으면 일정 간격으로 표시)
+TREND_LABEL_LIMIT = 30
+
+def draw_trend(fig, spec, font):
+    """기간별 문항 평균 점수를 문항마다 꺾은선으로 그립니다."""
+    labels, values, items = spec['labels'], spec['values'], spec['items']
+    x = np.arange(len(labels))
+    ax = fig.add_subplot(111)
+
+    colors = matplotlib.colormaps['tab10'](np.arange(len(items)) % 10)
+    for j, item in enumerate(items):
+        ax.plot(x, values[:, j], marker='o', linewidth=2, markersize=5, color=colors[j], label=item)
+
+    ax.set_title(spec['title'], fontsize=16, fontweight='bold', fontproperties=font)
+    step = max(1, int(np.ceil(len(labels) / TREND_LABEL_LIMIT)))
+    ax.set_xticks(x[::step])
+    ax.set_xticklabels(labels[::step], rotation=45, ha='right', fontsize=10, fontproperties=font)
+    ax.set_xlim(-0.5, len(labels) - 0.5)
+    ax.set_xlabel(spec['xlabel'], fontsize=12, fontproperties=font)
+    ax.set_ylabel('평균 점수 (1-5)', fontsize=12, fontproperties=font)
+    ax.set_ylim(0, 5)
+    ax.grid(True, linestyle='--', alpha=0.7)
+    ax.legend(title='문항', bbox_to_anchor=(1.02, 1), loc='upper left',
+              prop=font, title_fontproperties=font)
+
+# 차트 템플릿 재사용 여부와 (템플릿 종류별) 보관할 유휴 템플릿 수
+USE_FIGURE_TEMPLATES = True
+TEMPLATE_POOL_SIZE = 4
+
+# 템플릿을 쓸 수 있는 래스터 이미지 형식
+RASTER_FORMATS = ('png', 'webp')
+
+# savefig(bbox_inches='tight')와 같은 바깥 여백 (인치)
+_TIGHT_PAD_INCHES = 0.1
+
+class _BarTemplate:
+    """막대 그래프의 고정된 뼈대(축, 한글 눈금, 축 제목, 여백)를 한 번만 그려 두고
+    학생마다 막대 높이와 값 표시, 제목, 평가 문구만 그 위에 다시 그리는 템플릿입니다.
+
+    뼈대는 해상도별 래스터 배경으로 보관하므로 렌더링할 때마다 눈금 글자 배치와
+    tight_layout을 다시 계산하지 않습니다.
+    """
+
+    def __init__(self, spec, font, dpi):
+        self.fig = fig = Figure(figsize=FIGURE_SIZE, dpi=dpi)
+        self.canvas = FigureCanvasAgg(fig)
+        labels = spec['labels']
+        self.ax = ax = fig.add_subplot(111)
+        self.bars = ax.bar(range(len(labels)), spec['values'])
+        title = ax.set_title(spec['title'], fontsize=16, fontweight='bold', fontproperties=font)
+        ax.set_xticks(range(len(labels)))
+        ax.set_xticklabels(labels, rotation=45, ha='right', fontsize=spec.get('label_fontsize', 10), fontproperties=font)
+        ax.set_ylabel(spec['ylabel'], fontsize=12, fontproperties=font)
+        ax.set_ylim(0, 5)
+        value_labels = [
+            ax.text(bar.get_x() + bar.get_width()/2., 0, '', ha='center', va='bottom', fontproperties=font)
+            for bar in self.bars
+        ]
+        footnote = None
+        if spec.get('footnote'):
+            footnote = fig.text(0.02, 0.02, spec['footnote'], fontsize=10, wrap=True, fontproperties=font)
+
+        # 여백 계산은 뼈대를 만들 때 한 번만 합니다.
+        fig.tight_layout(pad=3.0)
+
+        # 바뀌는 요소를 빼고 뼈대만 배경으로 그려 둡니다.
+        self.title, self.value_labels, self.footnote = title, value_labels, footnote
+        self.texts = [title] + value_labels + ([footnote] if footnote is not None else [])
+        for artist in [*self.bars, *self.texts]:
+            artist.set_animated(True)
+            artist.set_in_layout(False)
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(fig.bbox)
+        self.renderer = self.canvas.get_renderer()
+        self.static_extent = fig.get_tightbbox(self.renderer).transformed(fig.dpi_scale_trans)
+
+    def update(self, spec):
+        """데이터 요소(막대 높이, 값 표시, 제목, 평가 문구)만 바꿉니다."""
+        value_format = spec.get('value_format', '.1f')
+        for bar, label, value in zip(self.bars, self.value_labels, spec['values']):
+            finite = np.isfinite(value)
+            bar.set_height(value if finite else 0)
+            label.set_y(value if finite else 0)
+            label.set_text(format(value, value_format) if finite else '')
+        self.title.set_text(spec['title'])
+        if self.footnote is not None:
+            self.footnote.set_text(spec['footnote'])
+
+    def render(self):
+        """배경 위에 바뀌는 요소만 그리고, 내용에 맞게 잘라낸 RGB 이미지를 반환합니다."""
+        self.canvas.restore_region(self.background)
+        for bar in self.bars:
+            self.ax.draw_artist(bar)
+        # 막대가 축 테두리를 덮지 않도록 테두리를 다시 그립니다.
+        for spine in self.ax.spines.values():
+            self.ax.draw_artist(spine)
+        for text in self.texts:
+            self.fig.draw_artist(text)
+
+        # 뼈대와 바뀐 글자 영역을 합쳐 bbox_inches='tight'처럼 잘라냅니다.
+        extents = [self.static_extent] + [text.get_window_extent(self.renderer) for text in self.texts if text.get_text()]
+        pad = _TIGHT_PAD_INCHES * self.fig.dpi
+        x0, y0, x1, y1 = Bbox.union(extents).padded(pad).extents
+        width, height = self.canvas.get_width_height()
+        pixels = np.asarray(self.canvas.buffer_rgba())
+        crop = pixels[max(int(height - y1), 0):min(int(np.ceil(height - y0)), height),
+                      max(int(x0), 0):min(int(np.ceil(x1)), width), :3]
+        return Image.fromarray(crop)
+
+def _template_key(spec, font_source, profile):
+    """같은 뼈대를 공유할 수 있는 막대 그래프 명세를 묶는 키를 만듭니다. 템플릿 대상이 아니면 None."""
+    if not USE_FIGURE_TEMPLATES or spec['kind'] != 'bars' or spec.get('errors') is not None:
+        return None
+    if profile['format'] not in RASTER_FORMATS:
+        return None
+    return (font_source, profile['dpi'], tuple(spec['labels']), spec['ylabel'],
+            spec.get('label_fontsize', 10), bool(spec.get('footnote')))
+
+# 템플릿 키 -> 유휴 템플릿 목록 (한 템플릿은 한 번에 한 렌더링에서만 사용)
+_idle_templates = {}
+_idle_templates_lock = threading.Lock()
+
+def _acquire_template(key, spec, font, dpi):
+    """유휴 템플릿을 빌려옵니다. 없으면 명세로 새 뼈대를 만듭니다."""
+    with _idle_templates_lock:
+        idle = _idle_templates.get(key)
+        if idle:
+            return idle.pop()
+    return _BarTemplate(spec, font, dpi)
+
+def _release_template(key, template):
+    """다 쓴 템플릿을 돌려놓습니다. 보관 한도를 넘으면 버립니다."""
+    with _idle_templates_lock:
+        idle = _idle_templates.setdefault(key, [])
+        if len(idle) < TEMPLATE_POOL_SIZE:
+            idle.append(template)
+
+def clear_figure_templates():
+    """보관 중인 차트 템플릿을 모두 버립니다."""
+    with _idle_templates_lock:
+        _idle_templates.clear()
+
+# 차트 종류 -> 그리기 함수
+DRAWERS = {
+    'bars': draw_bars,
+    'correlation': draw_correlation,
+    'all_students': draw_all_students,
+    'trend': draw_trend,
+}
+
+def _encode_image(image, profile):
+    """PIL 이미지를 렌더 프로필 형식의 바이트로 인코딩합니다."""
+    buf = BytesIO()
+    if profile.get('colors'):
+        image.quantize(colors=profile['colors']).save(buf, format='PNG', optimize=True)
+    else:
+        image.save(buf, format=profile['format'].upper(), **profile.get('pil_kwargs', {}))
+    return buf.getvalue()
+
+def encode_figure(fig, profile):
+    """그래프를 렌더 프로필(format, dpi 등)에 맞는 형식의 바이트로 인코딩합니다."""
+    buf = BytesIO()
+    save_kwargs = {'pil_kwargs': profile['pil_kwargs']} if 'pil_kwargs' in profile else {}
+    fig.savefig(buf, format=profile['format'], bbox_inches='tight', dpi=profile['dpi'],
+                facecolor='white', **save_kwargs)
+    data = buf.getvalue()
+
+    if profile.get('colors'):
+        # 차트는 색 수가 적으므로 팔레트 PNG로 줄여도 화질 차이가 거의 없습니다.
+        data = _encode_image(Image.open(BytesIO(data)).convert('RGB'), profile)
+    return data
+
+def render_chart(spec, font_source, profile):
+    """차트 명세를 그려 인코딩하고 (이미지 바이트, 소요 시간(초))를 반환합니다.
+
+    인자와 반환값이 모두 pickle 가능하므로 프로세스 풀에 그대로 제출할 수 있습니다.
+    학생별 막대 그래프처럼 뼈대가 같은 차트는 템플릿을 재사용해 데이터만 다시 그립니다.
+    """
+    started = time.perf_counter()
+    font = font_properties(font_source)
+
+    key = _template_key(spec, font_source, profile)
+    if key is not None:
+        template = _acquire_template(key, spec, font, profile['dpi'])
+        template.update(spec)
+        data = _encode_image(template.render(), profile)
+        # 렌더링 중 오류가 나면 상태가 불확실한 템플릿은 돌려놓지 않습니다.
+        _release_template(key, template)
+        return data, time.perf_counter() - started
+
+    fig = new_figure()
+    DRAWERS[spec['kind']](fig, spec, font)
+
+    # 여백 조정
+    fig.tight_layout(pad=3.0)
+    return encode_figure(fig, profile), time.perf_counter() - started
+
+def render_charts(specs, font_source, profile):
+    """여러 차트 명세를 차례로 렌더링해 [(이미지 바이트, 소요 시간(초)), ...]을 반환합니다.
+
+    학생 한 명의 차트를 한 번에 프로세스 풀에 제출할 때 사용합니다.
+    """
+    return [render_chart(spec, font_source, profile) for spec in specs]
+
+# 보고서 PDF 한 쪽 크기 (A4 세로, 인치)
+REPORT_PAGE_SIZE = (8.27, 11.69)
+
+def report_page(title, images, font_source):
+    """차트 이미지들을 위에서부터 차례로 배치한 보고서 한 쪽(Figure)을 만듭니다."""
+    font = font_properties(font_source)
+    fig = Figure(figsize=REPORT_PAGE_SIZE)
+    FigureCanvasAgg(fig)
+    fig.suptitle(title, fontsize=16, fontweight='bold', fontproperties=font)
+
+    height = 0.88 / max(len(images), 1)
+    for i, data in enumerate(images):
+        ax = fig.add_axes([0.05, 0.92 - height * (i + 1), 0.9, height - 0.02])
+        ax.imshow(np.asarray(Image.open(BytesIO(data)).convert('RGB')))
+        ax.set_axis_off()
+    return fig
@@ -0,0 +1,18 @@
+"""테스트 공통 설정: 저장소 루트의 app 모듈을 불러올 수 있게 하고, 디스크 스냅샷 저장소를 끕니다. (공용 합성 설문 픽스처 포함)"""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SNAPSHOT_STORE_DIR', '')
+
+@pytest.fixture
+def survey_frame():
+    """3개 반 x 학생 8명 x 6회차 합성 설문 (척도 응답 15% 결측, 한 반의 한 문항은 전부 결측)"""
+    import app
+
+    df = app.load_example_data(n_students=8, n_sessions=6, n_classes=3, missing_rate=0.15, seed=7)
+    df.loc[df['반'] == '2반', '긴장도'] = pd.NA
+    return df
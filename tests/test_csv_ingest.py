@@ -0,0 +1,80 @@
+"""설문 CSV 나눠 읽기(read_survey_csv) 확인
+
+pandas와 pyarrow 파서로 여러 조각에 걸쳐 읽은 표가 서로, 그리고 같은 내용의 시트를 파싱한 결과와
+같은지 보고, 열 개수가 다른 행이 있으면 pyarrow가 pandas로 다시 읽는지, 큰 파일은 거부하는지 봅니다.
+"""
+import csv
+import io
+
+import pandas as pd
+import pytest
+
+import app
+
+@pytest.fixture
+def values():
+    """학생 6명 x 5회차(30행), 결측이 섞인 설문 시트 값"""
+    return app.example_sheet_values(n_students=6, n_sessions=5, missing_rate=0.15, seed=3)
+
+def _csv_bytes(rows, pad=True):
+    """시트 값을 구글 설문지 내보내기처럼 BOM이 붙은 CSV로 만듭니다. pad=False면 짧은 행을 그대로 둡니다."""
+    width = len(rows[0])
+    if pad:
+        rows = [row + [''] * (width - len(row)) for row in rows]
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode('utf-8-sig')
+
+def _count_chunks(monkeypatch, name):
+    """app의 조각 읽기 함수가 돌려준 조각 수를 세는 목록을 반환합니다."""
+    chunks = []
+    original = getattr(app, name)
+
+    def counting(*args):
+        for raw in original(*args):
+            chunks.append(len(raw))
+            yield raw
+
+    monkeypatch.setattr(app, name, counting)
+    return chunks
+
+def test_engines_agree_across_chunks(values, monkeypatch):
+    data = _csv_bytes(values)
+    # 구글 설문지 헤더 한 줄이 1.5KB 정도이므로 블록은 그보다 조금 크게 잡습니다.
+    monkeypatch.setattr(app, 'CSV_CHUNK_BYTES', 2048)
+    pandas_chunks = _count_chunks(monkeypatch, '_csv_chunks_pandas')
+    pyarrow_chunks = _count_chunks(monkeypatch, '_csv_chunks_pyarrow')
+
+    by_pyarrow = app.read_survey_csv(io.BytesIO(data), engine='pyarrow')
+    assert not pandas_chunks
+    by_pandas = app.read_survey_csv(io.BytesIO(data), engine='pandas', chunk_rows=4)
+    assert len(pandas_chunks) > 1 and len(pyarrow_chunks) > 1
+    assert sum(pandas_chunks) == sum(pyarrow_chunks) == len(values) - 1
+
+    expected = app._parse_sheet_table(values)
+    assert by_pandas.fingerprint == by_pyarrow.fingerprint == expected.fingerprint
+    pd.testing.assert_frame_equal(by_pyarrow.to_frame(), expected.to_frame(), check_categorical=False)
+
+def test_file_path_matches_file_object(values, tmp_path):
+    path = tmp_path / 'survey.csv'
+    path.write_bytes(_csv_bytes(values))
+    assert app.read_survey_csv(str(path)).fingerprint == app.read_survey_csv(io.BytesIO(path.read_bytes())).fingerprint
+
+def test_ragged_rows_fall_back_to_pandas(monkeypatch):
+    values = app.example_sheet_values(n_students=6, n_sessions=5, ragged_rate=0.3, seed=3)
+    assert any(len(row) < len(values[0]) for row in values)
+    pandas_chunks = _count_chunks(monkeypatch, '_csv_chunks_pandas')
+
+    table = app.read_survey_csv(io.BytesIO(_csv_bytes(values, pad=False)), engine='pyarrow')
+    assert pandas_chunks
+    assert table.fingerprint == app._parse_sheet_table(values).fingerprint
+
+def test_unknown_engine_raises(values):
+    with pytest.raises(ValueError):
+        app.read_survey_csv(io.BytesIO(_csv_bytes(values)), engine='polars')
+
+def test_file_over_limit_raises(values):
+    data = _csv_bytes(values)
+    with pytest.raises(ValueError, match='너무 큽니다'):
+        app.read_survey_csv(io.BytesIO(data), max_bytes=len(data) - 1)
+    assert len(app.read_survey_csv(io.BytesIO(data), max_bytes=len(data))) == len(values) - 1
@@ -0,0 +1,142 @@
+"""세션 간 공유 데이터셋 캐시 확인
+
+메모리 한도(DATASET_CACHE_MAX_BYTES)를 넘으면 가장 오래 사용하지 않은 출처부터 제거하는지,
+같은 키로 동시에 들어온 호출을 _single_flight가 한 번의 실행으로 합치는지 봅니다.
+"""
+import threading
+
+import pytest
+
+import app
+import bench
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    app.invalidate_sheet_snapshot()
+    yield
+    app.invalidate_sheet_snapshot()
+
+def _snapshot(n_students, seed):
+    table = app._parse_sheet_table(app.example_sheet_values(n_students=n_students, n_sessions=4, seed=seed))
+    return {'table': table, 'synced_at': 0, 'stale': False}
+
+def _cached():
+    with app._sheet_snapshots_lock:
+        return list(app._sheet_snapshots)
+
+def test_least_recently_used_source_is_evicted(monkeypatch):
+    a, b, c = _snapshot(5, 0), _snapshot(5, 1), _snapshot(5, 2)
+    size = a['table'].nbytes
+    monkeypatch.setattr(app, 'DATASET_CACHE_MAX_BYTES', 2 * size + size // 2)
+    evictions = app._dataset_stats['evictions']
+
+    app._snapshot_put(('S', 'a'), a)
+    app._snapshot_put(('S', 'b'), b)
+    assert app._snapshot_get(('S', 'a')) is a
+    app._snapshot_put(('S', 'c'), c)
+    assert _cached() == [('S', 'a'), ('S', 'c')]
+    assert app._dataset_stats['evictions'] == evictions + 1
+    assert app._dataset_stats['bytes'] == a['table'].nbytes + c['table'].nbytes
+
+    # 같은 표로 스냅샷만 바꾸면 크기를 다시 세지 않습니다.
+    app._snapshot_put(('S', 'a'), dict(a, stale=True))
+    assert app._dataset_stats['bytes'] == a['table'].nbytes + c['table'].nbytes
+    report = app.dataset_registry_report()
+    assert [row['bytes'] for row in report['datasets']] == [a['table'].nbytes, c['table'].nbytes]
+
+    app._snapshot_pop(('S', 'a'))
+    app._snapshot_pop(('S', 'c'))
+    assert app._dataset_stats['bytes'] == 0
+
+def test_oversized_source_is_kept_alone(monkeypatch):
+    monkeypatch.setattr(app, 'DATASET_CACHE_MAX_BYTES', 1)
+    app._snapshot_put(('S', 'a'), _snapshot(5, 0))
+    app._snapshot_put(('S', 'b'), _snapshot(5, 1))
+    assert _cached() == [('S', 'b')]
+
+def test_evicted_source_is_loaded_again(monkeypatch):
+    sheets = {(f'S{i}', 'Sheet1'): app.example_sheet_values(n_students=5, n_sessions=4, seed=i) for i in range(3)}
+    service = bench.FakeSheetsService(sheets)
+    first = app.get_sheet_snapshot(service, 'S0', 'Sheet1!A1:O')
+    monkeypatch.setattr(app, 'DATASET_CACHE_MAX_BYTES', 2 * first.nbytes + first.nbytes // 2)
+    for i in (1, 2):
+        app.get_sheet_snapshot(service, f'S{i}', 'Sheet1!A1:O')
+    assert [key[0] for key in _cached()] == ['S1', 'S2']
+
+    calls = len(service.calls)
+    table = app.get_sheet_snapshot(service, 'S0', 'Sheet1!A1:O')
+    assert [method for method, _, _ in service.calls[calls:]] == ['get']
+    assert table.fingerprint == first.fingerprint
+
+class _CountingLock:
+    """잠근 횟수를 세는 잠금 (따라온 호출이 진행 중인 호출을 찾았는지 기다리는 데 사용)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._acquired = threading.Condition()
+        self.count = 0
+
+    def __enter__(self):
+        self._lock.acquire()
+        with self._acquired:
+            self.count += 1
+            self._acquired.notify_all()
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+    def wait_for(self, count):
+        with self._acquired:
+            assert self._acquired.wait_for(lambda: self.count >= count, timeout=5)
+
+def _run_concurrently(fn, n_callers=5):
+    """같은 키로 fn을 동시에 n_callers번 호출하고 (결과 또는 예외 목록, 실행 횟수, 진행 중 사전)을 반환합니다.
+
+    먼저 들어온 호출의 fn은 나머지 호출이 모두 진행 중인 호출을 찾은 뒤에야 끝납니다.
+    """
+    inflight, lock, release = {}, _CountingLock(), threading.Event()
+    runs = []
+
+    def leader_fn():
+        runs.append(1)
+        assert release.wait(timeout=5)
+        return fn()
+
+    outcomes = [None] * n_callers
+
+    def call(i):
+        try:
+            outcomes[i] = app._single_flight(inflight, lock, 'key', leader_fn)
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(n_callers)]
+    threads[0].start()
+    lock.wait_for(1)
+    for thread in threads[1:]:
+        thread.start()
+    # 첫 호출이 잠금을 한 번, 따라온 호출이 한 번씩 잡으면 모두 같은 호출을 기다리는 중입니다.
+    lock.wait_for(n_callers)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    return outcomes, len(runs), inflight
+
+def test_single_flight_shares_result():
+    result = object()
+    outcomes, runs, inflight = _run_concurrently(lambda: result)
+    assert runs == 1
+    assert all(outcome is result for outcome in outcomes)
+    assert inflight == {}
+
+def test_single_flight_shares_error_then_retries():
+    error = RuntimeError('불러오기 실패')
+
+    def fail():
+        raise error
+
+    outcomes, runs, inflight = _run_concurrently(fail)
+    assert runs == 1
+    assert all(outcome is error for outcome in outcomes)
+    # 끝난 호출은 남지 않으므로 다음 호출은 다시 실행합니다.
+    assert app._single_flight(inflight, threading.Lock(), 'key', lambda: 'ok') == 'ok'
@@ -0,0 +1,42 @@
+"""'import app' 시간 예산과 무거운 모듈 지연 로딩 확인
+
+차트 라이브러리(matplotlib, seaborn)와 구글 API 클라이언트는 처음 쓰일 때 불러오므로,
+새 파이썬 프로세스에서 app만 import했을 때는 sys.modules에 없어야 합니다.
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# bench.py와 같은 예산 (기본 1초, BENCH_IMPORT_BUDGET)
+IMPORT_BUDGET_SECONDS = float(os.getenv('BENCH_IMPORT_BUDGET', '1.0'))
+
+# app import 시점에 불러오면 안 되는 모듈
+LAZY_MODULES = ['matplotlib', 'seaborn', 'googleapiclient']
+
+_IMPORT_CODE = (
+    'import json, sys, time\n'
+    'started = time.perf_counter()\n'
+    'import app\n'
+    'seconds = time.perf_counter() - started\n'
+    f'print(json.dumps({{"seconds": seconds, "loaded": [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))\n'
+)
+
+def _import_app():
+    """새 프로세스에서 app을 import하고 (소요 시간(초), 불러온 무거운 모듈 목록)을 반환합니다."""
+    env = dict(os.environ, SNAPSHOT_STORE_DIR='')
+    result = subprocess.run([sys.executable, '-c', _IMPORT_CODE], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+    return measured['seconds'], measured['loaded']
+
+def test_import_skips_heavy_modules():
+    _, loaded = _import_app()
+    assert loaded == []
+
+def test_import_within_budget():
+    # 첫 실행은 디스크 캐시 상태에 따라 느릴 수 있으므로 세 번 중 가장 짧은 값으로 판단합니다.
+    seconds = min(_import_app()[0] for _ in range(3))
+    assert seconds < IMPORT_BUDGET_SECONDS, f"import app: {seconds:.3f}초 (예산 {IMPORT_BUDGET_SECONDS}초)"
@@ -0,0 +1,78 @@
+"""시트 증분 동기화(_sync_sheet_tail) 확인
+
+bench의 가짜 Sheets 서비스로 행 추가, 마지막 행·중간 행 수정, 행 삭제, 헤더 변경을 흉내 내고
+추가만 있으면 batchGet만으로 이어 붙이고, 그 밖의 변경이면 전체를 다시 불러오는지 봅니다.
+"""
+import pandas as pd
+import pytest
+
+import app
+import bench
+
+RANGE = 'Sheet1!A1:O'
+
+@pytest.fixture
+def sheet():
+    """학생 5명 x 4회차(20행) 시트와 그 시트를 돌려주는 가짜 서비스"""
+    app.invalidate_sheet_snapshot()
+    values = app.example_sheet_values(n_students=5, n_sessions=4, missing_rate=0.1, ragged_rate=0.2, seed=0)
+    service = bench.FakeSheetsService({('S', 'Sheet1'): values})
+    yield values, service
+    app.invalidate_sheet_snapshot()
+
+def _sync(service):
+    """TTL 없이 증분 동기화로 스냅샷을 갱신하고 (표, 이번에 보낸 요청 종류 목록)을 반환합니다."""
+    before = len(service.calls)
+    table = app.get_sheet_snapshot(service, 'S', RANGE, ttl=0, incremental=True)
+    return table, [method for method, _, _ in service.calls[before:]]
+
+def _assert_matches(table, values):
+    """표가 시트 전체를 새로 파싱한 결과와 같은지 확인합니다."""
+    expected = app._parse_sheet_table(values).to_frame()
+    pd.testing.assert_frame_equal(table.to_frame(), expected, check_categorical=False)
+
+def test_unchanged_sheet_reuses_table(sheet):
+    values, service = sheet
+    first, methods = _sync(service)
+    assert methods == ['get']
+    table, methods = _sync(service)
+    assert methods == ['batchGet']
+    assert table is first
+
+def test_appended_rows_are_synced_incrementally(sheet):
+    values, service = sheet
+    _sync(service)
+    values.extend(app.example_sheet_values(n_students=3, seed=1)[1:])
+    table, methods = _sync(service)
+    assert methods == ['batchGet']
+    assert len(table) == len(values) - 1
+    _assert_matches(table, values)
+
+@pytest.mark.parametrize('edit', ['last_row', 'middle_row', 'delete_row', 'header'])
+def test_changed_rows_force_full_reload(sheet, edit):
+    values, service = sheet
+    _sync(service)
+    if edit == 'last_row':
+        values[-1][3] = '1' if values[-1][3] != '1' else '2'
+    elif edit == 'middle_row':
+        values[10][5] = '1' if values[10][5] != '1' else '2'
+    elif edit == 'delete_row':
+        del values[7]
+    else:
+        values[0][4] = '바뀐 질문'
+    table, methods = _sync(service)
+    assert methods == ['batchGet', 'get']
+    _assert_matches(table, values)
+
+def test_verify_blocks_rotate_over_large_sheets(sheet, monkeypatch):
+    values, service = sheet
+    # 검증 구간을 6행으로 줄이면 20행은 4개 블록이고, 동기화마다 한 블록씩 확인합니다.
+    monkeypatch.setattr(app, 'SHEET_VERIFY_ROWS', 6)
+    _sync(service)
+    values[15][5] = '1' if values[15][5] != '1' else '2'
+    reloads = 0
+    for _ in range(4):
+        table, methods = _sync(service)
+        reloads += methods.count('get')
+    assert reloads == 1
+    _assert_matches(table, values)
@@ -0,0 +1,137 @@
+"""Sheets API 할당량 제한(_TokenBucket)과 429/5xx 재시도(_execute_with_backoff) 확인
+
+전송 객체 생성 함수(http_factory)로 googleapiclient의 HttpMockSequence를 넣어
+네트워크 없이 실제 HttpError 응답을 흉내 냅니다. 대기는 가짜 시계로 바꿔 바로 끝납니다.
+"""
+import json
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpMockSequence
+
+import app
+
+VALUES = {'range': 'Sheet1!A1:B2', 'values': [['타임스탬프', '학생 이름'], ['2025. 3. 20 오후 1:23:45', '김민준']]}
+
+@pytest.fixture(scope='module')
+def credentials_info():
+    """테스트용 서비스 계정 정보 (토큰은 요청하지 않으므로 키만 올바르면 됩니다)"""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption()).decode()
+    return {
+        'type': 'service_account',
+        'project_id': 'mathemotion-test',
+        'private_key_id': 'test',
+        'private_key': pem,
+        'client_email': 'test@mathemotion-test.iam.gserviceaccount.com',
+        'client_id': '0',
+        'token_uri': 'https://oauth2.googleapis.com/token',
+    }
+
+class FakeClock:
+    """time.monotonic/time.sleep 대신 쓰는 가짜 시계. 잠든 시간만큼 바로 앞으로 갑니다."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(app.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(app.time, 'sleep', clock.sleep)
+    # 지터 없이 최대 대기 시간을 쓰도록 고정
+    monkeypatch.setattr(app.random, 'uniform', lambda low, high: high)
+    monkeypatch.setattr(app, '_sheets_clients', {})
+    monkeypatch.setattr(app, '_sheets_transports', {})
+    return clock
+
+class CountingHttp:
+    """HttpMockSequence를 감싸 실제로 보낸 요청 수를 세는 전송 객체"""
+
+    def __init__(self, responses):
+        self.http = HttpMockSequence(responses)
+        self.requests = 0
+
+    def request(self, *args, **kwargs):
+        self.requests += 1
+        return self.http.request(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.http, name)
+
+def _service(credentials_info, responses):
+    """응답 목록을 차례로 돌려주는 전송 객체를 쓰는 서비스와 그 전송 객체를 만듭니다."""
+    http = CountingHttp([({'status': str(status)}, json.dumps(body)) for status, body in responses])
+    service = app._get_pooled_service(json.dumps(credentials_info), http_factory=lambda credentials: http)
+    return service, http
+
+def _request(service):
+    return service.spreadsheets().values().get(spreadsheetId='S', range='Sheet1!A1:B2')
+
+def _error(status):
+    return status, {'error': {'code': status, 'message': 'error'}}
+
+def test_token_bucket_waits_for_refill(clock):
+    bucket = app._TokenBucket(60, capacity=2)
+    assert bucket.acquire(timeout=0) and bucket.acquire(timeout=0)
+    # 분당 60개이므로 다음 토큰은 1초 뒤에 생깁니다.
+    assert not bucket.acquire(timeout=0.5)
+    assert clock.sleeps == []
+    assert bucket.acquire(timeout=5)
+    assert clock.sleeps == [pytest.approx(1.0)]
+
+@pytest.mark.parametrize('per_minute, capacity', [(0, None), (-60, None), (0.5, None), (60, 0)])
+def test_token_bucket_rejects_invalid_quota(per_minute, capacity):
+    with pytest.raises(ValueError):
+        app._TokenBucket(per_minute, capacity=capacity)
+
+def test_retries_429_and_5xx_with_backoff(credentials_info, clock, monkeypatch):
+    monkeypatch.setattr(app, '_sheets_rate_limiter', app._TokenBucket(600))
+    service, http = _service(credentials_info, [_error(429), _error(503), (200, VALUES)])
+
+    assert app._execute_with_backoff(service, _request(service)) == VALUES
+    assert http.requests == 3
+    assert clock.sleeps == [app.SHEETS_BACKOFF_BASE, app.SHEETS_BACKOFF_BASE * 2]
+
+def test_gives_up_after_max_retries(credentials_info, clock, monkeypatch):
+    monkeypatch.setattr(app, '_sheets_rate_limiter', app._TokenBucket(600))
+    monkeypatch.setattr(app, 'SHEETS_MAX_RETRIES', 2)
+    service, http = _service(credentials_info, [_error(500)] * 3 + [(200, VALUES)])
+
+    with pytest.raises(app.SheetsThrottledError, match='HTTP 500'):
+        app._execute_with_backoff(service, _request(service))
+    assert http.requests == 3
+    assert clock.sleeps == [app.SHEETS_BACKOFF_BASE, app.SHEETS_BACKOFF_BASE * 2]
+
+def test_does_not_retry_other_errors(credentials_info, clock, monkeypatch):
+    monkeypatch.setattr(app, '_sheets_rate_limiter', app._TokenBucket(600))
+    service, http = _service(credentials_info, [_error(404), (200, VALUES)])
+
+    with pytest.raises(HttpError):
+        app._execute_with_backoff(service, _request(service))
+    assert http.requests == 1
+    assert clock.sleeps == []
+
+def test_throttles_when_quota_is_exhausted(credentials_info, clock, monkeypatch):
+    bucket = app._TokenBucket(60, capacity=1)
+    assert bucket.acquire(timeout=0)
+    monkeypatch.setattr(app, '_sheets_rate_limiter', bucket)
+    monkeypatch.setattr(app, 'SHEETS_QUEUE_TIMEOUT', 0.5)
+    service, http = _service(credentials_info, [(200, VALUES)])
+
+    # 다음 토큰은 1초 뒤에 생기므로 대기 시간 0.5초 안에 얻지 못하고 요청을 보내지 않습니다.
+    with pytest.raises(app.SheetsThrottledError, match='할당량'):
+        app._execute_with_backoff(service, _request(service))
+    assert http.requests == 0
+    assert clock.sleeps == []
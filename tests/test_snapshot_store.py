@@ -0,0 +1,80 @@
+"""디스크 스냅샷 저장소(Arrow IPC 파일) 확인
+
+저장한 표를 다시 읽으면 지문이 같고, 형식·출처가 다른 파일은 무시하며,
+저장에 실패하면 경고를 남기고 쓰다 만 파일을 지우는지 봅니다.
+"""
+import io
+import logging
+import os
+
+import pandas as pd
+import pytest
+
+import app
+
+pytest.importorskip('pyarrow')
+
+KEY = ('S', 'Sheet1!A1:O')
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """임시 디렉토리를 저장소로 사용합니다. (conftest는 저장소를 꺼 둠)"""
+    monkeypatch.setattr(app, 'SNAPSHOT_STORE_DIR', str(tmp_path))
+    return tmp_path
+
+@pytest.fixture
+def table(survey_frame):
+    return app.SurveyTable.from_frame(survey_frame.assign(**{app.UNIT_COLUMN: '이차방정식'}))
+
+def test_round_trip_keeps_fingerprint(store, table):
+    app.save_table_snapshot(KEY, table, {'revision': 'r1', 'row_count': len(table)}).result()
+    assert [path.suffix for path in store.iterdir()] == ['.arrow']
+
+    loaded, metadata = app.load_table_snapshot(KEY)
+    assert loaded.fingerprint == table.fingerprint
+    assert metadata['revision'] == 'r1' and metadata['row_count'] == len(table)
+    pd.testing.assert_frame_equal(loaded.to_frame(), table.to_frame())
+    assert loaded.stats.n_rows == len(table)
+
+def test_other_source_is_ignored(store, table):
+    app.save_table_snapshot(KEY, table).result()
+    assert app.load_table_snapshot(('S', 'Sheet2!A1:O')) == (None, None)
+
+@pytest.mark.parametrize('name, value', [('_SNAPSHOT_STORE_VERSION', 0), ('_SURVEY_SCHEMA_HASH', 'other')])
+def test_other_format_is_ignored(store, table, monkeypatch, name, value):
+    app.save_table_snapshot(KEY, table).result()
+    monkeypatch.setattr(app, name, value)
+    assert app.load_table_snapshot(KEY) == (None, None)
+
+def test_corrupt_file_is_ignored(store, table):
+    app.save_table_snapshot(KEY, table).result()
+    with open(app._snapshot_store_path(KEY), 'r+b') as f:
+        f.truncate(100)
+    assert app.load_table_snapshot(KEY) == (None, None)
+
+def test_disabled_store_does_nothing(table, monkeypatch):
+    monkeypatch.setattr(app, 'SNAPSHOT_STORE_DIR', '')
+    assert app.save_table_snapshot(KEY, table) is None
+    assert app.load_table_snapshot(KEY) == (None, None)
+
+def test_failed_write_warns_and_removes_tmp_file(store, table, monkeypatch, caplog):
+    def broken(*args):
+        raise OSError('디스크 가득 참')
+
+    monkeypatch.setattr(app, '_table_to_arrow', broken)
+    with caplog.at_level(logging.WARNING):
+        app.save_table_snapshot(KEY, table).result()
+    assert '디스크 스냅샷을 저장하지 못했습니다' in caplog.text
+    assert os.listdir(store) == []
+    assert app.load_table_snapshot(KEY) == (None, None)
+
+def test_csv_is_reloaded_from_store(store, monkeypatch):
+    data = app.load_example_data(n_students=4, n_sessions=3, seed=1).to_csv(index=False).encode('utf-8-sig')
+    first = app.read_survey_csv(io.BytesIO(data))
+    app._snapshot_store_writer.submit(lambda: None).result()
+
+    def unexpected(*args):
+        raise AssertionError('저장소에 있는 CSV를 다시 파싱했습니다')
+
+    monkeypatch.setattr(app, '_parse_survey_csv', unexpected)
+    assert app.read_survey_csv(io.BytesIO(data)).fingerprint == first.fingerprint
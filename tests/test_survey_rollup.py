@@ -0,0 +1,76 @@
+"""기간별 집계(SurveyRollup)를 pandas groupby 결과, 그리고 전체로 새로 만든 집계와 비교합니다."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+
+ITEMS = list(app.SURVEY_ITEMS)
+
+def _period_keys(df, period):
+    """pandas로 계산한 행별 기간 이름 (SurveyRollup과 같은 형식)"""
+    timestamps = pd.to_datetime(df['타임스탬프'])
+    if period == 'session':
+        return timestamps.dt.strftime('%Y-%m-%d')
+    if period == 'week':
+        monday = timestamps.dt.normalize() - pd.to_timedelta(timestamps.dt.weekday, unit='D')
+        return monday.dt.strftime('%Y-%m-%d')
+    return timestamps.dt.strftime('%Y-%m')
+
+@pytest.fixture
+def frame(survey_frame):
+    """타임스탬프가 빠진 행이 있는 설문 (그런 행은 기간 집계에서 제외)"""
+    df = survey_frame.copy()
+    df.loc[df.index[[3, 50]], '타임스탬프'] = None
+    return df
+
+@pytest.mark.parametrize('period', ['session', 'week', 'unit'])
+def test_rollup_matches_groupby(frame, period):
+    rollup = app.SurveyTable.from_frame(frame).rollup(period)
+    dated = frame[frame['타임스탬프'].notna()].assign(_period=lambda df: _period_keys(df, period))
+    values = dated[ITEMS].astype(float).assign(_period=dated['_period'], _student=dated['학생 이름'])
+
+    for student, rows in values.groupby('_student'):
+        expected = rows.groupby('_period')[ITEMS].mean().sort_index()
+        labels, means = rollup.student_series(student, ITEMS)
+        assert labels == list(expected.index)
+        np.testing.assert_allclose(means, expected.to_numpy(), equal_nan=True)
+
+    expected = values.groupby('_period')[ITEMS].mean().sort_index()
+    labels, means, students = rollup.class_series(ITEMS)
+    assert labels == list(expected.index)
+    np.testing.assert_allclose(means, expected.to_numpy(), equal_nan=True)
+    np.testing.assert_array_equal(students, values.groupby('_period')['_student'].nunique().sort_index().to_numpy())
+
+@pytest.mark.parametrize('period', ['session', 'week', 'unit'])
+def test_appended_rollup_matches_full_build(frame, period):
+    # 조각마다 새 학생(다른 반)과 새 기간이 섞여 들어오도록 행 순서대로 나눠 이어 붙입니다.
+    table = app.SurveyTable.from_frame(frame.iloc[:20])
+    table.rollup(period)
+    for start in range(20, len(frame), 35):
+        table = table.append(app.SurveyTable.from_frame(frame.iloc[start:start + 35]))
+
+    # append가 새 행만 더해 이어받은 집계 (rollup()으로 새로 만들지 않음)
+    rollup = table._rollups[period]
+    full = app.SurveyRollup.from_table(table, period)
+    assert rollup.n_rows == full.n_rows == len(frame)
+    assert sorted(rollup.students) == sorted(full.students)
+    for student in full.students:
+        labels, means = rollup.student_series(student, ITEMS)
+        expected_labels, expected = full.student_series(student, ITEMS)
+        assert labels == expected_labels
+        np.testing.assert_allclose(means, expected, equal_nan=True)
+    for got, expected in zip(rollup.class_series(ITEMS), full.class_series(ITEMS)):
+        if isinstance(expected, list):
+            assert got == expected
+        else:
+            np.testing.assert_allclose(got, expected, equal_nan=True)
+
+def test_unit_column_groups_by_unit(frame):
+    table = app.SurveyTable.from_frame(frame).with_constant(app.UNIT_COLUMN, '이차방정식')
+    rollup = table.rollup('unit')
+    assert rollup.axis_label == '단원'
+    labels, means, students = rollup.class_series(ITEMS)
+    assert labels == ['이차방정식']
+    np.testing.assert_allclose(means[0], frame[frame['타임스탬프'].notna()][ITEMS].astype(float).mean().to_numpy(),
+                               equal_nan=True)
@@ -0,0 +1,61 @@
+"""문항 통계(SurveyStats)를 pandas의 mean/std/corr와 비교합니다.
+
+결측은 문항(쌍)마다 빼고 계산하므로 pandas의 skipna 평균·표준편차, 쌍별 완전 관측 상관계수와 같아야 하고,
+append로 새 행만 합친 집계는 전체로 새로 만든 집계와 같아야 합니다.
+"""
+import numpy as np
+import pytest
+
+import app
+
+ITEMS = list(app.SURVEY_ITEMS)
+
+def _expected(df, cohort=None):
+    """pandas로 계산한 (평균, 표준편차, 상관계수 행렬)"""
+    if cohort is not None:
+        df = df[df[app.SOURCE_COLUMN] == cohort]
+    values = df[ITEMS].astype(float)
+    return values.mean().to_numpy(), values.std(ddof=1).to_numpy(), values.corr().to_numpy()
+
+def _assert_stats(stats, df, cohort=None):
+    means, stds, correlation = _expected(df, cohort)
+    np.testing.assert_allclose(stats.item_means(ITEMS, cohort), means, equal_nan=True)
+    np.testing.assert_allclose(stats.item_stds(ITEMS, cohort), stds, equal_nan=True)
+    np.testing.assert_allclose(stats.correlation(ITEMS, cohort), correlation, atol=1e-12, equal_nan=True)
+
+@pytest.mark.parametrize('cohort', [None, '1반', '2반', '3반'])
+def test_stats_match_pandas(survey_frame, cohort):
+    stats = app.SurveyTable.from_frame(survey_frame).stats
+    _assert_stats(stats, survey_frame, cohort)
+
+def test_item_counts_skip_missing(survey_frame):
+    stats = app.SurveyTable.from_frame(survey_frame).stats
+    expected = survey_frame[ITEMS].notna().sum().to_numpy()
+    np.testing.assert_array_equal(stats.item_counts(ITEMS), expected)
+    # 2반은 '긴장도'에 응답이 하나도 없습니다.
+    assert stats.item_counts(['긴장도'], '2반')[0] == 0
+    assert np.isnan(stats.item_means(['긴장도'], '2반')[0])
+
+def test_appended_stats_match_full_build(survey_frame):
+    # 앞쪽은 1·2반만, 뒤쪽 조각에서 3반이 처음 나오도록 나눠 이어 붙입니다.
+    first = survey_frame[survey_frame[app.SOURCE_COLUMN] != '3반'].iloc[:30]
+    rest = survey_frame.drop(first.index)
+    table = app.SurveyTable.from_frame(first)
+    assert table.stats.n_rows == len(first)
+    for start in range(0, len(rest), 40):
+        table = table.append(app.SurveyTable.from_frame(rest.iloc[start:start + 40]))
+
+    # 집계는 append가 새 행만 더해 이어받은 것입니다. (stats에 처음 접근해 새로 만든 것이 아님)
+    assert table._stats is not None and table.stats.n_rows == len(survey_frame)
+    full = app.SurveyStats.from_table(table)
+    combined = survey_frame.loc[list(first.index) + list(rest.index)]
+    for cohort in (None, '1반', '2반', '3반'):
+        for name in ('item_counts', 'item_means', 'item_stds', 'correlation'):
+            np.testing.assert_allclose(getattr(table.stats, name)(ITEMS, cohort), getattr(full, name)(ITEMS, cohort),
+                                       atol=1e-12, equal_nan=True)
+        _assert_stats(table.stats, combined, cohort)
+
+def test_unknown_cohort_raises(survey_frame):
+    stats = app.SurveyTable.from_frame(survey_frame).stats
+    with pytest.raises(KeyError):
+        stats.item_means(ITEMS, '9반')
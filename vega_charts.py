@@ -0,0 +1,220 @@
+"""브라우저 렌더링 차트 (Vega-Lite)
+
+chart_engine과 같은 차트 명세를 받아 Vega-Lite 명세(dict)로 바꿉니다.
+서버는 집계된 값(문항 평균, 상관계수 행렬, 학생별 응답 벡터)만 JSON으로 보내고
+그림은 브라우저가 그리므로 서버에서 matplotlib으로 래스터화하지 않습니다.
+브라우저에서 그리므로 값 위에 마우스를 올리면 툴팁이 뜨고, 선 그래프는 확대/이동할 수 있습니다.
+"""
+import json
+import math
+import time
+
+import numpy as np
+
+VEGA_LITE_SCHEMA = 'https://vega.github.io/schema/vega-lite/v5.json'
+
+# 차트 높이 (너비는 Streamlit 컨테이너에 맞춤)
+CHART_HEIGHT = 420
+
+# y축만 확대/이동 (문항 축은 범주형이라 확대하지 않음)
+_ZOOM_Y = {'name': 'zoom', 'select': {'type': 'interval', 'encodings': ['y']}, 'bind': 'scales'}
+
+def _number(value, digits=3):
+    """JSON에 넣을 수 있는 숫자로 바꿉니다. (NaN은 null)"""
+    value = float(value)
+    return None if math.isnan(value) else round(value, digits)
+
+def _chart(title, subtitle=None, height=CHART_HEIGHT):
+    """모든 차트에 공통인 최상위 명세를 만듭니다."""
+    chart = {
+        '$schema': VEGA_LITE_SCHEMA,
+        'title': {'text': title, 'fontSize': 16},
+        'height': height,
+    }
+    if subtitle:
+        # 줄바꿈으로 나눈 문자열 목록은 여러 줄로 표시됩니다.
+        chart['title']['subtitle'] = [line for line in subtitle.splitlines() if line.strip()]
+    return chart
+
+def _item_axis(items, title=None):
+    """문항 이름을 순서대로 놓는 x축 인코딩을 만듭니다."""
+    return {'field': 'item', 'type': 'nominal', 'sort': list(items), 'title': title,
+            'axis': {'labelAngle': -45, 'labelLimit': 200}}
+
+def vega_bars(spec):
+    """문항별 막대 그래프 (학생별 응답, 수업 전후 변화, 문항별 평균)"""
+    labels, errors = spec['labels'], spec.get('errors')
+    value_format = spec.get('value_format', '.1f')
+    values = []
+    for i, label in enumerate(labels):
+        record = {'item': label, 'value': _number(spec['values'][i])}
+        if errors is not None:
+            error = _number(errors[i])
+            record['error'] = error
+            if record['value'] is not None and error is not None:
+                record['low'], record['high'] = record['value'] - error, record['value'] + error
+        values.append(record)
+
+    tooltip = [{'field': 'item', 'title': '문항'},
+               {'field': 'value', 'type': 'quantitative', 'title': spec['ylabel'], 'format': value_format}]
+    if errors is not None:
+        tooltip.append({'field': 'error', 'type': 'quantitative', 'title': '표준편차', 'format': value_format})
+    x = _item_axis(labels)
+    y = {'field': 'value', 'type': 'quantitative', 'title': spec['ylabel'], 'scale': {'domain': [0, 5]}}
+
+    layers = [
+        {'mark': {'type': 'bar'}, 'params': [_ZOOM_Y], 'encoding': {'x': x, 'y': y, 'tooltip': tooltip}},
+        {'mark': {'type': 'text', 'dy': -6, 'fontSize': 12},
+         'encoding': {'x': x, 'y': y, 'text': {'field': 'value', 'type': 'quantitative', 'format': value_format}}},
+    ]
+    if errors is not None:
+        layers.append({
+            'mark': {'type': 'rule', 'color': 'black'},
+            'encoding': {'x': x, 'y': {'field': 'low', 'type': 'quantitative'}, 'y2': {'field': 'high'}},
+        })
+
+    chart = _chart(spec['title'], spec.get('footnote'))
+    chart.update({'data': {'values': values}, 'layer': layers})
+    return chart
+
+def vega_correlation(spec):
+    """문항 간 상관계수 히트맵 (빨강: 양의 상관, 파랑: 음의 상관)"""
+    labels, matrix = spec['labels'], np.asarray(spec['matrix'], dtype=float)
+    values = [{'row': row, 'col': col, 'r': _number(matrix[i, j])}
+              for i, row in enumerate(labels) for j, col in enumerate(labels)]
+    x = {'field': 'col', 'type': 'nominal', 'sort': list(labels), 'title': None,
+         'axis': {'labelAngle': -45, 'labelLimit': 200}}
+    y = {'field': 'row', 'type': 'nominal', 'sort': list(labels), 'title': None, 'axis': {'labelLimit': 200}}
+
+    chart = _chart(spec['title'])
+    chart.update({
+        'data': {'values': values},
+        'encoding': {'x': x, 'y': y},
+        'layer': [
+            {'mark': 'rect', 'encoding': {
+                'color': {'field': 'r', 'type': 'quantitative', 'title': '상관계수',
+                          'scale': {'scheme': 'redblue', 'domain': [-1, 1], 'reverse': True}},
+                'tooltip': [{'field': 'row', 'title': '문항 1'}, {'field': 'col', 'title': '문항 2'},
+                            {'field': 'r', 'type': 'quantitative', 'title': '상관계수', 'format': '.2f'}],
+            }},
+            {'mark': {'type': 'text', 'fontSize': 11}, 'encoding': {
+                'text': {'field': 'r', 'type': 'quantitative', 'format': '.2f'},
+                'color': {'condition': {'test': 'abs(datum.r) > 0.5', 'value': 'white'}, 'value': 'black'},
+            }},
+        ],
+    })
+    return chart
+
+def vega_all_students(spec):
+    """모든 학생의 응답 벡터 ('lines', 'heatmap', 'distribution')"""
+    students, profiles, items, view = spec['students'], np.asarray(spec['profiles'], dtype=float), spec['items'], spec['view']
+
+    if view == 'lines':
+        values = [{'student': student, 'item': item, 'value': _number(profiles[i, j])}
+                  for i, student in enumerate(students) for j, item in enumerate(items)]
+        # 범례에서 학생을 누르면 그 학생의 선만 강조합니다.
+        highlight = {'name': 'student', 'select': {'type': 'point', 'fields': ['student']}, 'bind': 'legend'}
+        chart = _chart('모든 학생의 설문 응답 비교')
+        chart.update({
+            'data': {'values': values},
+            'mark': {'type': 'line', 'point': True, 'strokeWidth': 2},
+            'params': [highlight, _ZOOM_Y],
+            'encoding': {
+                'x': _item_axis(items),
+                'y': {'field': 'value', 'type': 'quantitative', 'title': '점수 (1-5)', 'scale': {'domain': [0, 5]}},
+                'color': {'field': 'student', 'type': 'nominal', 'sort': list(students), 'title': '학생 이름',
+                          'scale': {'scheme': 'tableau20'}},
+                'opacity': {'condition': {'param': 'student', 'value': 0.8}, 'value': 0.1},
+                'tooltip': [{'field': 'student', 'title': '학생 이름'}, {'field': 'item', 'title': '문항'},
+                            {'field': 'value', 'type': 'quantitative', 'title': '점수'}],
+            },
+        })
+        return chart
+
+    if view == 'heatmap':
+        values = [{'student': student, 'item': item, 'value': _number(profiles[i, j])}
+                  for i, student in enumerate(students) for j, item in enumerate(items)]
+        show_names = len(students) <= spec['name_limit']
+        chart = _chart(f'모든 학생의 설문 응답 비교 ({len(students)}명)')
+        chart.update({
+            'data': {'values': values},
+            'mark': 'rect',
+            'encoding': {
+                'x': _item_axis(items),
+                'y': {'field': 'student', 'type': 'nominal', 'sort': list(students),
+                      'title': None if show_names else f'학생 ({len(students)}명)',
+                      'axis': {'labelFontSize': 8} if show_names else {'labels': False, 'ticks': False}},
+                'color': {'field': 'value', 'type': 'quantitative', 'title': '점수 (1-5)',
+                          'scale': {'scheme': 'yelloworangered', 'domain': [1, 5]}},
+                'tooltip': [{'field': 'student', 'title': '학생 이름'}, {'field': 'item', 'title': '문항'},
+                            {'field': 'value', 'type': 'quantitative', 'title': '점수'}],
+            },
+        })
+        return chart
+
+    if view == 'distribution':
+        # 문항별로 각 점수를 고른 학생 비율을 서버에서 집계해 보냅니다. (문항 수 x 5개 값)
+        answered = np.maximum((~np.isnan(profiles)).sum(axis=0), 1)
+        values = [{'item': item, 'score': f'{score}점', 'share': _number((profiles[:, j] == score).sum() / answered[j] * 100, 1)}
+                  for score in range(1, 6) for j, item in enumerate(items)]
+        chart = _chart(f'문항별 점수 분포 ({len(students)}명)')
+        chart.update({
+            'data': {'values': values},
+            'mark': 'bar',
+            'encoding': {
+                'x': _item_axis(items),
+                'y': {'field': 'share', 'type': 'quantitative', 'stack': 'zero', 'title': '응답 비율 (%)',
+                      'scale': {'domain': [0, 100]}},
+                'color': {'field': 'score', 'type': 'ordinal', 'title': '점수', 'scale': {'scheme': 'redyellowgreen'}},
+                'order': {'field': 'score', 'type': 'ordinal'},
+                'tooltip': [{'field': 'item', 'title': '문항'}, {'field': 'score', 'title': '점수'},
+                            {'field': 'share', 'type': 'quantitative', 'title': '비율 (%)', 'format': '.1f'}],
+            },
+        })
+        return chart
+
+    raise ValueError(f"알 수 없는 화면 종류입니다: {view}")
+
+def vega_trend(spec):
+    """기간별 문항 평균 점수를 문항마다 꺾은선으로 그립니다."""
+    labels, values, items = spec['labels'], np.asarray(spec['values'], dtype=float), spec['items']
+    records = [{'period': label, 'item': item, 'value': _number(values[i, j])}
+               for i, label in enumerate(labels) for j, item in enumerate(items)]
+    chart = _chart(spec['title'])
+    chart.update({
+        'data': {'values': records},
+        'mark': {'type': 'line', 'point': True, 'strokeWidth': 2},
+        'params': [_ZOOM_Y],
+        'encoding': {
+            # 기간이 많으면 Vega-Lite가 겹치는 눈금 이름을 알아서 건너뜁니다.
+            'x': {'field': 'period', 'type': 'ordinal', 'sort': list(labels), 'title': spec['xlabel'],
+                  'axis': {'labelAngle': -45, 'labelOverlap': True}},
+            'y': {'field': 'value', 'type': 'quantitative', 'title': '평균 점수 (1-5)', 'scale': {'domain': [0, 5]}},
+            'color': {'field': 'item', 'type': 'nominal', 'sort': list(items), 'title': '문항',
+                      'scale': {'scheme': 'category10'}},
+            'tooltip': [{'field': 'period', 'title': spec['xlabel']}, {'field': 'item', 'title': '문항'},
+                        {'field': 'value', 'type': 'quantitative', 'title': '평균 점수', 'format': '.2f'}],
+        },
+    })
+    return chart
+
+# 차트 종류 -> Vega-Lite 명세를 만드는 함수
+BUILDERS = {
+    'bars': vega_bars,
+    'correlation': vega_correlation,
+    'all_students': vega_all_students,
+    'trend': vega_trend,
+}
+
+def vega_lite_spec(spec):
+    """차트 명세를 Vega-Lite 명세(dict)로 바꿉니다."""
+    return BUILDERS[spec['kind']](spec)
+
+def render_chart(spec):
+    """차트 명세를 Vega-Lite JSON 바이트로 만들고 (바이트, 소요 시간(초))를 반환합니다.
+
+    chart_engine.render_chart와 반환 형식이 같아 렌더 캐시와 프로필 통계를 그대로 사용합니다.
+    """
+    started = time.perf_counter()
+    data = json.dumps(vega_lite_spec(spec), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return data, time.perf_counter() - started